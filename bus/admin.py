@@ -1,6 +1,16 @@
 from django.contrib import admin
 
-from .models import Booking, BookingDetail, Bus, BusRoute, Route
+from .models import (
+    Booking,
+    BookingDetail,
+    Bus,
+    BusRoute,
+    DailyRouteOccupancy,
+    Route,
+    RouteStop,
+    ScheduleTemplate,
+    SeatHold,
+)
 
 
 class BusAdmin(admin.ModelAdmin):
@@ -16,8 +26,17 @@ class RouteAdmin(admin.ModelAdmin):
     ordering = ("start_location", "end_location")
 
 
+class RouteStopAdmin(admin.ModelAdmin):
+    list_display = ("route", "sequence", "location", "offset_minutes")
+    list_select_related = ("route",)
+    search_fields = ("location", "route__start_location", "route__end_location")
+    readonly_fields = ("route", "sequence", "location")
+    ordering = ("route", "sequence")
+
+
 class BusRouteAdmin(admin.ModelAdmin):
     list_display = ("bus", "route", "date", "available_seats")
+    list_select_related = ("bus", "route")
     list_filter = ("date", "bus__bus_type", "route__start_location", "route__end_location")
     search_fields = ("bus__bus_number", "route__start_location", "route__end_location")
     ordering = ("date",)
@@ -25,6 +44,7 @@ class BusRouteAdmin(admin.ModelAdmin):
 
 class BookingAdmin(admin.ModelAdmin):
     list_display = ("user", "booking_time")
+    list_select_related = ("user",)
     list_filter = ("booking_time", "user__username")
     search_fields = ("user__username",)
     ordering = ("-booking_time",)
@@ -32,13 +52,48 @@ class BookingAdmin(admin.ModelAdmin):
 
 class BookingDetailAdmin(admin.ModelAdmin):
     list_display = ("bus_route", "seat_numbers")
+    list_select_related = ("bus_route__bus", "bus_route__route")
     list_filter = ("bus_route__date", "bus_route__bus__bus_type", "bus_route__route__start_location")
     search_fields = ("bus_route__bus__bus_number", "bus_route__route__start_location", "bus_route__route__end_location")
     ordering = ("bus_route__date",)
 
 
+class SeatHoldAdmin(admin.ModelAdmin):
+    list_display = ("bus_route", "user", "seats", "expires_at")
+    list_select_related = ("bus_route__bus", "bus_route__route", "user")
+    search_fields = ("user__username", "bus_route__bus__bus_number")
+    ordering = ("expires_at",)
+
+
+class ScheduleTemplateAdmin(admin.ModelAdmin):
+    list_display = ("bus", "route", "weekdays", "valid_from", "valid_to", "is_active")
+    list_select_related = ("bus", "route")
+    list_filter = ("is_active", "valid_from")
+    search_fields = ("bus__bus_number", "route__start_location", "route__end_location")
+    ordering = ("-valid_from",)
+
+
+class DailyRouteOccupancyAdmin(admin.ModelAdmin):
+    list_display = ("route", "date", "bus_type", "departures", "capacity", "seats_sold", "bookings")
+    list_select_related = ("route",)
+    list_filter = ("date", "bus_type")
+    search_fields = ("route__start_location", "route__end_location")
+    ordering = ("-date",)
+
+    # Maintained by `bus.occupancy`
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 admin.site.register(Bus, BusAdmin)
 admin.site.register(Route, RouteAdmin)
+admin.site.register(RouteStop, RouteStopAdmin)
 admin.site.register(BusRoute, BusRouteAdmin)
 admin.site.register(Booking, BookingAdmin)
 admin.site.register(BookingDetail, BookingDetailAdmin)
+admin.site.register(SeatHold, SeatHoldAdmin)
+admin.site.register(ScheduleTemplate, ScheduleTemplateAdmin)
+admin.site.register(DailyRouteOccupancy, DailyRouteOccupancyAdmin)
@@ -0,0 +1,115 @@
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Min
+
+from main.caching import get_namespace_version, invalidate_namespace
+
+from .models import BusRoute, Route
+
+# Longest date range of a calendar request
+MAX_CALENDAR_DAYS = 62
+
+
+def _calendar_namespace(route_id):
+    return f"route-calendar:{route_id}"
+
+
+def _month(date):
+    return date.replace(day=1)
+
+
+def _months(start, end):
+    month = _month(start)
+    while month <= end:
+        yield month
+        month = (month + datetime.timedelta(days=31)).replace(day=1)
+
+
+def _month_end(month):
+    return (month + datetime.timedelta(days=31)).replace(day=1) - datetime.timedelta(days=1)
+
+
+def _calendar_key(route_id, version, month):
+    return f"route-calendar:{route_id}:v{version}:{month:%Y-%m}"
+
+
+def _empty_day(date):
+    return {"date": date, "departures": 0, "min_available_seats": None, "max_available_seats": None, "bus_types": []}
+
+
+def compute_calendar(route_id, start, end):
+    """
+    Return the availability of the departures of `route_id` between `start` and `end` by day, in one grouped query.
+
+    Days without departures are left out.
+    """
+    days = {}
+    rows = (
+        BusRoute.objects.filter(route_id=route_id, date__range=(start, end))
+        .values("date", "bus__bus_type")
+        .annotate(
+            departures=Count("id"),
+            min_available_seats=Min("available_seats"),
+            max_available_seats=Max("available_seats"),
+        )
+        .order_by("date", "bus__bus_type")
+    )
+    for row in rows:
+        day = days.setdefault(row["date"], _empty_day(row["date"]))
+        day["departures"] += row["departures"]
+        for key, pick in (("min_available_seats", min), ("max_available_seats", max)):
+            day[key] = row[key] if day[key] is None else pick(day[key], row[key])
+        day["bus_types"].append(row["bus__bus_type"])
+    return days
+
+
+def get_route_calendar(route_id, start, days):
+    """
+    Return the availability of `route_id` for every day from `start` on, `days` days.
+
+    Months are cached separately per route, so overlapping ranges share them, and the missing months of a request
+    are computed together by `compute_calendar`. Returns None when nothing is departing in the uncached months and
+    the route does not exist.
+    """
+    end = start + datetime.timedelta(days=days - 1)
+    version = get_namespace_version(_calendar_namespace(route_id))
+    keys = {month: _calendar_key(route_id, version, month) for month in _months(start, end)}
+    cached = cache.get_many(keys.values())
+
+    missing = [month for month, key in keys.items() if key not in cached]
+    if missing:
+        computed = compute_calendar(route_id, missing[0], _month_end(missing[-1]))
+        if not computed and not Route.objects.filter(pk=route_id).exists():
+            return None
+        fresh = {keys[month]: {date: day for date, day in computed.items() if _month(date) == month} for month in missing}
+        cache.set_many(fresh, timeout=settings.CATALOG_CACHE_TIMEOUT)
+        cached.update(fresh)
+
+    calendar = []
+    for offset in range(days):
+        date = start + datetime.timedelta(days=offset)
+        calendar.append(cached[keys[_month(date)]].get(date) or _empty_day(date))
+    return calendar
+
+
+def invalidate_route_calendar(route_id):
+    invalidate_namespace(_calendar_namespace(route_id))
+
+
+def invalidate_calendar_months(bus_routes):
+    """
+    Drop the cached months of the calendars that show `bus_routes`, e.g. after their available seats changed.
+    """
+    months = defaultdict(set)
+    for bus_route in bus_routes:
+        months[bus_route.route_id].add(_month(bus_route.date))
+    cache.delete_many(
+        [
+            _calendar_key(route_id, get_namespace_version(_calendar_namespace(route_id)), month)
+            for route_id, route_months in months.items()
+            for month in route_months
+        ]
+    )
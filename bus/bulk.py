@@ -0,0 +1,92 @@
+from django.db import transaction
+
+from user.models import User
+
+from .holds import held_seats
+from .inventory import (
+    SeatMap,
+    SeatsUnavailable,
+    allocate_seats,
+    lock_bus_routes,
+    save_bus_routes,
+)
+from .models import Booking, BookingDetail
+from .occupancy import record_bookings
+from .serializers import BulkBookingResultSerializer, BulkBookingSerializer
+
+# Largest number of bookings accepted in a single bulk request
+MAX_BULK_BOOKINGS = 1000
+
+
+def _referenced_ids(items):
+    """
+    Collect the user and bus route ids of the (not yet validated) bulk booking data.
+    """
+    user_ids, bus_route_ids = set(), set()
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        if isinstance(item.get("user"), int):
+            user_ids.add(item["user"])
+        for detail in item.get("book") or []:
+            if isinstance(detail, dict) and isinstance(detail.get("bus_route"), int):
+                bus_route_ids.add(detail["bus_route"])
+    return user_ids, bus_route_ids
+
+
+def create_bookings(items, context=None):
+    """
+    Validate and create the bookings of `items` in bulk, each booking on its own.
+
+    Users and bus routes are loaded once for the whole batch, with the bus routes locked. Seats are allocated
+    in memory per booking, around the held seats, so a booking that fails validation or finds its seats taken
+    is rejected without affecting the others. The accepted bookings, their details and the M2M rows are then written with one
+    `bulk_create` each and every bus route is updated once.
+
+    Returns one `BulkBookingResultSerializer` result per item, in order.
+    """
+    user_ids, bus_route_ids = _referenced_ids(items)
+    results, accepted = [], []
+    with transaction.atomic():
+        bus_routes = lock_bus_routes(bus_route_ids)
+        seat_maps = {pk: SeatMap.for_bus_route(bus_route) for pk, bus_route in bus_routes.items()}
+        held = held_seats(bus_routes)
+        context = {
+            **(context or {}),
+            "bus_routes": bus_routes,
+            "users": set(User.objects.filter(pk__in=user_ids).values_list("pk", flat=True)),
+        }
+
+        for index, item in enumerate(items):
+            serializer = BulkBookingSerializer(data=item, context=context)
+            if not serializer.is_valid():
+                results.append({"index": index, "status": BulkBookingResultSerializer.REJECTED, "errors": serializer.errors})
+                continue
+            details = [BookingDetail(**detail) for detail in serializer.validated_data["book"]]
+            try:
+                allocate_seats(details, bus_routes, seat_maps, held)
+            except SeatsUnavailable as exc:
+                results.append(
+                    {"index": index, "status": BulkBookingResultSerializer.REJECTED, "errors": {"book": [str(exc)]}}
+                )
+                continue
+            booking = Booking(user_id=serializer.validated_data["user_id"])
+            result = {"index": index, "status": BulkBookingResultSerializer.CREATED, "booking": {"book": details}}
+            accepted.append((booking, details, result))
+            results.append(result)
+
+        if accepted:
+            Booking.objects.bulk_create(booking for booking, details, result in accepted)
+            BookingDetail.objects.bulk_create(detail for booking, details, result in accepted for detail in details)
+            Booking.book.through.objects.bulk_create(
+                Booking.book.through(booking_id=booking.pk, bookingdetail_id=detail.pk)
+                for booking, details, result in accepted
+                for detail in details
+            )
+            booked = {detail.bus_route_id for booking, details, result in accepted for detail in details}
+            save_bus_routes({pk: bus_routes[pk] for pk in booked}, seat_maps)
+            record_bookings((detail for booking, details, result in accepted for detail in details), bus_routes)
+
+    for booking, details, result in accepted:
+        result["booking"].update(id=booking.pk, user_id=booking.user_id, booking_time=booking.booking_time)
+    return results
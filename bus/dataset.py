@@ -0,0 +1,388 @@
+import bisect
+import datetime
+import io
+import itertools
+import json
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Max
+
+from main.caching import invalidate_namespace
+from user.models import User
+
+from .availability import invalidate_route_calendar
+from .models import (
+    Booking,
+    BookingDetail,
+    Bus,
+    BusRoute,
+    DailyRouteOccupancy,
+    Route,
+    RouteStop,
+    ScheduleTemplate,
+    SeatHold,
+)
+from .occupancy import rebuild_occupancy
+from .planner import invalidate_timetables
+from .utils import CATALOG_CACHE_NAMESPACE, normalize_location
+
+USERNAME_PREFIX = "loadtest"
+PASSWORD = "password"
+
+# Cities served by the generated routes, with their population in thousands, which weighs the demand between them
+CITIES = [
+    ("Kathmandu", 845),
+    ("Pokhara", 519),
+    ("Bharatpur", 369),
+    ("Lalitpur", 299),
+    ("Birgunj", 272),
+    ("Biratnagar", 244),
+    ("Dhangadhi", 204),
+    ("Ghorahi", 200),
+    ("Itahari", 198),
+    ("Janakpur", 195),
+    ("Hetauda", 195),
+    ("Butwal", 195),
+    ("Tulsipur", 180),
+    ("Dharan", 173),
+    ("Nepalgunj", 164),
+    ("Birendranagar", 154),
+    ("Bhimdatta", 117),
+    ("Damak", 113),
+    ("Siddharthanagar", 80),
+    ("Bhaktapur", 79),
+    ("Birtamod", 77),
+    ("Gorkha", 50),
+    ("Tansen", 30),
+    ("Baglung", 30),
+    ("Ilam", 25),
+    ("Besisahar", 20),
+]
+CAPACITIES = [35, 40, 45, 50]
+# Fields whose Python values are written as they are
+PLAIN_FIELD_TYPES = {"AutoField", "BigAutoField", "BooleanField", "CharField", "EmailField", "ForeignKey", "TextField"}
+PLAIN_FIELD_TYPES |= {"IntegerField", "PositiveIntegerField", "PositiveSmallIntegerField"}
+# Relative demand by weekday, Monday first: people travel home on Fridays and back on Sundays
+WEEKDAY_DEMAND = [0.9, 0.8, 0.8, 0.9, 1.4, 1.1, 1.3]
+# Chances of 1, 2 and 3 bus routes in a booking (a return trip, a connection)
+DETAILS_PER_BOOKING = [75, 20, 5]
+# Chances of booking 1 to 4 seats on a bus route
+SEATS_PER_DETAIL = [50, 30, 12, 8]
+
+
+def _copy_value(value):
+    """
+    Format a value for the text format of PostgreSQL `COPY`.
+    """
+    if value is None:
+        return r"\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        # Hex `bytea` input, its backslash escaped for the text format
+        return "\\\\x" + bytes(value).hex()
+    if isinstance(value, (list, dict)):
+        value = json.dumps(value)
+    elif isinstance(value, (datetime.date, datetime.time)):
+        value = value.isoformat()
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+class TableWriter:
+    """
+    Buffer rows of the table of `model` and write them `batch_size` at a time, with `COPY` on PostgreSQL and
+    `executemany` elsewhere, bypassing the model instances of `bulk_create`.
+
+    Rows are tuples of the values of `fields`. The other concrete fields get their default, or `now` for the
+    `auto_now` and `auto_now_add` ones.
+    """
+
+    def __init__(self, model, fields, now, batch_size):
+        opts = model._meta
+        # The connection itself, `django.db.connection` is a proxy looked up on every access
+        self.connection = connections[DEFAULT_DB_ALIAS]
+        self.fields = [opts.get_field(name) for name in fields]
+        default_fields = [
+            # Primary keys not given are left to the database
+            field
+            for field in opts.concrete_fields
+            if field not in self.fields and not field.primary_key
+        ]
+        self.defaults = [
+            now if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False) else field.get_default()
+            for field in default_fields
+        ]
+        self.table = self.connection.ops.quote_name(opts.db_table)
+        self.columns = ", ".join(self.connection.ops.quote_name(field.column) for field in self.fields + default_fields)
+        self.sql = (
+            f"INSERT INTO {self.table} ({self.columns}) VALUES ({', '.join(['%s'] * len(self.fields + default_fields))})"
+        )
+        self.preps = [self.get_prep(field) for field in self.fields]
+        self.prepared_defaults = [
+            value if prep is None else prep(value, self.connection)
+            for prep, value in zip(map(self.get_prep, default_fields), self.defaults)
+        ]
+        self.batch_size = batch_size
+        self.rows = []
+        self.count = 0
+
+    def get_prep(self, field):
+        return None if field.get_internal_type() in PLAIN_FIELD_TYPES else field.get_db_prep_save
+
+    def add(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        with self.connection.cursor() as cursor:
+            if self.connection.vendor == "postgresql":
+                suffix = "".join(f"\t{_copy_value(value)}" for value in self.defaults)
+                buffer = io.StringIO()
+                for row in self.rows:
+                    buffer.write("\t".join(map(_copy_value, row)) + suffix + "\n")
+                buffer.seek(0)
+                cursor.copy_expert(f"COPY {self.table} ({self.columns}) FROM STDIN", buffer)
+            else:
+                params = [
+                    [value if prep is None else prep(value, self.connection) for prep, value in zip(self.preps, row)]
+                    + self.prepared_defaults
+                    for row in self.rows
+                ]
+                cursor.executemany(self.sql, params)
+        self.count += len(self.rows)
+        self.rows = []
+
+
+class DatasetGenerator:
+    """
+    Generate a synthetic, production-like dataset for load tests.
+
+    Routes link Nepali cities, busier between bigger cities, and every bus runs one route once a day for `days`
+    days from `start`. Bookings pick their bus routes by demand (route, weekday) and their users with a long
+    tail, so a few users book a lot like travel agents do. Seats are assigned like the seat inventory does, the
+    available seats and seat maps of the bus routes match the booked seats and no bus is overbooked.
+
+    Rows are streamed `batch_size` at a time through `TableWriter` with explicit primary keys, so memory is
+    bounded by the number of bus routes and users rather than of bookings. Everything is drawn from one random
+    generator seeded with `seed`: the same arguments give the same rows, so benchmark runs are comparable.
+    """
+
+    def __init__(self, buses, routes, days, users, bookings, seed=0, start=None, batch_size=10_000, log=None):
+        self.buses = buses
+        self.routes = routes
+        self.days = days
+        self.users = users
+        self.bookings = bookings
+        self.start = start or datetime.date.today()
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+        self.now = datetime.datetime.combine(self.start, datetime.time(), tzinfo=datetime.timezone.utc)
+        self.log = log or (lambda message: None)
+
+    def pick(self, cum_weights):
+        """
+        Return a random index of the cumulative weights `cum_weights`, like `random.choices` but without its
+        overhead, which matters for millions of picks.
+        """
+        return bisect.bisect_right(cum_weights, self.rng.random() * cum_weights[-1], 0, len(cum_weights) - 1)
+
+    def writer(self, model, fields):
+        return TableWriter(model, fields, self.now, self.batch_size)
+
+    def next_id(self, model):
+        return (model.objects.aggregate(id=Max("pk"))["id"] or 0) + 1
+
+    def clear(self, truncate=True):
+        """
+        Delete the bus data (like the former `load_bus`) and the generated users, with `TRUNCATE` on PostgreSQL if
+        `truncate`, which it refuses on tables with rows changed earlier in the same transaction.
+        """
+        # Referencing tables first, without the signals of `QuerySet.delete()` that would run for every row
+        models = [Booking.book.through, BookingDetail, Booking, SeatHold, DailyRouteOccupancy, BusRoute]
+        models += [ScheduleTemplate, RouteStop, Route, Bus]
+        connection = connections[DEFAULT_DB_ALIAS]
+        tables = [connection.ops.quote_name(model._meta.db_table) for model in models]
+        with connection.cursor() as cursor:
+            if truncate and connection.vendor == "postgresql":
+                cursor.execute(f"TRUNCATE {', '.join(tables)}")
+            else:
+                for table in tables:
+                    cursor.execute(f"DELETE FROM {table}")
+        User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+
+    def generate(self):
+        """
+        Replace the bus data with the generated dataset, returning the number of rows by model.
+        """
+        # Truncating first in a transaction of its own is safe, not within an outer one (e.g. of a test case)
+        truncate = not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        with transaction.atomic():
+            self.clear(truncate=truncate)
+            counts = {
+                Bus: self.generate_buses(),
+                Route: self.generate_routes(),
+                User: self.generate_users(),
+            }
+            counts.update(self.generate_bookings())
+            connection = connections[DEFAULT_DB_ALIAS]
+            statements = connection.ops.sequence_reset_sql(no_style(), [*counts, RouteStop, Booking.book.through])
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+        # The rows were not saved through the models, no signal refreshed the rollup or the caches
+        end = self.start + datetime.timedelta(days=self.days - 1)
+        batch = datetime.timedelta(days=7)
+        start = self.start
+        while start <= end:
+            rebuild_occupancy(start, min(start + batch - datetime.timedelta(days=1), end))
+            start += batch
+        invalidate_namespace(CATALOG_CACHE_NAMESPACE)
+        invalidate_timetables()
+        for route_id in range(self.route_ids, self.route_ids + self.routes):
+            invalidate_route_calendar(route_id)
+        return counts
+
+    def generate_buses(self):
+        self.bus_ids = self.next_id(Bus)
+        self.capacities = []
+        writer = self.writer(Bus, ["id", "bus_number", "bus_type", "capacity", "availability_status"])
+        for index in range(self.buses):
+            capacity = self.rng.choice(CAPACITIES)
+            bus_type = Bus.BusType.AC if self.rng.random() < 0.4 else Bus.BusType.NON_AC
+            # Bagmati zone plates, unique by index
+            bus_number = f"BA {index // 10_000 + 1} KHA {index % 10_000:04d}"
+            writer.add((self.bus_ids + index, bus_number, bus_type, capacity, self.rng.random() < 0.9))
+            self.capacities.append(capacity)
+        writer.flush()
+        self.log(f"{writer.count:,} buses")
+        return writer.count
+
+    def generate_routes(self):
+        self.route_ids = self.next_id(Route)
+        self.demand = []
+        weights = [population for city, population in CITIES]
+        routes = self.writer(
+            Route,
+            ["id", "start_location", "end_location", "stops", "scheduled_time", "start_location_key", "end_location_key"],
+        )
+        route_stops = self.writer(RouteStop, ["id", "route", "sequence", "location", "location_key", "offset_minutes"])
+        route_stop_id = self.next_id(RouteStop)
+        for index in range(self.routes):
+            start, end = self.rng.choices(range(len(CITIES)), weights=weights, k=2)
+            while end == start:
+                end = self.rng.choices(range(len(CITIES)), weights=weights)[0]
+            others = [city for city, population in CITIES if city not in (CITIES[start][0], CITIES[end][0])]
+            stops = self.rng.sample(others, self.rng.randint(0, 3))
+            scheduled_time = datetime.time(5 + self.rng.randrange(17), self.rng.randrange(4) * 15)
+            route_id = self.route_ids + index
+            locations = [CITIES[start][0], *stops, CITIES[end][0]]
+            routes.add(
+                (
+                    route_id,
+                    locations[0],
+                    locations[-1],
+                    ", ".join(stops),
+                    scheduled_time,
+                    normalize_location(locations[0]),
+                    normalize_location(locations[-1]),
+                )
+            )
+            offset = 0
+            for sequence, location in enumerate(locations):
+                route_stops.add((route_stop_id, route_id, sequence, location, normalize_location(location), offset))
+                route_stop_id += 1
+                offset += self.rng.randint(45, 150)
+            # Gravity model: the demand between two cities grows with both populations
+            self.demand.append(CITIES[start][1] * CITIES[end][1] * self.rng.uniform(0.5, 1.5))
+        routes.flush()
+        route_stops.flush()
+        self.log(f"{routes.count:,} routes, {route_stops.count:,} route stops")
+        return routes.count
+
+    def generate_users(self):
+        self.user_ids = self.next_id(User)
+        # Salted with a constant, hashing once for every user
+        password = make_password(PASSWORD, salt=USERNAME_PREFIX)
+        writer = self.writer(User, ["id", "password", "username", "email", "full_name", "date_joined"])
+        for index in range(self.users):
+            username = f"{USERNAME_PREFIX}{index:07d}"
+            email = f"{username}@example.com"
+            writer.add((self.user_ids + index, password, username, email, email, self.now))
+        writer.flush()
+        self.log(f"{writer.count:,} users")
+        return writer.count
+
+    def generate_bookings(self):
+        bus_route_ids = self.next_id(BusRoute)
+        booking_ids = self.next_id(Booking)
+        detail_ids = self.next_id(BookingDetail)
+        bookings = self.writer(Booking, ["id", "user", "booking_time"])
+        details = self.writer(BookingDetail, ["id", "bus_route", "seat_numbers", "seats"])
+        book = self.writer(Booking.book.through, ["id", "booking", "bookingdetail"])
+        # One M2M row per booking detail
+        book_offset = self.next_id(Booking.book.through) - detail_ids
+
+        # Bus route `index` is the trip of bus `index % buses` on day `index // buses`, on route `bus % routes`
+        count = self.buses * self.days
+        buses_per_route = [0] * self.routes
+        for bus in range(self.buses):
+            buses_per_route[bus % self.routes] += 1
+        bus_route_weights = list(
+            itertools.accumulate(
+                self.demand[index % self.buses % self.routes]
+                / buses_per_route[index % self.buses % self.routes]
+                * WEEKDAY_DEMAND[(self.start + datetime.timedelta(days=index // self.buses)).weekday()]
+                for index in range(count)
+            )
+        )
+        user_weights = list(itertools.accumulate(1 / (index + 1) ** 0.6 for index in range(self.users)))
+        details_weights = list(itertools.accumulate(DETAILS_PER_BOOKING))
+        seats_weights = list(itertools.accumulate(SEATS_PER_DETAIL))
+        sold = [0] * count
+
+        for booking in range(self.bookings if count and self.users else 0):
+            booking_time = None
+            for _ in range(self.pick(details_weights) + 1):
+                seat_numbers = self.pick(seats_weights) + 1
+                # A few tries on other bus routes when the one picked is full
+                for _ in range(5):
+                    index = self.pick(bus_route_weights)
+                    if sold[index] + seat_numbers <= self.capacities[index % self.buses]:
+                        break
+                else:
+                    continue
+                seats = list(range(sold[index] + 1, sold[index] + seat_numbers + 1))
+                sold[index] += seat_numbers
+                details.add((detail_ids, bus_route_ids + index, seat_numbers, seats))
+                book.add((book_offset + detail_ids, booking_ids + booking, detail_ids))
+                detail_ids += 1
+                if booking_time is None:
+                    day = self.start + datetime.timedelta(days=index // self.buses)
+                    lead = datetime.timedelta(days=min(self.rng.expovariate(1 / 7), 60))
+                    booking_time = datetime.datetime.combine(day, datetime.time(), tzinfo=datetime.timezone.utc) - lead
+            # Bookings without any seat left are dropped, their id stays unused
+            if booking_time is not None:
+                user = self.pick(user_weights)
+                bookings.add((booking_ids + booking, self.user_ids + user, booking_time.replace(microsecond=0)))
+
+        # Written last, with the seats sold: foreign keys are only checked at commit
+        bus_routes = self.writer(BusRoute, ["id", "bus", "route", "date", "available_seats", "seat_map"])
+        for index in range(count):
+            bus = index % self.buses
+            capacity = self.capacities[bus]
+            full, rest = divmod(sold[index], 8)
+            seat_map = (b"\xff" * full + (bytes([(1 << rest) - 1]) if rest else b"")).ljust((capacity + 7) // 8, b"\0")
+            day = self.start + datetime.timedelta(days=index // self.buses)
+            route_id = self.route_ids + bus % self.routes
+            bus_routes.add((bus_route_ids + index, self.bus_ids + bus, route_id, day, capacity - sold[index], seat_map))
+        for writer in (bookings, details, book, bus_routes):
+            writer.flush()
+        self.log(f"{bus_routes.count:,} bus routes, {bookings.count:,} bookings, {details.count:,} booking details")
+        return {BusRoute: bus_routes.count, Booking: bookings.count, BookingDetail: details.count}
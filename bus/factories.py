@@ -4,7 +4,7 @@ from factory.django import DjangoModelFactory
 
 from user.models import User
 
-from .models import Booking, BookingDetail, Bus, BusRoute, Route
+from .models import Booking, BookingDetail, Bus, BusRoute, Route, ScheduleTemplate
 
 
 class UserFactory(DjangoModelFactory):
@@ -60,3 +60,12 @@ class BookingDetailFactory(DjangoModelFactory):
 
     bus_route = factory.SubFactory(BusRouteFactory)
     seat_numbers = factory.Faker("random_int", min=1, max=5)
+
+
+class ScheduleTemplateFactory(DjangoModelFactory):
+    class Meta:
+        model = ScheduleTemplate
+
+    route = factory.SubFactory(RouteFactory)
+    bus = factory.SubFactory(BusFactory)
+    valid_from = factory.LazyFunction(timezone.localdate)
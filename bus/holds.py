@@ -0,0 +1,348 @@
+import datetime
+import logging
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from redis.exceptions import RedisError
+
+from .inventory import (
+    SeatMap,
+    SeatsUnavailable,
+    SeatTaken,
+    lock_bus_routes,
+    reserve_seats,
+)
+from .models import Booking, BookingDetail, SeatHold
+
+logger = logging.getLogger(__name__)
+
+# Attempts to hold automatically picked seats when concurrent holds take them first
+MAX_HOLD_ATTEMPTS = 3
+
+# KEYS: seats of the bus route, hold, expiry index
+# ARGV: hold id, now (ms), expires at (ms), user id, bus route id, seats...
+# Holds the seats unless one of them is held and not expired, in which case that seat is returned.
+# The hold itself is kept for a day after its expiry in case the sweep does not run.
+REDIS_CREATE_SCRIPT = """
+for i = 6, #ARGV do
+    local owner = redis.call('HGET', KEYS[1], ARGV[i])
+    if owner and tonumber(string.match(owner, ':(%d+)$')) > tonumber(ARGV[2]) then
+        return tonumber(ARGV[i])
+    end
+end
+local value = ARGV[1] .. ':' .. ARGV[3]
+for i = 6, #ARGV do
+    redis.call('HSET', KEYS[1], ARGV[i], value)
+end
+redis.call(
+    'HSET', KEYS[2], 'bus_route', ARGV[5], 'user', ARGV[4], 'seats', table.concat(ARGV, ',', 6),
+    'expires_at', ARGV[3], 'created_at', ARGV[2]
+)
+redis.call('PEXPIREAT', KEYS[2], tonumber(ARGV[3]) + 86400000)
+redis.call('ZADD', KEYS[3], ARGV[3], ARGV[1])
+return 0
+"""
+
+# KEYS: expiry index
+# ARGV: hold key prefix, bus route key prefix, now (ms), limit, hold ids...
+# Releases the given holds, or up to `limit` expired holds when no ids are given.
+REDIS_RELEASE_SCRIPT = """
+local ids = {}
+if #ARGV > 4 then
+    for i = 5, #ARGV do
+        ids[#ids + 1] = ARGV[i]
+    end
+else
+    ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[3], 'LIMIT', 0, ARGV[4])
+end
+for _, id in ipairs(ids) do
+    local hold = redis.call('HMGET', ARGV[1] .. id, 'bus_route', 'seats')
+    if hold[1] then
+        local seats = ARGV[2] .. hold[1]
+        for seat in string.gmatch(hold[2], '%d+') do
+            local owner = redis.call('HGET', seats, seat)
+            if owner and string.sub(owner, 1, #id + 1) == id .. ':' then
+                redis.call('HDEL', seats, seat)
+            end
+        end
+    end
+    redis.call('DEL', ARGV[1] .. id)
+    redis.call('ZREM', KEYS[1], id)
+end
+return #ids
+"""
+
+
+def _ms(value):
+    return int(value.timestamp() * 1000)
+
+
+def _from_ms(value):
+    return datetime.datetime.fromtimestamp(int(value) / 1000, tz=datetime.timezone.utc)
+
+
+class DatabaseHoldStore:
+    """
+    Seat holds stored as `SeatHold` rows. Creating a hold locks its bus route row.
+    """
+
+    def create(self, hold, now):
+        with transaction.atomic():
+            lock_bus_routes([hold.bus_route_id])
+            taken = set(hold.seats) & self.held_seats([hold.bus_route_id], now)[hold.bus_route_id]
+            if taken:
+                raise SeatTaken(hold.bus_route_id, min(taken))
+            hold.save(force_insert=True)
+        return hold
+
+    def get(self, hold_id, now):
+        return SeatHold.objects.filter(pk=hold_id, expires_at__gt=now).first()
+
+    def delete(self, hold):
+        SeatHold.objects.filter(pk=hold.pk).delete()
+
+    def held_seats(self, bus_route_ids, now, exclude=None):
+        held = defaultdict(set)
+        holds = SeatHold.objects.filter(bus_route_id__in=bus_route_ids, expires_at__gt=now).exclude(pk=exclude)
+        for bus_route_id, seats in holds.values_list("bus_route_id", "seats"):
+            held[bus_route_id].update(seats)
+        return held
+
+    def release_expired(self, now, batch_size):
+        released = 0
+        expired = SeatHold.objects.filter(expires_at__lte=now).order_by("expires_at")
+        while pks := list(expired.values_list("pk", flat=True)[:batch_size]):
+            released += SeatHold.objects.filter(pk__in=pks).delete()[0]
+        return released
+
+
+class RedisHoldStore:
+    """
+    Seat holds stored in Redis and created by a script, so holding seats takes no database lock.
+
+    - `seat-holds:route:<bus route id>`: hash of the held seats of a bus route, `seat -> "<hold id>:<expiry ms>"`.
+      Seats of expired holds are free right away, even before the sweep removed them.
+    - `seat-holds:hold:<hold id>`: hash of a hold.
+    - `seat-holds:expiry`: the hold ids sorted by expiry, so the sweep only reads the expired ones.
+    """
+
+    ROUTE_KEY = "seat-holds:route:"
+    HOLD_KEY = "seat-holds:hold:"
+    EXPIRY_KEY = "seat-holds:expiry"
+
+    def __init__(self, client):
+        self.client = client
+        self.create_script = client.register_script(REDIS_CREATE_SCRIPT)
+        self.release_script = client.register_script(REDIS_RELEASE_SCRIPT)
+
+    def create(self, hold, now):
+        taken = self.create_script(
+            keys=[f"{self.ROUTE_KEY}{hold.bus_route_id}", f"{self.HOLD_KEY}{hold.pk}", self.EXPIRY_KEY],
+            args=[str(hold.pk), _ms(now), _ms(hold.expires_at), hold.user_id, hold.bus_route_id, *hold.seats],
+        )
+        if taken:
+            raise SeatTaken(hold.bus_route_id, int(taken))
+        hold.created_at = now
+        return hold
+
+    def get(self, hold_id, now):
+        data = {key.decode(): value.decode() for key, value in self.client.hgetall(f"{self.HOLD_KEY}{hold_id}").items()}
+        if not data or int(data["expires_at"]) <= _ms(now):
+            return None
+        return SeatHold(
+            id=uuid.UUID(str(hold_id)),
+            bus_route_id=int(data["bus_route"]),
+            user_id=int(data["user"]),
+            seats=[int(seat) for seat in data["seats"].split(",")],
+            expires_at=_from_ms(data["expires_at"]),
+            created_at=_from_ms(data["created_at"]),
+        )
+
+    def delete(self, hold):
+        self.release_script(keys=[self.EXPIRY_KEY], args=[self.HOLD_KEY, self.ROUTE_KEY, 0, 0, str(hold.pk)])
+
+    def held_seats(self, bus_route_ids, now, exclude=None):
+        bus_route_ids = list(bus_route_ids)
+        pipeline = self.client.pipeline(transaction=False)
+        for bus_route_id in bus_route_ids:
+            pipeline.hgetall(f"{self.ROUTE_KEY}{bus_route_id}")
+        held, now, exclude = defaultdict(set), _ms(now), str(exclude)
+        for bus_route_id, seats in zip(bus_route_ids, pipeline.execute()):
+            for seat, owner in seats.items():
+                hold_id, expires_at = owner.decode().rsplit(":", 1)
+                if int(expires_at) > now and hold_id != exclude:
+                    held[bus_route_id].add(int(seat))
+        return held
+
+    def release_expired(self, now, batch_size):
+        released = 0
+        while True:
+            count = self.release_script(keys=[self.EXPIRY_KEY], args=[self.HOLD_KEY, self.ROUTE_KEY, _ms(now), batch_size])
+            released += count
+            if count < batch_size:
+                return released
+
+    def clear(self):
+        """
+        Delete every hold, e.g. between tests.
+        """
+        keys = list(self.client.scan_iter(match="seat-holds:*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+class SeatHolds:
+    """
+    Seat holds in Redis when the cache is django-redis, in the database otherwise or while Redis is unavailable.
+
+    Held seats are looked up in both stores, so holds created in the database during a Redis outage are honoured
+    as well.
+    """
+
+    def __init__(self):
+        self.database = DatabaseHoldStore()
+        self._redis = None
+
+    @property
+    def redis(self):
+        if self._redis is None and settings.CACHES["default"]["BACKEND"].startswith("django_redis."):
+            from django_redis import get_redis_connection
+
+            self._redis = RedisHoldStore(get_redis_connection("default"))
+        return self._redis
+
+    def call(self, method, *args):
+        """
+        Call `method` of the Redis store, falling back to the database store.
+        """
+        if self.redis is not None:
+            try:
+                return getattr(self.redis, method)(*args)
+            except RedisError:
+                logger.warning("Redis is unavailable for seat holds, using the database", exc_info=True)
+        return getattr(self.database, method)(*args)
+
+    def held_seats(self, bus_route_ids, now, exclude=None):
+        bus_route_ids = set(bus_route_ids)
+        held = self.database.held_seats(bus_route_ids, now, exclude)
+        if self.redis is not None:
+            try:
+                for bus_route_id, seats in self.redis.held_seats(bus_route_ids, now, exclude).items():
+                    held[bus_route_id] |= seats
+            except RedisError:
+                logger.warning("Redis is unavailable for seat holds, using the database", exc_info=True)
+        return held
+
+    def get(self, hold_id, now):
+        hold = self.call("get", hold_id, now)
+        if hold is None and self.redis is not None:
+            hold = self.database.get(hold_id, now)
+        return hold
+
+    def delete(self, hold):
+        # Holds loaded from the database are saved instances, the ones from Redis are not.
+        if hold._state.adding:
+            self.call("delete", hold)
+        else:
+            self.database.delete(hold)
+
+    def release_expired(self, now, batch_size):
+        released = self.database.release_expired(now, batch_size)
+        if self.redis is not None:
+            released += self.redis.release_expired(now, batch_size)
+        return released
+
+    def clear(self):
+        """
+        Delete the holds of the Redis store, those of the database are rolled back by the test cases.
+        """
+        if self.redis is not None:
+            self.redis.clear()
+
+
+seat_holds = SeatHolds()
+
+
+def held_seats(bus_route_ids, exclude=None):
+    """
+    Return the seats held on the given bus routes by bus route id, without those of the hold `exclude`.
+    """
+    return seat_holds.held_seats(bus_route_ids, timezone.now(), exclude and exclude.pk)
+
+
+def get_hold(hold_id):
+    """
+    Return the hold `hold_id`, or None when it does not exist or expired.
+    """
+    try:
+        hold_id = uuid.UUID(str(hold_id))
+    except ValueError:
+        return None
+    return seat_holds.get(hold_id, timezone.now())
+
+
+def hold_seats(bus_route, user, seat_numbers=None, seats=None, ttl=None):
+    """
+    Hold `seats`, or the lowest `seat_numbers` free seats, of `bus_route` for `ttl` seconds.
+
+    The seat bitmap is read without locking the bus route; the booking that confirms the hold checks the seats
+    again under a row lock.
+
+    Raises
+    ------
+    SeatsUnavailable
+        If the bus route does not have enough free seats or a requested seat is booked or held.
+    """
+    now = timezone.now()
+    seat_map = SeatMap.for_bus_route(bus_route)
+    expires_at = now + datetime.timedelta(seconds=ttl or settings.SEAT_HOLD_TTL)
+    for attempt in range(MAX_HOLD_ATTEMPTS):
+        held = {seat for seat in seat_holds.held_seats([bus_route.pk], now)[bus_route.pk] if seat_map.is_free(seat)}
+        if seats:
+            for seat in seats:
+                if not seat_map.is_free(seat) or seat in held:
+                    raise SeatTaken(bus_route.pk, seat)
+            chosen = seats
+        else:
+            chosen = seat_map.free_seats(seat_numbers, exclude=held)
+            if bus_route.available_seats - len(held) < seat_numbers or len(chosen) < seat_numbers:
+                raise SeatsUnavailable(bus_route.pk, seat_numbers)
+        hold = SeatHold(id=uuid.uuid4(), bus_route=bus_route, user=user, seats=sorted(chosen), expires_at=expires_at)
+        try:
+            return seat_holds.call("create", hold, now)
+        except SeatTaken:
+            # Another hold took one of the seats meanwhile, pick other seats unless they were requested
+            if seats or attempt == MAX_HOLD_ATTEMPTS - 1:
+                raise
+
+
+def release_hold(hold):
+    seat_holds.delete(hold)
+
+
+def confirm_hold(hold):
+    """
+    Book the seats of `hold` for its user and release the hold.
+
+    Raises
+    ------
+    SeatsUnavailable
+        If the seats were booked meanwhile, e.g. after the hold expired.
+    """
+    with transaction.atomic():
+        detail = BookingDetail.objects.create(bus_route_id=hold.bus_route_id, seat_numbers=len(hold.seats), seats=hold.seats)
+        booking = Booking.objects.create(user_id=hold.user_id)
+        booking.book.add(detail)
+        reserve_seats([detail], hold=hold)
+        transaction.on_commit(lambda: release_hold(hold))
+    return booking
+
+
+def release_expired_holds(batch_size=1000):
+    """
+    Delete the expired holds, reading only those and not every hold.
+    """
+    return seat_holds.release_expired(timezone.now(), batch_size)
@@ -0,0 +1,219 @@
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from .availability import invalidate_calendar_months
+from .models import BookingDetail, BusRoute
+from .occupancy import record_bookings
+
+
+class SeatsUnavailable(Exception):
+    """
+    Raised when a bus route cannot satisfy a seat reservation.
+
+    Attributes
+    ----------
+    bus_route_id : int
+        The bus route that could not satisfy the request.
+    requested : int
+        Number of seats that were requested on the bus route.
+    """
+
+    def __init__(self, bus_route_id, requested, message=None):
+        self.bus_route_id = bus_route_id
+        self.requested = requested
+        super().__init__(
+            message
+            or _("Not enough seats available on bus route %(bus_route)s to book %(requested)s seats.")
+            % {"requested": requested, "bus_route": bus_route_id}
+        )
+
+
+class SeatTaken(SeatsUnavailable):
+    """
+    Raised when a specific seat is outside the bus or already booked.
+    """
+
+    def __init__(self, bus_route_id, seat):
+        self.seat = seat
+        super().__init__(
+            bus_route_id,
+            1,
+            _("Seat %(seat)s is not available on bus route %(bus_route)s.") % {"seat": seat, "bus_route": bus_route_id},
+        )
+
+
+class SeatMap:
+    """
+    Bitmap of the booked seats of a bus route.
+
+    Seat `n` (seats are numbered from 1) is booked when bit `(n - 1) % 8` of byte `(n - 1) // 8` is set,
+    so a 60 seat bus fits in 8 bytes and every seat check is a single bit test.
+    """
+
+    def __init__(self, data, capacity):
+        self.capacity = capacity
+        size = (capacity + 7) // 8
+        self.data = bytearray(bytes(data or b"")[:size].ljust(size, b"\0"))
+
+    @classmethod
+    def for_bus_route(cls, bus_route):
+        return cls(bus_route.seat_map, bus_route.bus.capacity)
+
+    def __bytes__(self):
+        return bytes(self.data)
+
+    def is_valid(self, seat):
+        return 1 <= seat <= self.capacity
+
+    def is_taken(self, seat):
+        index = seat - 1
+        return bool(self.data[index >> 3] & (1 << (index & 7)))
+
+    def is_free(self, seat):
+        return self.is_valid(seat) and not self.is_taken(seat)
+
+    def take(self, seats):
+        for seat in seats:
+            index = seat - 1
+            self.data[index >> 3] |= 1 << (index & 7)
+
+    def release(self, seats):
+        for seat in seats:
+            if self.is_valid(seat):
+                index = seat - 1
+                self.data[index >> 3] &= ~(1 << (index & 7))
+
+    def free_seats(self, count, exclude=()):
+        """
+        Return the lowest `count` free seat numbers not in `exclude` (fewer if the bus is full).
+        """
+        seats = []
+        for byte_index, byte in enumerate(self.data):
+            if byte == 0xFF:
+                continue
+            for bit in range(8):
+                seat = (byte_index << 3) + bit + 1
+                if seat > self.capacity or len(seats) == count:
+                    return seats
+                if not byte & (1 << bit) and seat not in exclude:
+                    seats.append(seat)
+        return seats
+
+
+def lock_bus_routes(bus_route_ids):
+    """
+    Lock the given bus routes for the rest of the transaction and return them by id.
+
+    Rows are always locked in ascending id order, so concurrent multi-leg bookings acquire them in the same
+    order and cannot deadlock each other.
+    """
+    bus_routes = (
+        BusRoute.objects.select_for_update(of=("self",))
+        .select_related("bus")
+        .filter(pk__in=set(bus_route_ids))
+        .order_by("pk")
+    )
+    return {bus_route.pk: bus_route for bus_route in bus_routes}
+
+
+def _has_explicit_seats(detail):
+    return bool(detail.seats) and len(detail.seats) == detail.seat_numbers
+
+
+def allocate_seats(details, bus_routes, seat_maps, held=None):
+    """
+    Assign the seats of `details` on locked `bus_routes` and their `seat_maps`, in memory and all or nothing.
+
+    Details that name their `seats` get exactly those seats; the others are assigned the lowest free seat
+    numbers. Seats in `held` (seat holds by bus route id, see `bus.holds`) are not available. The details do
+    not have to be saved. Returns the details whose seats were assigned.
+
+    Raises
+    ------
+    SeatsUnavailable
+        If a bus route does not have enough seats left or a requested seat is already taken. The bus routes
+        and seat maps are left as they were.
+    """
+    affected = {detail.bus_route_id for detail in details}
+    snapshot = {pk: (bytes(seat_maps[pk]), bus_routes[pk].available_seats) for pk in affected}
+    assigned = []
+    try:
+        for detail in sorted(details, key=lambda detail: (detail.bus_route_id, detail.pk or 0)):
+            bus_route, seat_map = bus_routes[detail.bus_route_id], seat_maps[detail.bus_route_id]
+            held_seats = {seat for seat in (held or {}).get(detail.bus_route_id, ()) if seat_map.is_free(seat)}
+            if bus_route.available_seats - len(held_seats) < detail.seat_numbers:
+                raise SeatsUnavailable(bus_route.pk, detail.seat_numbers)
+            if _has_explicit_seats(detail):
+                for seat in detail.seats:
+                    if not seat_map.is_free(seat) or seat in held_seats:
+                        raise SeatTaken(bus_route.pk, seat)
+            else:
+                detail.seats = seat_map.free_seats(detail.seat_numbers, exclude=held_seats)
+                if len(detail.seats) < detail.seat_numbers:
+                    raise SeatsUnavailable(bus_route.pk, detail.seat_numbers)
+                assigned.append(detail)
+            seat_map.take(detail.seats)
+            bus_route.available_seats -= detail.seat_numbers
+    except SeatsUnavailable:
+        for pk, (data, available_seats) in snapshot.items():
+            seat_maps[pk].data = bytearray(data)
+            bus_routes[pk].available_seats = available_seats
+        raise
+    return assigned
+
+
+def save_bus_routes(bus_routes, seat_maps):
+    """
+    Write the seat maps and available seats of locked `bus_routes` back in a single query.
+    """
+    now = timezone.now()
+    for pk, bus_route in bus_routes.items():
+        bus_route.seat_map = bytes(seat_maps[pk])
+        # `bulk_update` skips the `auto_now` of `updated_at`
+        bus_route.updated_at = now
+    BusRoute.objects.bulk_update(bus_routes.values(), ["seat_map", "available_seats", "updated_at"])
+    # `bulk_update` sends no signals
+    transaction.on_commit(lambda: invalidate_calendar_months(bus_routes.values()))
+
+
+def reserve_seats(details, hold=None):
+    """
+    Book the seats of saved `BookingDetail` instances, all or nothing.
+
+    Seats are assigned by `allocate_seats`, around the seats held by others than `hold`, and the assigned seat
+    numbers are written back to the details. Both the seat bitmap and `available_seats` of every bus route are
+    updated under a row lock.
+
+    Raises
+    ------
+    SeatsUnavailable
+        If a bus route does not have enough seats left or a requested seat is already taken.
+    """
+    from .holds import held_seats  # holds build on the inventory
+
+    details = list(details)
+    with transaction.atomic():
+        bus_routes = lock_bus_routes(detail.bus_route_id for detail in details)
+        seat_maps = {pk: SeatMap.for_bus_route(bus_route) for pk, bus_route in bus_routes.items()}
+        held = held_seats(bus_routes, exclude=hold)
+        assigned = allocate_seats(details, bus_routes, seat_maps, held)
+        save_bus_routes(bus_routes, seat_maps)
+        record_bookings(details, bus_routes)
+        if assigned:
+            BookingDetail.objects.bulk_update(assigned, ["seats"])
+
+
+def release_seats(details):
+    """
+    Give the seats of `BookingDetail` instances back to their bus routes, e.g. when a booking is cancelled.
+    """
+    details = list(details)
+    with transaction.atomic():
+        bus_routes = lock_bus_routes(detail.bus_route_id for detail in details)
+        seat_maps = {pk: SeatMap.for_bus_route(bus_route) for pk, bus_route in bus_routes.items()}
+        for detail in details:
+            seat_maps[detail.bus_route_id].release(detail.seats)
+            bus_routes[detail.bus_route_id].available_seats += detail.seat_numbers
+        save_bus_routes(bus_routes, seat_maps)
+        record_bookings(details, bus_routes, sign=-1)
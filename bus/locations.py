@@ -0,0 +1,211 @@
+import bisect
+import difflib
+import heapq
+import re
+import threading
+from dataclasses import dataclass
+
+from django.contrib.postgres.lookups import TrigramSimilar
+from django.contrib.postgres.search import TrigramSimilarity
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, F, Max, Min
+
+from rental.models import City
+
+from .models import RouteStop
+from .utils import normalize_location
+
+LOCATIONS_VERSION_CACHE_KEY = "bus:locations:version"
+MAX_SUGGESTIONS = 20
+# Shorter queries match too many names by similarity to be useful
+MIN_FUZZY_LENGTH = 3
+# Minimum `difflib` similarity of the names suggested for a typo, when not on PostgreSQL
+FUZZY_CUTOFF = 0.75
+
+# Other spellings of the cities, in Devanagari and in English, by location key
+LOCATION_ALIASES = {
+    "kathmandu": ["काठमाडौं", "काठमाडौँ", "ktm", "kantipur"],
+    "pokhara": ["पोखरा"],
+    "lalitpur": ["ललितपुर", "patan"],
+    "bhaktapur": ["भक्तपुर", "bhadgaon", "khwopa"],
+    "biratnagar": ["विराटनगर"],
+    "birgunj": ["वीरगञ्ज", "birganj"],
+    "dharan": ["धरान"],
+    "bharatpur": ["भरतपुर"],
+    "butwal": ["बुटवल"],
+    "hetauda": ["हेटौंडा", "hetaunda"],
+    "janakpur": ["जनकपुर", "janakpurdham"],
+    "dhangadhi": ["धनगढी"],
+    "nepalgunj": ["नेपालगन्ज", "nepalganj"],
+    "itahari": ["इटहरी"],
+    "tulsipur": ["तुलसीपुर"],
+    "siddharthanagar": ["सिद्धार्थनगर", "भैरहवा", "bhairahawa"],
+    "ghorahi": ["घोराही"],
+    "damak": ["दमक"],
+    "rajbiraj": ["राजविराज"],
+    "lahan": ["लहान"],
+    "inaruwa": ["इनरुवा"],
+    "tikapur": ["टीकापुर"],
+    "kirtipur": ["कीर्तिपुर"],
+    "bhadrapur": ["भद्रपुर"],
+    "mechinagar": ["मेचीनगर", "kakarbhitta", "kakarvitta"],
+}
+
+
+@dataclass(frozen=True)
+class Location:
+    """
+    A distinct location of the routes or of the rental cities, with the number of routes stopping there.
+    """
+
+    key: str
+    name: str
+    routes: int
+
+
+def _terms(key):
+    """
+    Return the strings a location is found by the prefixes of: its key and the rest of it from every later word,
+    e.g. "kathmandu (ring road)" -> ["kathmandu (ring road)", "ring road)", "road)"].
+    """
+    return [key] + [key[match.start() :] for match in re.finditer(r"\w+", key) if match.start() > 0]
+
+
+class LocationIndex:
+    """
+    Prefix index of the distinct locations, and of their aliases.
+
+    The locations are ranked by number of routes, then by name, and the (term, rank) pairs are kept sorted by
+    term: the terms starting with a prefix are a contiguous slice found by binary search, which is as fast as a
+    trie in Python for a fraction of its memory, and the best suggestions are the smallest ranks of the slice.
+    """
+
+    def __init__(self, locations, aliases=None):
+        self.locations = sorted(locations, key=lambda location: (-location.routes, location.name))
+        self.ranks = {location.key: rank for rank, location in enumerate(self.locations)}
+        entries = []
+        for rank, location in enumerate(self.locations):
+            for alias in [location.key, *(aliases or {}).get(location.key, ())]:
+                entries += [(term, rank) for term in _terms(normalize_location(alias))]
+        entries.sort()
+        self.terms = [term for term, _ in entries]
+        self.term_ranks = [rank for _, rank in entries]
+        self.distinct_terms = list(dict.fromkeys(self.terms))
+
+    @classmethod
+    def build(cls):
+        """
+        Index the stops of all routes, start and end locations included, and the cities of the rental reservations.
+        """
+        stops = (
+            RouteStop.objects.values("location_key")
+            .annotate(name=Min("location"), routes=Count("route_id", distinct=True))
+            .values_list("location_key", "name", "routes")
+            .order_by()
+        )
+        locations = {key: Location(key, name, routes) for key, name, routes in stops if key}
+        for key, name in City.objects.values_list("key", "name"):
+            locations.setdefault(key, Location(key, name, 0))
+        return cls(locations.values(), LOCATION_ALIASES)
+
+    def search(self, query, limit=10):
+        """
+        Return up to `limit` locations with a name or an alias starting with `query`, or with a word of it that does,
+        the most served ones first.
+        """
+        prefix = normalize_location(query)
+        if not prefix:
+            return []
+        start = bisect.bisect_left(self.terms, prefix)
+        # The last code point sorts after any continuation of the prefix
+        end = bisect.bisect_left(self.terms, prefix + "\U0010ffff", start)
+        ranks = heapq.nsmallest(limit, set(self.term_ranks[start:end]))
+        return [self.locations[rank] for rank in ranks]
+
+    def similar(self, query, limit=10):
+        """
+        Return up to `limit` locations with a name or an alias similar to `query`, the most similar ones first.
+        """
+        matches = difflib.get_close_matches(normalize_location(query), self.distinct_terms, n=limit, cutoff=FUZZY_CUTOFF)
+        ranks = {}
+        for term in matches:
+            start = bisect.bisect_left(self.terms, term)
+            for rank in self.term_ranks[start : bisect.bisect_right(self.terms, term, start)]:
+                ranks.setdefault(rank, None)
+        return [self.locations[rank] for rank in list(ranks)[:limit]]
+
+    def get(self, key):
+        rank = self.ranks.get(key)
+        return None if rank is None else self.locations[rank]
+
+
+class LocationIndexCache:
+    """
+    Per-process cache of the location index.
+
+    Signals bump a version number in the shared Django cache whenever routes or their stops change, so every process
+    rebuilds its index lazily after the next change.
+    """
+
+    def __init__(self):
+        self.cached = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        version = cache.get(LOCATIONS_VERSION_CACHE_KEY, 0)
+        cached = self.cached
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        index = LocationIndex.build()
+        with self.lock:
+            self.cached = (version, index)
+        return index
+
+    def clear(self):
+        with self.lock:
+            self.cached = None
+
+
+locations = LocationIndexCache()
+
+
+def invalidate_locations():
+    try:
+        cache.incr(LOCATIONS_VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(LOCATIONS_VERSION_CACHE_KEY, 1, timeout=None)
+    locations.clear()
+
+
+def _similar_stop_keys(key, limit):
+    """
+    Return the keys of the route stops most similar to `key`, with the trigram GIN index of PostgreSQL.
+    """
+    return list(
+        RouteStop.objects.filter(TrigramSimilar(F("location_key"), key))
+        .values("location_key")
+        .annotate(similarity=Max(TrigramSimilarity("location_key", key)))
+        .order_by("-similarity", "location_key")
+        .values_list("location_key", flat=True)[:limit]
+    )
+
+
+def autocomplete_locations(query, limit=10):
+    """
+    Suggest up to `limit` locations for what a user typed so far.
+
+    Locations starting with `query` come from the in-memory index, without querying the database. When there is
+    none, likely because of a typo, the locations most similar to `query` are suggested instead: by trigram
+    similarity of the route stops on PostgreSQL, by `difflib` similarity of the indexed names and aliases on other
+    databases.
+    """
+    index = locations.get()
+    suggestions = index.search(query, limit)
+    key = normalize_location(query)
+    if suggestions or len(key) < MIN_FUZZY_LENGTH:
+        return suggestions
+    if connection.vendor == "postgresql":
+        # Stops added since the index was built are left out until it is rebuilt
+        return [location for location in map(index.get, _similar_stop_keys(key, limit)) if location is not None]
+    return index.similar(key, limit)
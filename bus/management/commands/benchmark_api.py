@@ -0,0 +1,274 @@
+import datetime
+import json
+import queue
+import random
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.utils import timezone
+
+from bus.dataset import PASSWORD, USERNAME_PREFIX, DatasetGenerator
+from bus.models import Booking, Bus, BusRoute, Route
+from bus.utils import percentile
+from rental.models import City, Reservation
+from review.models import FAQ, FeedbackReview
+from user.models import User
+
+RESERVATION_EMAIL = "benchmark@example.com"
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the API endpoints on a deterministic dataset and record their latency percentiles, queries per "
+        "request and throughput as JSON, to compare with a baseline using benchmark_compare"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=100, help="Requests per scenario.")
+        parser.add_argument("--concurrency", type=int, default=1, help="Requests in flight, one thread each.")
+        parser.add_argument("--seed", type=int, default=0, help="Seed of the dataset and of the requests.")
+        parser.add_argument("--buses", type=int, default=50, help="Buses of the generated dataset.")
+        parser.add_argument("--routes", type=int, default=20, help="Routes of the generated dataset.")
+        parser.add_argument("--days", type=int, default=30, help="Days of bus routes of the generated dataset.")
+        parser.add_argument("--users", type=int, default=100, help="Users of the generated dataset.")
+        parser.add_argument("--bookings", type=int, default=2000, help="Bookings of the generated dataset.")
+        parser.add_argument(
+            "--no-seed", action="store_true", help="Benchmark the existing dataset, e.g. one loaded with load_bus."
+        )
+        parser.add_argument("--scenario", action="append", help="Only run this scenario (repeatable).")
+        parser.add_argument("--output", help="Write the results to this JSON file, e.g. a baseline.")
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1 or options["concurrency"] < 1:
+            raise CommandError("--requests and --concurrency must be at least 1.")
+        if not options["no_seed"]:
+            started = time.perf_counter()
+            DatasetGenerator(
+                buses=options["buses"],
+                routes=options["routes"],
+                days=options["days"],
+                users=options["users"],
+                bookings=options["bookings"],
+                seed=options["seed"],
+                start=timezone.localdate(),
+            ).generate()
+            self.stdout.write(f"Generated the dataset in {time.perf_counter() - started:.1f}s.")
+
+        self.rng = random.Random(options["seed"])
+        self.load_ids()
+        scenarios = self.scenarios()
+        unknown = set(options["scenario"] or []) - set(scenarios)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}. Choose from {', '.join(scenarios)}.")
+
+        results = {}
+        try:
+            for name, (plan, expected_status) in scenarios.items():
+                if options["scenario"] and name not in options["scenario"]:
+                    continue
+                requests = [plan() for _ in range(options["requests"])]
+                results[name] = self.measure(name, requests, expected_status, options["concurrency"])
+                self.stdout.write(
+                    f"{name:<24} p50={results[name]['p50_ms']:8.2f}ms p95={results[name]['p95_ms']:8.2f}ms "
+                    f"p99={results[name]['p99_ms']:8.2f}ms queries={results[name]['queries']:6.1f} "
+                    f"{results[name]['throughput']:8.1f} req/s"
+                )
+        finally:
+            Reservation.objects.filter(email=RESERVATION_EMAIL).delete()
+
+        if options["output"]:
+            report = {
+                "created": timezone.now().isoformat(),
+                "database": connection.vendor,
+                "options": {
+                    option: options[option]
+                    for option in ("requests", "concurrency", "seed", "buses", "routes", "days", "users", "bookings")
+                },
+                "scenarios": results,
+            }
+            with open(options["output"], "w") as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote the results to {options['output']}."))
+
+    def load_ids(self):
+        """
+        Load the rows the requests pick from, in a stable order so the same seed gives the same requests.
+        """
+        self.bus_ids = list(Bus.objects.order_by("pk").values_list("pk", flat=True))
+        self.route_ids = list(Route.objects.order_by("pk").values_list("pk", flat=True))
+        self.booking_ids = list(Booking.objects.order_by("pk").values_list("pk", flat=True))
+        self.trips = list(
+            BusRoute.objects.order_by("pk").values_list(
+                "pk", "route__start_location", "route__end_location", "date", "available_seats"
+            )
+        )
+        self.users = list(
+            User.objects.filter(username__startswith=USERNAME_PREFIX).order_by("pk").values_list("pk", "email")
+        )
+        if not (self.bus_ids and self.route_ids and self.trips and self.users):
+            raise CommandError("The dataset has no buses, routes, bus routes or users, generate one first.")
+        # The occupancy and user endpoints are for staff, removed with the generated users
+        self.admin, _ = User.objects.get_or_create(
+            username=f"{USERNAME_PREFIX}admin",
+            defaults={"email": f"{USERNAME_PREFIX}admin@example.com", "is_staff": True},
+        )
+        self.feedback_review_ids = list(FeedbackReview.objects.order_by("pk").values_list("pk", flat=True))
+        self.faq_ids = list(FAQ.objects.order_by("pk").values_list("pk", flat=True))
+        self.city_keys = list(City.objects.order_by("pk").values_list("pk", flat=True))
+
+    def scenarios(self):
+        """
+        Return the (request planner, expected status) of every scenario by name. A planner returns the (method,
+        path, data) of one request.
+        """
+        rng = self.rng
+
+        def get(path, params=None):
+            return lambda: ("get", path() if callable(path) else path, params() if callable(params) else params)
+
+        def trip_query():
+            _, start_location, end_location, date, _ = rng.choice(self.trips)
+            return {"from": start_location, "to": end_location, "date": date.isoformat()}
+
+        def location_prefix():
+            # A keystroke of a user typing a start location
+            location = rng.choice(self.trips)[1]
+            return {"q": location[: rng.randint(1, len(location))]}
+
+        scenarios = {
+            "buses-list": (get("/api/v1/buses/"), 200),
+            "buses-retrieve": (get(lambda: f"/api/v1/buses/{rng.choice(self.bus_ids)}/"), 200),
+            "routes-list": (get("/api/v1/routes/"), 200),
+            "routes-retrieve": (get(lambda: f"/api/v1/routes/{rng.choice(self.route_ids)}/"), 200),
+            "routes-calendar": (get(lambda: f"/api/v1/routes/{rng.choice(self.route_ids)}/calendar/"), 200),
+            "bus-routes-list": (get("/api/v1/bus-routes/"), 200),
+            "bus-routes-retrieve": (get(lambda: f"/api/v1/bus-routes/{rng.choice(self.trips)[0]}/"), 200),
+            "bus-routes-seat-map": (get(lambda: f"/api/v1/bus-routes/{rng.choice(self.trips)[0]}/seat-map/"), 200),
+            "bookings-list": (get("/api/v1/bookings/"), 200),
+            "booking-details-list": (get("/api/v1/booking-details/"), 200),
+            "users-list": (get("/api/v1/users/"), 200),
+            "occupancy-list": (get("/api/v1/occupancy/"), 200),
+            "feedback-reviews-list": (get("/api/v1/feedback-reviews/"), 200),
+            "faqs-list": (get("/api/v1/faqs/"), 200),
+            "search": (get("/api/v1/search/", trip_query), 200),
+            "journeys": (get("/api/v1/journeys/", trip_query), 200),
+            "locations-autocomplete": (get("/api/v1/locations/autocomplete/", location_prefix), 200),
+            "booking-create": (self.plan_booking, 201),
+            "reservation-create": (self.plan_reservation, 201),
+            "login": (lambda: ("post", "/login", {"email": rng.choice(self.users)[1], "password": PASSWORD}), 200),
+        }
+        if self.booking_ids:
+            scenarios["bookings-retrieve"] = (get(lambda: f"/api/v1/bookings/{rng.choice(self.booking_ids)}/"), 200)
+        if self.feedback_review_ids:
+            scenarios["feedback-reviews-retrieve"] = (
+                get(lambda: f"/api/v1/feedback-reviews/{rng.choice(self.feedback_review_ids)}/"),
+                200,
+            )
+        if self.faq_ids:
+            scenarios["faqs-retrieve"] = (get(lambda: f"/api/v1/faqs/{rng.choice(self.faq_ids)}/"), 200)
+        return scenarios
+
+    def plan_booking(self):
+        """
+        Book one seat on a bus route that still has one, counting the seats taken by the planned bookings.
+        """
+        trips = [index for index, trip in enumerate(self.trips) if trip[4] > 0]
+        if not trips:
+            raise CommandError("Every bus route is full, generate fewer bookings.")
+        index = self.rng.choice(trips)
+        bus_route_id, *trip, available_seats = self.trips[index]
+        self.trips[index] = (bus_route_id, *trip, available_seats - 1)
+        return (
+            "post",
+            "/api/v1/bookings/",
+            {
+                "user": self.rng.choice(self.users)[0],
+                "book": [{"bus_route": bus_route_id, "seat_numbers": 1}],
+            },
+        )
+
+    def plan_reservation(self):
+        journey_from, journey_to = self.rng.sample(self.city_keys, 2)
+        data = {
+            "name": "Benchmark",
+            "mobile_no": "+9779853503420",
+            "email": RESERVATION_EMAIL,
+            "date_of_travel": (timezone.localdate() + datetime.timedelta(days=self.rng.randint(1, 30))).isoformat(),
+            "duration_type": Reservation.DurationType.DAY_BASED,
+            "passenger_numbers": self.rng.randint(1, 10),
+            "journey_from": journey_from,
+            "journey_to": journey_to,
+            "vehicle_type": Reservation.VehicleType.BUS,
+        }
+        return "post", "/api/v1/reservations/", data
+
+    def measure(self, name, requests, expected_status, concurrency):
+        """
+        Send the planned `requests`, `concurrency` at a time, and return their latency percentiles in ms, mean
+        queries per request and requests/sec.
+        """
+        pending = queue.SimpleQueue()
+        for request in requests:
+            pending.put(request)
+        latencies, queries, failures = [], [], []
+        # Queries run so far by thread
+        counter = {}
+
+        def count_query(execute, sql, params, many, context):
+            counter[threading.get_ident()] += 1
+            return execute(sql, params, many, context)
+
+        def work():
+            client = Client(SERVER_NAME="localhost")
+            client.force_login(self.admin)
+            counter[threading.get_ident()] = 0
+            try:
+                with connection.execute_wrapper(count_query):
+                    while True:
+                        try:
+                            method, path, data = pending.get_nowait()
+                        except queue.Empty:
+                            return
+                        executed = counter[threading.get_ident()]
+                        started = time.perf_counter()
+                        if method == "get":
+                            response = client.get(path, data)
+                        else:
+                            response = client.post(path, data, content_type="application/json")
+                        latencies.append((time.perf_counter() - started) * 1000)
+                        queries.append(counter[threading.get_ident()] - executed)
+                        if response.status_code != expected_status:
+                            failures.append(f"{method.upper()} {path} {response.status_code}: {response.content[:200]}")
+            finally:
+                if threading.current_thread() is not threading.main_thread():
+                    connection.close()
+
+        started = time.perf_counter()
+        if concurrency == 1:
+            # In the calling thread, which also lets tests run it inside their transaction
+            work()
+        else:
+            threads = [threading.Thread(target=work) for _ in range(concurrency)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        elapsed = time.perf_counter() - started
+        if failures:
+            raise CommandError(f"{name}: {len(failures)} requests failed, e.g. {failures[0]}")
+
+        return {
+            "requests": len(latencies),
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+            "mean_ms": round(statistics.mean(latencies), 3),
+            "max_ms": round(max(latencies), 3),
+            "queries": round(statistics.mean(queries), 2),
+            "max_queries": max(queries),
+            "throughput": round(len(latencies) / elapsed, 2),
+        }
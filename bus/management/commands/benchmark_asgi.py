@@ -0,0 +1,154 @@
+import asyncio
+import contextlib
+import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import Client, override_settings
+
+from bus.models import Bus, BusRoute, Route
+
+BUS_NUMBER_PREFIX = "ASGI"
+LOCATION_PREFIX = "Asgi City"
+ENDPOINTS = [
+    "/api/v1/bus-routes/?limit=20",
+    "/api/v1/search/?from=Asgi%20City%20A&to=Asgi%20City%20B&date=2099-01-01",
+    "/api/v1/faqs/",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the throughput of the sync views on a fixed number of workers (like uWSGI sync workers) with the "
+        "async views of the ASGI deployment, on an artificially slow database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100, help="Bus routes to create.")
+        parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint and mode.")
+        parser.add_argument("--workers", type=int, default=4, help="Sync workers serving the WSGI mode.")
+        parser.add_argument("--concurrency", type=int, default=50, help="Requests in flight in both modes.")
+        parser.add_argument("--delay", type=float, default=50, help="Milliseconds added to every query.")
+        parser.add_argument("--keep", action="store_true", help="Keep the generated data after the run.")
+
+    def handle(self, *args, **options):
+        self.seed(options["rows"])
+        try:
+            for url in ENDPOINTS:
+                with self.slow_database(options["delay"] / 1000):
+                    sync_rate = self.measure_wsgi(url, options["requests"], options["workers"])
+                    with override_settings(ROOT_URLCONF="main.asgi_urls"):
+                        async_rate = asyncio.run(self.measure_asgi(url, options["requests"], options["concurrency"]))
+                self.stdout.write(
+                    f"{url}: {options['workers']} sync workers {sync_rate:,.1f} req/s -> "
+                    f"ASGI {async_rate:,.1f} req/s ({async_rate / sync_rate:.1f}x)"
+                )
+        finally:
+            if not options["keep"]:
+                Bus.objects.filter(bus_number__startswith=BUS_NUMBER_PREFIX).delete()
+                Route.objects.filter(start_location__startswith=LOCATION_PREFIX).delete()
+
+    @contextlib.contextmanager
+    def slow_database(self, delay):
+        """
+        Add `delay` seconds to every query, on the connections of every thread.
+        """
+
+        def slow_query(execute, sql, params, many, context):
+            time.sleep(delay)
+            return execute(sql, params, many, context)
+
+        def add_delay(sender, connection, **kwargs):
+            # Also sent when a closed connection reconnects
+            if slow_query not in connection.execute_wrappers:
+                connection.execute_wrappers.append(slow_query)
+
+        # Requests run their queries in other threads, whose connections are opened on demand
+        connections.close_all()
+        connection_created.connect(add_delay)
+        try:
+            yield
+        finally:
+            connection_created.disconnect(add_delay)
+            for alias in connections:
+                if slow_query in connections[alias].execute_wrappers:
+                    connections[alias].execute_wrappers.remove(slow_query)
+            connections.close_all()
+
+    def measure_wsgi(self, url, requests, workers):
+        """
+        Return the requests/sec of the sync views, `workers` requests at a time.
+        """
+
+        def get(_):
+            try:
+                return Client(SERVER_NAME="localhost").get(url).status_code
+            finally:
+                # Like `CONN_MAX_AGE = 0`, which the test client does not apply
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            statuses = list(executor.map(get, range(requests)))
+        self.check_statuses(url, statuses)
+        return requests / (time.perf_counter() - started)
+
+    async def measure_asgi(self, url, requests, concurrency):
+        """
+        Return the requests/sec of the ASGI application, `concurrency` requests at a time.
+        """
+        application = ASGIHandler()
+        semaphore = asyncio.Semaphore(concurrency)
+        parts = urlsplit(url)
+
+        async def get():
+            scope = {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": "1.1",
+                "method": "GET",
+                "scheme": "http",
+                "path": parts.path,
+                "query_string": parts.query.encode(),
+                "headers": [(b"host", b"localhost")],
+                "server": ("localhost", 80),
+            }
+            response = {}
+
+            async def receive():
+                return {"type": "http.request", "body": b"", "more_body": False}
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    response["status"] = message["status"]
+
+            async with semaphore:
+                await application(scope, receive, send)
+            return response["status"]
+
+        started = time.perf_counter()
+        statuses = await asyncio.gather(*(get() for _ in range(requests)))
+        self.check_statuses(url, statuses)
+        return requests / (time.perf_counter() - started)
+
+    def check_statuses(self, url, statuses):
+        failed = [status for status in statuses if status != 200]
+        if failed:
+            raise CommandError(f"{url}: {len(failed)} requests failed with status {failed[0]}.")
+
+    def seed(self, rows):
+        buses = Bus.objects.bulk_create(Bus(bus_number=f"{BUS_NUMBER_PREFIX}{i:05d}", capacity=40) for i in range(rows))
+        route = Route.objects.create(
+            start_location=f"{LOCATION_PREFIX} A",
+            end_location=f"{LOCATION_PREFIX} B",
+            stops="",
+            scheduled_time=datetime.time(8),
+        )
+        BusRoute.objects.bulk_create(
+            BusRoute(bus=bus, route=route, date=datetime.date(2099, 1, 1), available_seats=40) for bus in buses
+        )
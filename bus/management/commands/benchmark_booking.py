@@ -0,0 +1,93 @@
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from bus.models import Booking, BookingDetail, Bus, BusRoute, Route
+from user.models import User
+
+
+class Command(BaseCommand):
+    help = "Stress test concurrent bookings against a single bus route and verify nothing is oversold"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16, help="Number of concurrent booking clients.")
+        parser.add_argument("--attempts", type=int, default=50, help="Booking attempts per client.")
+        parser.add_argument("--capacity", type=int, default=60, help="Seats on the bus route under test.")
+        parser.add_argument("--seats", type=int, default=1, help="Seats requested by every booking.")
+        parser.add_argument("--keep", action="store_true", help="Keep the generated data after the run.")
+
+    def handle(self, *args, **options):
+        if connection.vendor == "sqlite":
+            raise CommandError("Concurrent bookings need a database with row level locking (e.g. PostgreSQL).")
+
+        tag = uuid.uuid4().hex[:8]
+        bus = Bus.objects.create(bus_number=f"BENCH-{tag}", capacity=options["capacity"])
+        route = Route.objects.create(
+            start_location=f"Bench {tag} A",
+            end_location=f"Bench {tag} B",
+            stops="",
+            scheduled_time=timezone.now().time(),
+        )
+        bus_route = BusRoute.objects.create(
+            bus=bus, route=route, date=timezone.now().date(), available_seats=options["capacity"]
+        )
+        user = User.objects.create_user(username=f"bench-{tag}", email=f"bench-{tag}@example.com", password="password")
+        payload = {"user": user.id, "book": [{"bus_route": bus_route.id, "seat_numbers": options["seats"]}]}
+
+        results = {"created": 0, "rejected": 0, "errors": 0}
+        lock = threading.Lock()
+        barrier = threading.Barrier(options["threads"])
+
+        def worker():
+            client = APIClient(SERVER_NAME="localhost")
+            counts = {"created": 0, "rejected": 0, "errors": 0}
+            barrier.wait()
+            try:
+                for _ in range(options["attempts"]):
+                    response = client.post("/api/v1/bookings/", payload, format="json")
+                    if response.status_code == 201:
+                        counts["created"] += 1
+                    elif response.status_code == 400 and "book" in response.data:
+                        counts["rejected"] += 1
+                    else:
+                        counts["errors"] += 1
+            finally:
+                connection.close()
+            with lock:
+                for key, value in counts.items():
+                    results[key] += value
+
+        threads = [threading.Thread(target=worker) for _ in range(options["threads"])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        bus_route.refresh_from_db()
+        booked_seats = BookingDetail.objects.filter(bus_route=bus_route).aggregate(total=Sum("seat_numbers"))["total"] or 0
+        attempts = options["threads"] * options["attempts"]
+        self.stdout.write(f"Attempts: {attempts} in {elapsed:.2f}s ({attempts / elapsed:.1f} requests/sec)")
+        self.stdout.write(f"Bookings: {results['created']} ({results['created'] / elapsed:.1f} bookings/sec)")
+        self.stdout.write(f"Rejected (sold out): {results['rejected']}, unexpected errors: {results['errors']}")
+        self.stdout.write(f"Seats booked: {booked_seats}/{options['capacity']}, left: {bus_route.available_seats}")
+
+        oversold = booked_seats > options["capacity"] or booked_seats + bus_route.available_seats != options["capacity"]
+
+        if not options["keep"]:
+            booking_details = BookingDetail.objects.filter(bus_route=bus_route)
+            Booking.objects.filter(book__in=booking_details).delete()
+            bus.delete()
+            route.delete()
+            user.delete()
+
+        if oversold:
+            raise CommandError("Seat inventory is inconsistent: the bus route was oversold!")
+        self.stdout.write(self.style.SUCCESS("No oversell detected."))
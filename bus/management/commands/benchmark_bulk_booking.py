@@ -0,0 +1,82 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from bus.models import Booking, BookingDetail, Bus, BusRoute, Route
+from user.models import User
+
+
+class Command(BaseCommand):
+    help = "Compare booking a batch of passengers one booking at a time with the bulk booking endpoint"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--passengers", type=int, default=1000, help="Seats booked by the batch.")
+        parser.add_argument("--trips", type=int, default=10, help="Bus routes the batch is spread over.")
+        parser.add_argument("--seats", type=int, default=2, help="Seats per booking detail.")
+        parser.add_argument("--legs", type=int, default=2, help="Booking details (trips) per booking.")
+        parser.add_argument("--keep", action="store_true", help="Keep the generated data after the run.")
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        bookings = options["passengers"] // (options["seats"] * options["legs"])
+        if bookings < 1 or options["legs"] > options["trips"]:
+            raise CommandError("Not enough passengers or trips for a single booking.")
+        # Every run books `passengers` seats, spread evenly over the trips
+        capacity = -(-options["passengers"] // options["trips"]) + options["seats"] * options["legs"]
+
+        user = User.objects.create_user(username=f"bulk-{tag}", email=f"bulk-{tag}@example.com")
+        client = APIClient(SERVER_NAME="localhost")
+        try:
+            timings = {}
+            for mode in ["one by one", "bulk"]:
+                trips = self.create_trips(f"{tag}-{mode}", options["trips"], capacity)
+                data = [
+                    {
+                        "user": user.id,
+                        "book": [
+                            {"bus_route": trips[(index + leg) % len(trips)].id, "seat_numbers": options["seats"]}
+                            for leg in range(options["legs"])
+                        ],
+                    }
+                    for index in range(bookings)
+                ]
+                with CaptureQueriesContext(connection) as context:
+                    started = time.perf_counter()
+                    if mode == "bulk":
+                        response = client.post("/api/v1/bookings/bulk/", data, format="json")
+                        created = sum(result["status"] == "created" for result in response.data)
+                    else:
+                        created = sum(
+                            client.post("/api/v1/bookings/", item, format="json").status_code == 201 for item in data
+                        )
+                    elapsed = time.perf_counter() - started
+                if created != bookings:
+                    raise CommandError(f"{mode}: only {created} of {bookings} bookings were created.")
+                timings[mode] = elapsed
+                passengers = bookings * options["seats"] * options["legs"]
+                self.stdout.write(
+                    f"{mode}: {bookings} bookings ({passengers} passengers) in {elapsed * 1000:.0f}ms, "
+                    f"{len(context)} queries, {passengers / elapsed:,.0f} passengers/sec"
+                )
+            self.stdout.write(self.style.SUCCESS(f"Bulk booking is {timings['one by one'] / timings['bulk']:.1f}x faster."))
+        finally:
+            if not options["keep"]:
+                BookingDetail.objects.filter(bus_route__bus__bus_number__startswith=f"BULK-{tag}").delete()
+                Booking.objects.filter(user=user).delete()
+                Bus.objects.filter(bus_number__startswith=f"BULK-{tag}").delete()
+                Route.objects.filter(start_location__startswith=f"Bulk {tag}").delete()
+                user.delete()
+
+    def create_trips(self, name, count, capacity):
+        buses = Bus.objects.bulk_create(Bus(bus_number=f"BULK-{name}-{i}", capacity=capacity) for i in range(count))
+        route = Route.objects.create(
+            start_location=f"Bulk {name} A", end_location=f"Bulk {name} B", stops="", scheduled_time=timezone.now().time()
+        )
+        return BusRoute.objects.bulk_create(
+            BusRoute(bus=bus, route=route, date=timezone.now().date(), available_seats=capacity) for bus in buses
+        )
@@ -0,0 +1,60 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+LATENCIES = ["p50_ms", "p95_ms", "p99_ms"]
+
+
+class Command(BaseCommand):
+    help = "Compare the results of benchmark_api with a baseline and fail on latency, query or throughput regressions"
+
+    def add_arguments(self, parser):
+        parser.add_argument("baseline", help="JSON results of benchmark_api to compare with.")
+        parser.add_argument("results", help="JSON results of benchmark_api to check.")
+        parser.add_argument(
+            "--max-regression", type=float, default=20.0, help="Percent latencies may grow and throughput may drop."
+        )
+        parser.add_argument(
+            "--min-ms", type=float, default=1.0, help="Ignore latency changes smaller than this, which are noise."
+        )
+        parser.add_argument("--max-extra-queries", type=float, default=0.0, help="Queries per request may grow by this.")
+
+    def handle(self, *args, **options):
+        baseline, results = self.load(options["baseline"]), self.load(options["results"])
+        if baseline["options"] != results["options"] or baseline["database"] != results["database"]:
+            self.stdout.write(self.style.WARNING("The results were not run with the same options or database."))
+
+        allowed = 1 + options["max_regression"] / 100
+        regressions = []
+        for name, before in baseline["scenarios"].items():
+            after = results["scenarios"].get(name)
+            if after is None:
+                regressions.append(f"{name}: missing from the results")
+                continue
+            changes = []
+            for metric in LATENCIES:
+                changes.append(f"{metric}={before[metric]:.2f}->{after[metric]:.2f}")
+                if after[metric] > before[metric] * allowed and after[metric] - before[metric] >= options["min_ms"]:
+                    regressions.append(f"{name}: {metric} grew from {before[metric]:.2f}ms to {after[metric]:.2f}ms")
+            changes.append(f"queries={before['queries']:g}->{after['queries']:g}")
+            if after["queries"] > before["queries"] + options["max_extra_queries"]:
+                regressions.append(f"{name}: queries per request grew from {before['queries']:g} to {after['queries']:g}")
+            changes.append(f"req/s={before['throughput']:.1f}->{after['throughput']:.1f}")
+            if after["throughput"] * allowed < before["throughput"]:
+                regressions.append(
+                    f"{name}: throughput dropped from {before['throughput']:.1f} to {after['throughput']:.1f} req/s"
+                )
+            self.stdout.write(f"{name:<24} {' '.join(changes)}")
+        for name in results["scenarios"].keys() - baseline["scenarios"].keys():
+            self.stdout.write(f"{name:<24} not in the baseline")
+
+        if regressions:
+            raise CommandError("Performance regressions:\n" + "\n".join(regressions))
+        self.stdout.write(self.style.SUCCESS("No performance regression."))
+
+    def load(self, path):
+        try:
+            with open(path) as file:
+                return json.load(file)
+        except (OSError, ValueError) as error:
+            raise CommandError(f"Cannot read the benchmark results {path}: {error}")
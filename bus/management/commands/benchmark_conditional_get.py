@@ -0,0 +1,77 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from bus.models import Bus, Route
+from bus.utils import CATALOG_CACHE_NAMESPACE
+from main.caching import invalidate_namespace
+from review.models import FAQ
+
+BUS_NUMBER_PREFIX = "COND"
+LOCATION_PREFIX = "Cond City"
+QUESTION_PREFIX = "Cond question"
+ENDPOINTS = ["/api/v1/buses/", "/api/v1/routes/", "/api/v1/faqs/"]
+
+
+class Command(BaseCommand):
+    help = "Measure the bandwidth and CPU time saved by conditional GETs on the polled catalog endpoints"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100, help="Buses, routes and FAQs to create.")
+        parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint and mode.")
+        parser.add_argument("--keep", action="store_true", help="Keep the generated data after the run.")
+
+    def handle(self, *args, **options):
+        self.seed(options["rows"])
+        client = Client(SERVER_NAME="localhost")
+        try:
+            for url in ENDPOINTS:
+                etag = client.get(url)["ETag"]
+                full = self.measure(client, url, options["requests"], 200)
+                not_modified = self.measure(client, url, options["requests"], 304, HTTP_IF_NONE_MATCH=etag)
+                self.stdout.write(
+                    f"{url}: {full['bytes']} -> {not_modified['bytes']} bytes/request, "
+                    f"CPU {full['cpu']:.2f} -> {not_modified['cpu']:.2f} ms/request "
+                    f"({100 * (1 - not_modified['cpu'] / full['cpu']):.0f}% saved), "
+                    f"wall {full['wall']:.2f} -> {not_modified['wall']:.2f} ms/request"
+                )
+        finally:
+            if not options["keep"]:
+                Bus.objects.filter(bus_number__startswith=BUS_NUMBER_PREFIX).delete()
+                Route.objects.filter(start_location__startswith=LOCATION_PREFIX).delete()
+                FAQ.objects.filter(question__startswith=QUESTION_PREFIX).delete()
+                invalidate_namespace(CATALOG_CACHE_NAMESPACE)
+
+    def measure(self, client, url, requests, expected_status, **headers):
+        size = 0
+        cpu, wall = time.process_time(), time.perf_counter()
+        for _ in range(requests):
+            response = client.get(url, **headers)
+            if response.status_code != expected_status:
+                raise CommandError(f"{url} answered {response.status_code}, expected {expected_status}.")
+            size += len(response.content)
+        return {
+            "bytes": size // requests,
+            "cpu": (time.process_time() - cpu) * 1000 / requests,
+            "wall": (time.perf_counter() - wall) * 1000 / requests,
+        }
+
+    def seed(self, rows):
+        Bus.objects.bulk_create(Bus(bus_number=f"{BUS_NUMBER_PREFIX}{i:05d}", capacity=40) for i in range(rows))
+        Route.objects.bulk_create(
+            Route(
+                start_location=f"{LOCATION_PREFIX} {i}",
+                end_location=f"{LOCATION_PREFIX} {i + 1}",
+                stops="",
+                scheduled_time=datetime.time(i % 24),
+            )
+            for i in range(rows)
+        )
+        # `bulk_create` sends no signals
+        invalidate_namespace(CATALOG_CACHE_NAMESPACE)
+        FAQ.objects.bulk_create(
+            FAQ(question=f"{QUESTION_PREFIX} {i}?", answer="An answer that mobile clients download again and again.")
+            for i in range(rows)
+        )
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import resolve
+
+from main.metrics import MetricsMiddleware, registry
+from main.timing import ServerTimingMiddleware
+
+
+class Command(BaseCommand):
+    help = "Measure the overhead per request of the metrics middleware, and of the timing middleware when unsampled"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=100_000, help="Requests through each middleware.")
+        parser.add_argument("--max-us", type=float, default=20.0, help="Fail if a middleware adds more microseconds.")
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get("/api/v1/bus-routes/")
+        request.resolver_match = resolve(request.path)
+        response = HttpResponse()
+
+        def view(request):
+            return response
+
+        baseline = self.measure(view, request, options["requests"])
+        failed = []
+        for middleware in (MetricsMiddleware, ServerTimingMiddleware):
+            overhead = self.measure(middleware(view), request, options["requests"]) - baseline
+            self.stdout.write(f"{middleware.__name__}: {overhead:.2f}us per request")
+            if overhead > options["max_us"]:
+                failed.append(middleware.__name__)
+        registry.reset()
+
+        if failed:
+            raise CommandError(f"{', '.join(failed)} add more than {options['max_us']}us per request.")
+        self.stdout.write(self.style.SUCCESS("Overhead targets met."))
+
+    def measure(self, handler, request, requests):
+        """
+        Return the microseconds per call of `handler(request)`.
+        """
+        started = time.perf_counter()
+        for _ in range(requests):
+            handler(request)
+        return (time.perf_counter() - started) / requests * 1_000_000
@@ -0,0 +1,129 @@
+import datetime
+import itertools
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from bus.models import BookingDetail, Bus, BusRoute, Route
+from bus.views import BookingDetailViewSet
+from main.pagination import CursorLimitOffsetPagination
+from review.models import FeedbackReview
+from review.views import FeedbackReviewViewSet
+from user.models import User
+
+BUS_NUMBER_PREFIX = "PAGE"
+USERNAME = "benchmark-pagination"
+
+
+class Command(BaseCommand):
+    help = "Compare the latency of the first and a deep page with limit/offset and cursor pagination"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000, help="Booking details and feedback reviews to page.")
+        parser.add_argument("--limit", type=int, default=100, help="Rows per page.")
+        parser.add_argument("--page", type=int, default=10_000, help="Deep page to compare with the first one.")
+        parser.add_argument("--queries", type=int, default=20, help="Requests per page and mode.")
+        parser.add_argument("--batch-size", type=int, default=10_000, help="Rows per insert while seeding.")
+        parser.add_argument("--max-ratio", type=float, default=3.0, help="Fail if a deep cursor page is slower.")
+        parser.add_argument("--cleanup", action="store_true", help="Delete the generated data after the run.")
+
+    def handle(self, *args, **options):
+        self.seed(options["rows"], options["batch_size"])
+        offset = min(options["page"] - 1, options["rows"] // options["limit"] - 1) * options["limit"]
+        client = Client(SERVER_NAME="localhost")
+
+        failed = False
+        for url, viewset in [
+            ("/api/v1/booking-details/", BookingDetailViewSet),
+            ("/api/v1/feedback-reviews/", FeedbackReviewViewSet),
+        ]:
+            cursor = self.cursor_at(viewset, offset)
+            timings = {
+                "offset, first page": self.measure(client, url, options["queries"], {"limit": options["limit"]}),
+                "offset, deep page": self.measure(
+                    client, url, options["queries"], {"limit": options["limit"], "offset": offset}
+                ),
+                "cursor, first page": self.measure(
+                    client, url, options["queries"], {"limit": options["limit"], "cursor": ""}
+                ),
+                "cursor, deep page": self.measure(
+                    client, url, options["queries"], {"limit": options["limit"], "cursor": cursor}
+                ),
+            }
+            self.stdout.write(f"{url} (deep page at offset {offset}):")
+            for mode, latency in timings.items():
+                self.stdout.write(f"  {mode}: p50={latency:.2f}ms")
+            failed |= timings["cursor, deep page"] > options["max_ratio"] * timings["cursor, first page"]
+
+        if options["cleanup"]:
+            Bus.objects.filter(bus_number__startswith=BUS_NUMBER_PREFIX).delete()
+            User.objects.filter(username=USERNAME).delete()
+
+        if failed:
+            raise CommandError(f"A deep cursor page took more than {options['max_ratio']}x the first page.")
+        self.stdout.write(self.style.SUCCESS("Cursor page latency is independent of the depth."))
+
+    def cursor_at(self, viewset, offset):
+        """
+        Return the cursor of the page starting after `offset` rows, without walking through the pages before it.
+        """
+        pagination = CursorLimitOffsetPagination()
+        pagination.ordering = viewset.cursor_ordering
+        row = viewset.queryset.order_by(*viewset.cursor_ordering).values(*viewset.cursor_ordering)[offset - 1]
+        return pagination.encode_cursor(pagination.get_position(row))
+
+    def measure(self, client, url, queries, params):
+        latencies = []
+        for _ in range(queries):
+            started = time.perf_counter()
+            response = client.get(url, params)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f"{url} failed with {response.status_code}: {response.content[:200]}")
+        return statistics.median(latencies)
+
+    def seed(self, rows, batch_size):
+        """
+        Create `rows` booking details spread over a year of bus routes and `rows` feedback reviews.
+        """
+        existing = BookingDetail.objects.filter(bus_route__bus__bus_number__startswith=BUS_NUMBER_PREFIX).count()
+        if existing < rows:
+            self.stdout.write(f"Seeding {rows - existing} booking details...")
+            bus = Bus.objects.filter(bus_number__startswith=BUS_NUMBER_PREFIX).first() or Bus.objects.create(
+                bus_number=f"{BUS_NUMBER_PREFIX}00000", capacity=60
+            )
+            bus_routes = list(BusRoute.objects.filter(bus=bus))
+            if not bus_routes:
+                route = Route.objects.create(
+                    start_location="Page Start", end_location="Page End", stops="", scheduled_time=datetime.time(6)
+                )
+                bus_routes = BusRoute.objects.bulk_create(
+                    BusRoute(
+                        bus=bus,
+                        route=route,
+                        date=datetime.date(2099, 1, 1) + datetime.timedelta(days=day),
+                        available_seats=0,
+                    )
+                    for day in range(365)
+                )
+            details = (
+                BookingDetail(bus_route=bus_routes[index % len(bus_routes)], seat_numbers=1)
+                for index in range(existing, rows)
+            )
+            while batch := list(itertools.islice(details, batch_size)):
+                BookingDetail.objects.bulk_create(batch)
+
+        user = User.objects.filter(username=USERNAME).first() or User.objects.create_user(
+            username=USERNAME, email=f"{USERNAME}@example.com"
+        )
+        existing = FeedbackReview.objects.filter(user=user).count()
+        if existing < rows:
+            self.stdout.write(f"Seeding {rows - existing} feedback reviews...")
+            reviews = (
+                FeedbackReview(user=user, title=f"Review {index}", content="Benchmark review.")
+                for index in range(existing, rows)
+            )
+            while batch := list(itertools.islice(reviews, batch_size)):
+                FeedbackReview.objects.bulk_create(batch)
@@ -0,0 +1,111 @@
+import datetime
+import itertools
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bus.models import Bus, BusRoute, Route, RouteStop
+from bus.planner import Timetable, plan_journeys, timetables
+from bus.utils import normalize_location, percentile
+
+BUS_NUMBER_PREFIX = "PLAN"
+LOCATION_PREFIX = "Plan City"
+
+
+class Command(BaseCommand):
+    help = "Benchmark the journey planner on a synthetic network of routes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--locations", type=int, default=300, help="Number of locations in the network.")
+        parser.add_argument("--routes", type=int, default=3000, help="Number of routes (one trip each).")
+        parser.add_argument("--stops", type=int, default=4, help="Maximum number of intermediate stops per route.")
+        parser.add_argument("--queries", type=int, default=500, help="Number of journeys to plan.")
+        parser.add_argument("--max-legs", type=int, default=3, help="Maximum number of buses per journey.")
+        parser.add_argument("--p99-ms", type=float, default=50.0, help="Fail if the 99th percentile latency is higher.")
+        parser.add_argument("--date", type=datetime.date.fromisoformat, default=datetime.date(2099, 1, 1))
+        parser.add_argument("--seed", type=int, default=42, help="Random seed for the network and the queries.")
+        parser.add_argument("--keep", action="store_true", help="Keep the generated network after the run.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        locations = [f"{LOCATION_PREFIX} {i}" for i in range(options["locations"])]
+        self.stdout.write(f"Creating {options['routes']} routes between {len(locations)} locations...")
+        self.create_network(rng, locations, options)
+
+        try:
+            started = time.perf_counter()
+            Timetable.build(options["date"])
+            self.stdout.write(f"Timetable build: {(time.perf_counter() - started) * 1000:.1f}ms")
+
+            # Warm the per-process timetable cache, queries then only pay for the search itself.
+            timetables.clear()
+            plan_journeys(normalize_location(locations[0]), normalize_location(locations[1]), options["date"])
+
+            latencies, found = [], 0
+            for _ in range(options["queries"]):
+                origin, destination = rng.sample(locations, 2)
+                started = time.perf_counter()
+                journeys = plan_journeys(
+                    normalize_location(origin),
+                    normalize_location(destination),
+                    options["date"],
+                    max_legs=options["max_legs"],
+                )
+                latencies.append((time.perf_counter() - started) * 1000)
+                found += bool(journeys)
+        finally:
+            if not options["keep"]:
+                Bus.objects.filter(bus_number__startswith=BUS_NUMBER_PREFIX).delete()
+                Route.objects.filter(start_location__startswith=LOCATION_PREFIX).delete()
+
+        p50, p99 = percentile(latencies, 50), percentile(latencies, 99)
+        self.stdout.write(f"Queries: {len(latencies)}, with a journey: {found}")
+        self.stdout.write(
+            f"Latency ms: p50={p50:.2f} p99={p99:.2f} mean={statistics.mean(latencies):.2f} max={max(latencies):.2f}"
+        )
+        if p99 > options["p99_ms"]:
+            raise CommandError(f"Latency target missed (p99 <= {options['p99_ms']}ms).")
+        self.stdout.write(self.style.SUCCESS("Latency target met."))
+
+    def create_network(self, rng, locations, options):
+        buses = Bus.objects.bulk_create(
+            Bus(bus_number=f"{BUS_NUMBER_PREFIX}{i:05d}", capacity=40) for i in range(options["routes"])
+        )
+        routes, route_locations = [], []
+        for _ in range(options["routes"]):
+            path = rng.sample(locations, 2 + rng.randint(0, options["stops"]))
+            route = Route(
+                start_location=path[0],
+                end_location=path[-1],
+                stops=", ".join(path[1:-1]),
+                scheduled_time=datetime.time(rng.randrange(24), rng.choice([0, 15, 30, 45])),
+                start_location_key=normalize_location(path[0]),
+                end_location_key=normalize_location(path[-1]),
+            )
+            routes.append(route)
+            route_locations.append(path)
+        routes = Route.objects.bulk_create(routes, batch_size=1000)
+
+        route_stops = []
+        for route, path in zip(routes, route_locations):
+            offsets = itertools.accumulate(rng.randint(30, 180) for _ in path[1:])
+            for sequence, (location, offset) in enumerate(zip(path, itertools.chain([0], offsets))):
+                route_stops.append(
+                    RouteStop(
+                        route=route,
+                        sequence=sequence,
+                        location=location,
+                        location_key=normalize_location(location),
+                        offset_minutes=offset,
+                    )
+                )
+        RouteStop.objects.bulk_create(route_stops, batch_size=1000)
+        BusRoute.objects.bulk_create(
+            (
+                BusRoute(bus=bus, route=route, date=options["date"], available_seats=bus.capacity)
+                for bus, route in zip(buses, routes)
+            ),
+            batch_size=1000,
+        )
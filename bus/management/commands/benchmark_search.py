@@ -0,0 +1,122 @@
+import datetime
+import itertools
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.utils import timezone
+
+from bus.models import Bus, BusRoute, Route, RouteStop
+from bus.utils import normalize_location, percentile
+from rental.models import City
+
+BUS_NUMBER_PREFIX = "SRCH"
+DEPARTURES = [datetime.time(6, 0), datetime.time(9, 30), datetime.time(14, 0), datetime.time(19, 45)]
+
+
+class Command(BaseCommand):
+    help = "Benchmark the trip search endpoint against a large number of bus routes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000, help="Number of bus routes to search through.")
+        parser.add_argument("--queries", type=int, default=1000, help="Number of searches to run.")
+        parser.add_argument("--batch-size", type=int, default=10_000, help="Rows per insert while seeding.")
+        parser.add_argument("--p50-ms", type=float, default=5.0, help="Fail if the median latency is higher.")
+        parser.add_argument("--p99-ms", type=float, default=25.0, help="Fail if the 99th percentile latency is higher.")
+        parser.add_argument("--seed", type=int, default=42, help="Random seed for the generated data and searches.")
+        parser.add_argument("--via-stops", action="store_true", help="Search through the route stops.")
+        parser.add_argument("--cleanup", action="store_true", help="Delete the generated data after the run.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        self.seed(rng, options["rows"], options["batch_size"])
+
+        cities = list(City.objects.values_list("name", flat=True))
+        start_date = timezone.now().date()
+        days = max(1, options["rows"] // (len(cities) * (len(cities) - 1) * len(DEPARTURES)))
+        client = Client(SERVER_NAME="localhost")
+
+        latencies = []
+        for _ in range(options["queries"]):
+            start_location, end_location = rng.sample(cities, 2)
+            params = {
+                "from": start_location,
+                "to": end_location,
+                "date": start_date + datetime.timedelta(days=rng.randrange(days)),
+                "via_stops": options["via_stops"],
+            }
+            started = time.perf_counter()
+            response = client.get("/api/v1/search/", params)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f"Search failed with {response.status_code}: {response.content[:200]}")
+
+        p50, p99 = percentile(latencies, 50), percentile(latencies, 99)
+        self.stdout.write(f"Bus routes: {BusRoute.objects.count()}, searches: {len(latencies)}")
+        self.stdout.write(
+            f"Latency ms: p50={p50:.2f} p99={p99:.2f} mean={statistics.mean(latencies):.2f} max={max(latencies):.2f}"
+        )
+
+        if options["cleanup"]:
+            route_ids = list(
+                Route.objects.filter(busroute__bus__bus_number__startswith=BUS_NUMBER_PREFIX)
+                .values_list("pk", flat=True)
+                .distinct()
+            )
+            Bus.objects.filter(bus_number__startswith=BUS_NUMBER_PREFIX).delete()
+            Route.objects.filter(pk__in=route_ids).delete()
+
+        if p50 > options["p50_ms"] or p99 > options["p99_ms"]:
+            raise CommandError(f"Latency targets missed (p50 <= {options['p50_ms']}ms, p99 <= {options['p99_ms']}ms).")
+        self.stdout.write(self.style.SUCCESS("Latency targets met."))
+
+    def seed(self, rng, rows, batch_size):
+        """
+        Create bus routes for every city pair and departure, one day after the other, until there are `rows` of them.
+        """
+        existing = BusRoute.objects.filter(bus__bus_number__startswith=BUS_NUMBER_PREFIX).count()
+        if existing >= rows:
+            return
+        self.stdout.write(f"Seeding {rows - existing} bus routes...")
+
+        cities = list(City.objects.values_list("name", flat=True))
+        buses = list(Bus.objects.filter(bus_number__startswith=BUS_NUMBER_PREFIX))
+        if not buses:
+            buses = Bus.objects.bulk_create(
+                Bus(
+                    bus_number=f"{BUS_NUMBER_PREFIX}{i:05d}",
+                    bus_type=rng.choice(Bus.BusType.values),
+                    capacity=rng.choice([30, 40, 50, 60]),
+                )
+                for i in range(500)
+            )
+        routes = list(Route.objects.filter(busroute__bus__bus_number__startswith=BUS_NUMBER_PREFIX).distinct())
+        if not routes:
+            routes = [
+                Route(start_location=start, end_location=end, stops="", scheduled_time=departure)
+                for start, end in itertools.permutations(cities, 2)
+                for departure in DEPARTURES
+            ]
+            for route in routes:
+                # `bulk_create` skips `Route.save`, which fills the search keys
+                route.start_location_key = normalize_location(route.start_location)
+                route.end_location_key = normalize_location(route.end_location)
+            routes = Route.objects.bulk_create(routes, batch_size=batch_size)
+            RouteStop.objects.bulk_create(
+                itertools.chain.from_iterable(route.build_route_stops() for route in routes), batch_size=batch_size
+            )
+
+        start_date = timezone.now().date()
+        bus_routes = (
+            BusRoute(
+                bus=buses[index % len(buses)],
+                route=routes[index % len(routes)],
+                date=start_date + datetime.timedelta(days=index // len(routes)),
+                available_seats=rng.randint(0, 30),
+            )
+            for index in range(existing, rows)
+        )
+        while batch := list(itertools.islice(bus_routes, batch_size)):
+            BusRoute.objects.bulk_create(batch)
@@ -0,0 +1,80 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+
+from bus.models import Bus, BusRoute, Route
+from bus.serializers import BusRouteSerializer, BusSerializer, RouteSerializer
+from main.fast_serializers import get_values_serializer
+from review.models import FAQ
+from review.serializers import FAQSerializer
+
+BUS_NUMBER_PREFIX = "SER"
+LOCATION_PREFIX = "Ser City"
+QUESTION_PREFIX = "Ser question"
+
+
+class Command(BaseCommand):
+    help = "Compare the rows/sec of the model serializers with the values based list serialization"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=5000, help="Rows of every model to serialize.")
+        parser.add_argument("--repeat", type=int, default=5, help="Runs per serializer, the best one is reported.")
+        parser.add_argument("--keep", action="store_true", help="Keep the generated data after the run.")
+
+    def handle(self, *args, **options):
+        self.seed(options["rows"])
+        try:
+            for serializer_class, queryset in [
+                (BusSerializer, Bus.objects.filter(bus_number__startswith=BUS_NUMBER_PREFIX)),
+                (RouteSerializer, Route.objects.filter(start_location__startswith=LOCATION_PREFIX)),
+                (
+                    BusRouteSerializer,
+                    BusRoute.objects.filter(bus__bus_number__startswith=BUS_NUMBER_PREFIX).select_related("bus", "route"),
+                ),
+                (FAQSerializer, FAQ.objects.filter(question__startswith=QUESTION_PREFIX)),
+            ]:
+                values_serializer = get_values_serializer(serializer_class)
+                serializer_rate = self.measure(lambda: serializer_class(list(queryset), many=True).data, options["repeat"])
+                values_rate = self.measure(
+                    lambda: values_serializer.to_representation(queryset.values(*values_serializer.paths)),
+                    options["repeat"],
+                )
+                self.stdout.write(
+                    f"{serializer_class.__name__}: {serializer_rate:,.0f} rows/sec -> {values_rate:,.0f} rows/sec "
+                    f"({values_rate / serializer_rate:.1f}x)"
+                )
+        finally:
+            if not options["keep"]:
+                Bus.objects.filter(bus_number__startswith=BUS_NUMBER_PREFIX).delete()
+                Route.objects.filter(start_location__startswith=LOCATION_PREFIX).delete()
+                FAQ.objects.filter(question__startswith=QUESTION_PREFIX).delete()
+
+    def measure(self, serialize, repeat):
+        """
+        Return the rows serialized per second (fetching included) of the fastest of `repeat` runs.
+        """
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            rows = len(serialize())
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return rows / best
+
+    def seed(self, rows):
+        buses = Bus.objects.bulk_create(Bus(bus_number=f"{BUS_NUMBER_PREFIX}{i:05d}", capacity=40) for i in range(rows))
+        routes = Route.objects.bulk_create(
+            Route(
+                start_location=f"{LOCATION_PREFIX} {i}",
+                end_location=f"{LOCATION_PREFIX} {i + 1}",
+                stops="",
+                scheduled_time=datetime.time(i % 24),
+            )
+            for i in range(rows)
+        )
+        BusRoute.objects.bulk_create(
+            BusRoute(bus=bus, route=route, date=datetime.date(2099, 1, 1), available_seats=40)
+            for bus, route in zip(buses, routes)
+        )
+        FAQ.objects.bulk_create(FAQ(question=f"{QUESTION_PREFIX} {i}?", answer="An answer.") for i in range(rows))
@@ -0,0 +1,23 @@
+import datetime
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from bus.schedules import generate_bus_routes
+
+
+class Command(BaseCommand):
+    help = "Create the bus routes of the active schedule templates for the next days, skipping the existing ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.SCHEDULE_DAYS_AHEAD, help="Days to generate.")
+        parser.add_argument("--start", type=datetime.date.fromisoformat, help="First day, today by default.")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Bus routes per insert.")
+
+    def handle(self, *args, **options):
+        if options["days"] < 1:
+            raise CommandError("--days must be at least 1.")
+        started = time.perf_counter()
+        created = generate_bus_routes(options["days"], options["start"], batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Created {created:,} bus routes in {time.perf_counter() - started:.2f}s."))
@@ -0,0 +1,40 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from bus.models import BusRoute, DailyRouteOccupancy
+from bus.occupancy import rebuild_occupancy
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily route occupancy from the bus routes and booking details, a few days at a time"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=datetime.date.fromisoformat, help="First date, the earliest by default.")
+        parser.add_argument("--end", type=datetime.date.fromisoformat, help="Last date, the latest by default.")
+        parser.add_argument("--batch-days", type=int, default=7, help="Days recomputed per transaction.")
+
+    def handle(self, *args, **options):
+        if options["batch_days"] < 1:
+            raise CommandError("--batch-days must be at least 1.")
+        start, end = options["start"], options["end"]
+        if start is None or end is None:
+            # Rows of dates without bus routes anymore are deleted too
+            bounds = [
+                model.objects.aggregate(start=Min("date"), end=Max("date")) for model in (BusRoute, DailyRouteOccupancy)
+            ]
+            start = start or min((bound["start"] for bound in bounds if bound["start"]), default=None)
+            end = end or max((bound["end"] for bound in bounds if bound["end"]), default=None)
+        if start is None or end is None:
+            self.stdout.write("Nothing to rebuild.")
+            return
+
+        rows = 0
+        batch = datetime.timedelta(days=options["batch_days"])
+        while start <= end:
+            batch_end = min(start + batch - datetime.timedelta(days=1), end)
+            rows += rebuild_occupancy(start, batch_end)
+            self.stdout.write(f"{start} - {batch_end}: {rows:,} rows")
+            start = batch_end + datetime.timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows:,} daily route occupancy rows."))
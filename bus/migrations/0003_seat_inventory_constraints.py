@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bus", "0002_alter_booking_book"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="bookingdetail",
+            constraint=models.CheckConstraint(
+                check=models.Q(("seat_numbers__gt", 0)), name="booking_detail_seat_numbers_gt_0"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="bus",
+            constraint=models.CheckConstraint(check=models.Q(("capacity__gte", 0)), name="bus_capacity_gte_0"),
+        ),
+        migrations.AddConstraint(
+            model_name="busroute",
+            constraint=models.CheckConstraint(
+                check=models.Q(("available_seats__gte", 0)), name="bus_route_available_seats_gte_0"
+            ),
+        ),
+    ]
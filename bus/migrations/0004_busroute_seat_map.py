@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:05
+
+from django.db import migrations, models
+
+
+def backfill_seat_maps(apps, schema_editor):
+    """
+    Give existing booking details the lowest seat numbers of their bus route, in booking order.
+    """
+    BusRoute = apps.get_model("bus", "BusRoute")
+    BookingDetail = apps.get_model("bus", "BookingDetail")
+
+    bus_routes = BusRoute.objects.filter(bookingdetail__isnull=False).distinct().select_related("bus")
+    for bus_route in bus_routes.iterator(chunk_size=500):
+        capacity = bus_route.bus.capacity
+        seat_map = bytearray((capacity + 7) // 8)
+        next_seat = 1
+        details = list(BookingDetail.objects.filter(bus_route=bus_route).order_by("pk"))
+        for detail in details:
+            detail.seats = list(range(next_seat, min(next_seat + detail.seat_numbers, capacity + 1)))
+            for seat in detail.seats:
+                seat_map[(seat - 1) >> 3] |= 1 << ((seat - 1) & 7)
+            next_seat += len(detail.seats)
+        BookingDetail.objects.bulk_update(details, ["seats"], batch_size=500)
+        BusRoute.objects.filter(pk=bus_route.pk).update(seat_map=bytes(seat_map))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bus", "0003_seat_inventory_constraints"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bookingdetail",
+            name="seats",
+            field=models.JSONField(
+                blank=True,
+                default=list,
+                help_text="The seat numbers (starting from 1) assigned to the user for this route.",
+                verbose_name="Seats",
+            ),
+        ),
+        migrations.AddField(
+            model_name="busroute",
+            name="seat_map",
+            field=models.BinaryField(
+                blank=True, default=b"", help_text="Bitmap of the booked seats on this bus.", verbose_name="Seat Map"
+            ),
+        ),
+        migrations.RunPython(backfill_seat_maps, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:20
+
+from django.db import migrations, models
+
+
+def backfill_location_keys(apps, schema_editor):
+    Route = apps.get_model("bus", "Route")
+
+    routes = list(Route.objects.all())
+    for route in routes:
+        route.start_location_key = " ".join(route.start_location.split()).casefold()
+        route.end_location_key = " ".join(route.end_location.split()).casefold()
+    Route.objects.bulk_update(routes, ["start_location_key", "end_location_key"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bus", "0004_busroute_seat_map"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="route",
+            name="end_location_key",
+            field=models.CharField(
+                default="",
+                editable=False,
+                help_text="Normalized end location.",
+                max_length=100,
+                verbose_name="End Location Key",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="route",
+            name="start_location_key",
+            field=models.CharField(
+                default="",
+                editable=False,
+                help_text="Normalized start location.",
+                max_length=100,
+                verbose_name="Start Location Key",
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_location_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="busroute",
+            index=models.Index(fields=["route", "date"], name="bus_route_route_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="route",
+            index=models.Index(fields=["start_location_key", "end_location_key"], name="route_location_key_idx"),
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def normalize_location(location):
+    return " ".join((location or "").split()).casefold()
+
+
+def populate_route_stops(apps, schema_editor):
+    """
+    Split the comma separated `Route.stops` into ordered `RouteStop` rows, with the start and end locations
+    as the first and last stops.
+    """
+    Route = apps.get_model("bus", "Route")
+    RouteStop = apps.get_model("bus", "RouteStop")
+
+    route_stops = []
+    for route in Route.objects.all().iterator(chunk_size=1000):
+        stops = [stop.strip() for stop in (route.stops or "").split(",") if stop.strip()]
+        for sequence, location in enumerate([route.start_location, *stops, route.end_location]):
+            route_stops.append(
+                RouteStop(
+                    route_id=route.pk,
+                    sequence=sequence,
+                    location=location[:100],
+                    location_key=normalize_location(location)[:100],
+                    offset_minutes=0 if sequence == 0 else None,
+                )
+            )
+        if len(route_stops) >= 1000:
+            RouteStop.objects.bulk_create(route_stops)
+            route_stops = []
+    RouteStop.objects.bulk_create(route_stops)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bus", "0005_route_location_keys"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RouteStop",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "sequence",
+                    models.PositiveSmallIntegerField(
+                        help_text="Position of the stop on the route, starting from 0.", verbose_name="Sequence"
+                    ),
+                ),
+                ("location", models.CharField(help_text="Name of the stop.", max_length=100, verbose_name="Location")),
+                (
+                    "location_key",
+                    models.CharField(
+                        editable=False, help_text="Normalized location.", max_length=100, verbose_name="Location Key"
+                    ),
+                ),
+                (
+                    "offset_minutes",
+                    models.PositiveIntegerField(
+                        blank=True,
+                        help_text="Minutes after the scheduled departure at which the bus reaches the stop.",
+                        null=True,
+                        verbose_name="Offset Minutes",
+                    ),
+                ),
+                (
+                    "route",
+                    models.ForeignKey(
+                        help_text="The route the stop belongs to.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="route_stops",
+                        to="bus.route",
+                        verbose_name="Route",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["route", "sequence"],
+                "indexes": [models.Index(fields=["location_key", "route", "sequence"], name="route_stop_location_key_idx")],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="routestop",
+            constraint=models.UniqueConstraint(fields=("route", "sequence"), name="route_stop_route_sequence_unique"),
+        ),
+        migrations.RunPython(populate_route_stops, migrations.RunPython.noop),
+    ]
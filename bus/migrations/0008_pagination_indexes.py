@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bus", "0007_bus_route_busroute_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(fields=["booking_time", "id"], name="booking_booking_time_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="busroute",
+            index=models.Index(fields=["date", "id"], name="bus_route_date_id_idx"),
+        ),
+    ]
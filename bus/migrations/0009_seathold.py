@@ -0,0 +1,61 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:33
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("bus", "0008_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SeatHold",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                (
+                    "seats",
+                    models.JSONField(
+                        default=list, help_text="The held seat numbers (starting from 1).", verbose_name="Seats"
+                    ),
+                ),
+                (
+                    "expires_at",
+                    models.DateTimeField(
+                        help_text="Time after which the seats are available again.", verbose_name="Expires At"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="Created At")),
+                (
+                    "bus_route",
+                    models.ForeignKey(
+                        help_text="The bus route the seats are held on.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="seat_holds",
+                        to="bus.busroute",
+                        verbose_name="Bus Route",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        help_text="The user holding the seats.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="User",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["bus_route", "expires_at"], name="seat_hold_bus_route_idx"),
+                    models.Index(fields=["expires_at"], name="seat_hold_expires_at_idx"),
+                ],
+            },
+        ),
+    ]
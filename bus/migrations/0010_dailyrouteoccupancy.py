@@ -0,0 +1,76 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bus", "0009_seathold"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyRouteOccupancy",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "date",
+                    models.DateField(help_text="Date on which the buses are scheduled for the route.", verbose_name="Date"),
+                ),
+                (
+                    "bus_type",
+                    models.CharField(
+                        choices=[("ac", "Air Conditioned"), ("non_ac", "Non Air Conditioned")],
+                        help_text="Type of the buses.",
+                        max_length=20,
+                        verbose_name="Bus Type",
+                    ),
+                ),
+                (
+                    "departures",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Number of buses scheduled.", verbose_name="Departures"
+                    ),
+                ),
+                (
+                    "capacity",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Total number of seats of the buses.", verbose_name="Capacity"
+                    ),
+                ),
+                (
+                    "seats_sold",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Number of seats booked on the buses.", verbose_name="Seats Sold"
+                    ),
+                ),
+                (
+                    "bookings",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Number of booking details on the buses.", verbose_name="Bookings"
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True, verbose_name="Updated At")),
+                (
+                    "route",
+                    models.ForeignKey(
+                        help_text="The route of the buses.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_occupancy",
+                        to="bus.route",
+                        verbose_name="Route",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Daily route occupancy",
+                "indexes": [models.Index(fields=["date"], name="daily_route_occupancy_date_idx")],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="dailyrouteoccupancy",
+            constraint=models.UniqueConstraint(fields=("route", "date", "bus_type"), name="daily_route_occupancy_unique"),
+        ),
+    ]
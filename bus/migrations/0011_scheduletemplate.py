@@ -0,0 +1,94 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bus", "0010_dailyrouteoccupancy"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScheduleTemplate",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "weekdays",
+                    models.PositiveSmallIntegerField(
+                        default=127,
+                        help_text="Bitmask of the weekdays the bus runs, 1 for Monday, 2 for Tuesday, ... 64 for Sunday (127: daily).",
+                        verbose_name="Weekdays",
+                    ),
+                ),
+                ("valid_from", models.DateField(help_text="First day of the schedule.", verbose_name="Valid From")),
+                (
+                    "valid_to",
+                    models.DateField(
+                        blank=True,
+                        help_text="Last day of the schedule, empty if open-ended.",
+                        null=True,
+                        verbose_name="Valid To",
+                    ),
+                ),
+                (
+                    "available_seats",
+                    models.PositiveIntegerField(
+                        blank=True,
+                        help_text="Seats available for booking on each trip, the capacity of the bus if empty.",
+                        null=True,
+                        verbose_name="Available Seats",
+                    ),
+                ),
+                (
+                    "is_active",
+                    models.BooleanField(
+                        default=True, help_text="Whether trips are generated from this template.", verbose_name="Is Active"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="Created At")),
+                ("updated_at", models.DateTimeField(auto_now=True, verbose_name="Updated At")),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="busroute",
+            constraint=models.UniqueConstraint(fields=("bus", "route", "date"), name="bus_route_bus_route_date_unique"),
+        ),
+        migrations.AddField(
+            model_name="scheduletemplate",
+            name="bus",
+            field=models.ForeignKey(
+                help_text="The bus running the route.",
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="schedule_templates",
+                to="bus.bus",
+                verbose_name="Bus",
+            ),
+        ),
+        migrations.AddField(
+            model_name="scheduletemplate",
+            name="route",
+            field=models.ForeignKey(
+                help_text="The route the bus runs.",
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="schedule_templates",
+                to="bus.route",
+                verbose_name="Route",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="scheduletemplate",
+            constraint=models.CheckConstraint(
+                check=models.Q(("weekdays__gte", 1), ("weekdays__lte", 127)), name="schedule_template_weekdays_valid"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="scheduletemplate",
+            constraint=models.CheckConstraint(
+                check=models.Q(("valid_to__isnull", True), ("valid_to__gte", models.F("valid_from")), _connector="OR"),
+                name="schedule_template_valid_to_gte_valid_from",
+            ),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:05
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+INDEX_NAME = "route_stop_location_trgm_idx"
+
+
+def create_trigram_index(apps, schema_editor):
+    # GIN indexes and operator classes only exist on PostgreSQL
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON bus_routestop USING gin (location_key gin_trgm_ops)"
+        )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {INDEX_NAME}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bus", "0011_scheduletemplate"),
+    ]
+
+    operations = [
+        # A no-op on the other databases
+        TrigramExtension(),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
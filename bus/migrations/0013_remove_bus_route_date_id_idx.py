@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:16
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bus", "0012_route_stop_location_trigram"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="busroute",
+            name="bus_route_date_id_idx",
+        ),
+    ]
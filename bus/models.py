@@ -1,8 +1,12 @@
+import uuid
+
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
 from user.models import User
 
+from .utils import normalize_location, split_stops
+
 
 class Bus(models.Model):
     """
@@ -18,6 +22,8 @@ class Bus(models.Model):
         Total number of seats available on the bus.
     availability_status : bool
         Indicates whether the bus is available for booking.
+    updated_at : datetime.datetime
+        Time of the last modification.
     """
 
     class BusType(models.TextChoices):
@@ -54,6 +60,12 @@ class Bus(models.Model):
         verbose_name=_("Availability Status"),
         help_text=_("Indicates whether the bus is available for booking."),
     )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated At"))
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(check=models.Q(capacity__gte=0), name="bus_capacity_gte_0"),
+        ]
 
     def __str__(self):
         return f"{self.bus_number} - {self.get_bus_type_display()}"
@@ -73,6 +85,12 @@ class Route(models.Model):
         Comma-separated list of intermediate stops.
     scheduled_time : datetime.time
         Scheduled departure time of the bus.
+    start_location_key : str
+        Normalized `start_location` used for searching.
+    end_location_key : str
+        Normalized `end_location` used for searching.
+    updated_at : datetime.datetime
+        Time of the last modification.
     """
 
     start_location = models.CharField(
@@ -83,10 +101,114 @@ class Route(models.Model):
     )
     stops = models.TextField(verbose_name=_("Stops"), help_text=_("Comma separated list of intermediate stops."))
     scheduled_time = models.TimeField(verbose_name=_("Scheduled Time"), help_text=_("Scheduled departure time of the bus."))
+    start_location_key = models.CharField(
+        max_length=100, editable=False, verbose_name=_("Start Location Key"), help_text=_("Normalized start location.")
+    )
+    end_location_key = models.CharField(
+        max_length=100, editable=False, verbose_name=_("End Location Key"), help_text=_("Normalized end location.")
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated At"))
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["start_location_key", "end_location_key"], name="route_location_key_idx"),
+        ]
 
     def __str__(self):
         return f"{self.start_location} to {self.end_location}"
 
+    def save(self, *args, **kwargs):
+        self.start_location_key = normalize_location(self.start_location)
+        self.end_location_key = normalize_location(self.end_location)
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "start_location_key", "end_location_key"}
+        super().save(*args, **kwargs)
+        self.sync_route_stops()
+
+    def build_route_stops(self):
+        """
+        Return unsaved `RouteStop` instances for the start location, every stop in `stops` and the end location.
+        """
+        locations = [self.start_location, *split_stops(self.stops), self.end_location]
+        return [
+            RouteStop(
+                route=self,
+                sequence=sequence,
+                location=location[:100],
+                location_key=normalize_location(location)[:100],
+                offset_minutes=0 if sequence == 0 else None,
+            )
+            for sequence, location in enumerate(locations)
+        ]
+
+    def sync_route_stops(self):
+        """
+        Rebuild the `RouteStop` rows of this route from its locations, keeping the known offsets of existing stops.
+        """
+        offsets = dict(self.route_stops.values_list("location_key", "offset_minutes"))
+        route_stops = self.build_route_stops()
+        for route_stop in route_stops:
+            if offsets.get(route_stop.location_key) is not None:
+                route_stop.offset_minutes = offsets[route_stop.location_key]
+        self.route_stops.all().delete()
+        RouteStop.objects.bulk_create(route_stops)
+
+
+class RouteStop(models.Model):
+    """
+    Model representing an ordered stop of a bus route, including its start and end locations.
+
+    Attributes
+    ----------
+    route : Route
+        The route the stop belongs to.
+    sequence : int
+        Position of the stop on the route, starting from 0 for the start location.
+    location : str
+        Name of the stop.
+    location_key : str
+        Normalized `location` used for searching.
+    offset_minutes : int, optional
+        Minutes after the scheduled departure at which the bus reaches the stop, if known.
+    """
+
+    route = models.ForeignKey(
+        Route,
+        on_delete=models.CASCADE,
+        related_name="route_stops",
+        verbose_name=_("Route"),
+        help_text=_("The route the stop belongs to."),
+    )
+    sequence = models.PositiveSmallIntegerField(
+        verbose_name=_("Sequence"), help_text=_("Position of the stop on the route, starting from 0.")
+    )
+    location = models.CharField(max_length=100, verbose_name=_("Location"), help_text=_("Name of the stop."))
+    location_key = models.CharField(
+        max_length=100, editable=False, verbose_name=_("Location Key"), help_text=_("Normalized location.")
+    )
+    offset_minutes = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_("Offset Minutes"),
+        help_text=_("Minutes after the scheduled departure at which the bus reaches the stop."),
+    )
+
+    class Meta:
+        ordering = ["route", "sequence"]
+        constraints = [
+            models.UniqueConstraint(fields=["route", "sequence"], name="route_stop_route_sequence_unique"),
+        ]
+        indexes = [
+            models.Index(fields=["location_key", "route", "sequence"], name="route_stop_location_key_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.route} - {self.sequence}. {self.location}"
+
+    def save(self, *args, **kwargs):
+        self.location_key = normalize_location(self.location)
+        return super().save(*args, **kwargs)
+
 
 class BusRoute(models.Model):
     """
@@ -102,6 +224,10 @@ class BusRoute(models.Model):
         Date on which the bus is scheduled for this route.
     available_seats : int
         Number of seats available for booking on this bus.
+    seat_map : bytes
+        Bitmap of the booked seats, one bit per seat of the bus (see `bus.inventory.SeatMap`).
+    updated_at : datetime.datetime
+        Time of the last modification.
     """
 
     bus = models.ForeignKey(
@@ -114,6 +240,22 @@ class BusRoute(models.Model):
     available_seats = models.IntegerField(
         verbose_name=_("Available Seats"), help_text=_("Number of seats available for booking on this bus.")
     )
+    seat_map = models.BinaryField(
+        default=b"", blank=True, verbose_name=_("Seat Map"), help_text=_("Bitmap of the booked seats on this bus.")
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated At"))
+
+    class Meta:
+        # NOTE: The upper bound (`Bus.capacity`) lives on another table, which a CHECK constraint cannot reference.
+        # It is enforced by `BusRouteSerializer.validate` and seat releases never exceed what was reserved.
+        constraints = [
+            models.CheckConstraint(check=models.Q(available_seats__gte=0), name="bus_route_available_seats_gte_0"),
+            # A bus runs a route once a day, which lets the schedule generator skip existing trips
+            models.UniqueConstraint(fields=["bus", "route", "date"], name="bus_route_bus_route_date_unique"),
+        ]
+        indexes = [
+            models.Index(fields=["route", "date"], name="bus_route_route_date_idx"),
+        ]
 
     def __str__(self):
         return f"{self.bus.bus_number} on {self.route} - {self.date}"
@@ -143,6 +285,12 @@ class Booking(models.Model):
         help_text=_("Multiple bookings for different routes."),
     )
 
+    class Meta:
+        indexes = [
+            # Keyset pagination, see `BookingViewSet`
+            models.Index(fields=["booking_time", "id"], name="booking_booking_time_id_idx"),
+        ]
+
     def __str__(self):
         return f"Booking by {self.user.username}"
 
@@ -156,7 +304,9 @@ class BookingDetail(models.Model):
     bus_route : BusRoute
         The specific bus and route being booked.
     seat_numbers : int
-        The seat numbers assigned for this bus route.
+        The number of seats booked on this bus route.
+    seats : list[int]
+        The seat numbers (starting from 1) assigned for this bus route.
     """
 
     bus_route = models.ForeignKey(
@@ -168,6 +318,231 @@ class BookingDetail(models.Model):
     seat_numbers = models.IntegerField(
         verbose_name=_("Seat Numbers"), help_text=_("The list of seat numbers assigned to the user for this route.")
     )
+    seats = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name=_("Seats"),
+        help_text=_("The seat numbers (starting from 1) assigned to the user for this route."),
+    )
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(check=models.Q(seat_numbers__gt=0), name="booking_detail_seat_numbers_gt_0"),
+        ]
 
     def __str__(self):
         return f"{self.bus_route} - Seats: {self.seat_numbers}"
+
+
+class SeatHold(models.Model):
+    """
+    Model representing seats held on a bus route between seat selection and payment.
+
+    Holds are kept in Redis when available (see `bus.holds`), these rows are the fallback store.
+
+    Attributes
+    ----------
+    id : uuid.UUID
+        Unguessable identifier of the hold.
+    bus_route : BusRoute
+        The bus route the seats are held on.
+    user : User
+        The user holding the seats.
+    seats : list[int]
+        The held seat numbers (starting from 1).
+    expires_at : datetime.datetime
+        Time after which the seats are available again.
+    created_at : datetime.datetime
+        Time when the seats were held.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    bus_route = models.ForeignKey(
+        BusRoute,
+        on_delete=models.CASCADE,
+        related_name="seat_holds",
+        verbose_name=_("Bus Route"),
+        help_text=_("The bus route the seats are held on."),
+    )
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, verbose_name=_("User"), help_text=_("The user holding the seats.")
+    )
+    seats = models.JSONField(default=list, verbose_name=_("Seats"), help_text=_("The held seat numbers (starting from 1)."))
+    expires_at = models.DateTimeField(
+        verbose_name=_("Expires At"), help_text=_("Time after which the seats are available again.")
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Created At"))
+
+    class Meta:
+        indexes = [
+            # Held seats of a bus route, and the expiry sweep (which only scans the expired holds)
+            models.Index(fields=["bus_route", "expires_at"], name="seat_hold_bus_route_idx"),
+            models.Index(fields=["expires_at"], name="seat_hold_expires_at_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.bus_route} - Held seats: {self.seats}"
+
+    @property
+    def seat_numbers(self):
+        return len(self.seats)
+
+
+class DailyRouteOccupancy(models.Model):
+    """
+    Model representing the occupancy of the buses of one type on a route and date, for the operator reports.
+
+    Rows are kept up to date by the seat inventory and the bus route signals (see `bus.occupancy`), so reports
+    read one row per route, date and bus type instead of the booking details. `rebuild_occupancy` recomputes them.
+
+    Attributes
+    ----------
+    route : Route
+        The route of the buses.
+    date : datetime.date
+        Date on which the buses are scheduled for the route.
+    bus_type : str
+        Type of the buses.
+    departures : int
+        Number of buses scheduled.
+    capacity : int
+        Total number of seats of the buses.
+    seats_sold : int
+        Number of seats booked on the buses.
+    bookings : int
+        Number of booking details on the buses.
+    updated_at : datetime.datetime
+        Time of the last modification.
+    """
+
+    route = models.ForeignKey(
+        Route,
+        on_delete=models.CASCADE,
+        related_name="daily_occupancy",
+        verbose_name=_("Route"),
+        help_text=_("The route of the buses."),
+    )
+    date = models.DateField(verbose_name=_("Date"), help_text=_("Date on which the buses are scheduled for the route."))
+    bus_type = models.CharField(
+        max_length=20, choices=Bus.BusType.choices, verbose_name=_("Bus Type"), help_text=_("Type of the buses.")
+    )
+    departures = models.PositiveIntegerField(
+        default=0, verbose_name=_("Departures"), help_text=_("Number of buses scheduled.")
+    )
+    capacity = models.PositiveIntegerField(
+        default=0, verbose_name=_("Capacity"), help_text=_("Total number of seats of the buses.")
+    )
+    seats_sold = models.PositiveIntegerField(
+        default=0, verbose_name=_("Seats Sold"), help_text=_("Number of seats booked on the buses.")
+    )
+    bookings = models.PositiveIntegerField(
+        default=0, verbose_name=_("Bookings"), help_text=_("Number of booking details on the buses.")
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated At"))
+
+    class Meta:
+        verbose_name_plural = _("Daily route occupancy")
+        constraints = [
+            models.UniqueConstraint(fields=["route", "date", "bus_type"], name="daily_route_occupancy_unique"),
+        ]
+        indexes = [
+            # Reports over a date range of every route
+            models.Index(fields=["date"], name="daily_route_occupancy_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.route} - {self.date} ({self.bus_type}): {self.seats_sold}/{self.capacity}"
+
+    @property
+    def load_factor(self):
+        return self.seats_sold / self.capacity if self.capacity else None
+
+
+class ScheduleTemplate(models.Model):
+    """
+    Model representing a recurring trip of a bus on a route, from which the `BusRoute` rows are generated.
+
+    See `bus.schedules.generate_bus_routes`.
+
+    Attributes
+    ----------
+    route : Route
+        The route the bus runs.
+    bus : Bus
+        The bus running the route.
+    weekdays : int
+        Bitmask of the weekdays the bus runs, bit 0 for Monday to bit 6 for Sunday.
+    valid_from : datetime.date
+        First day of the schedule.
+    valid_to : datetime.date or None
+        Last day of the schedule, open-ended when None.
+    available_seats : int or None
+        Seats available for booking on each trip, the capacity of the bus when None.
+    is_active : bool
+        Whether trips are generated from the template.
+    created_at : datetime.datetime
+        Time when the template was created.
+    updated_at : datetime.datetime
+        Time of the last modification.
+    """
+
+    EVERY_DAY = 0b1111111
+
+    route = models.ForeignKey(
+        Route,
+        on_delete=models.CASCADE,
+        related_name="schedule_templates",
+        verbose_name=_("Route"),
+        help_text=_("The route the bus runs."),
+    )
+    bus = models.ForeignKey(
+        Bus,
+        on_delete=models.CASCADE,
+        related_name="schedule_templates",
+        verbose_name=_("Bus"),
+        help_text=_("The bus running the route."),
+    )
+    weekdays = models.PositiveSmallIntegerField(
+        default=EVERY_DAY,
+        verbose_name=_("Weekdays"),
+        help_text=_("Bitmask of the weekdays the bus runs, 1 for Monday, 2 for Tuesday, ... 64 for Sunday (127: daily)."),
+    )
+    valid_from = models.DateField(verbose_name=_("Valid From"), help_text=_("First day of the schedule."))
+    valid_to = models.DateField(
+        null=True, blank=True, verbose_name=_("Valid To"), help_text=_("Last day of the schedule, empty if open-ended.")
+    )
+    available_seats = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_("Available Seats"),
+        help_text=_("Seats available for booking on each trip, the capacity of the bus if empty."),
+    )
+    is_active = models.BooleanField(
+        default=True, verbose_name=_("Is Active"), help_text=_("Whether trips are generated from this template.")
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Created At"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated At"))
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(weekdays__gte=1, weekdays__lte=0b1111111), name="schedule_template_weekdays_valid"
+            ),
+            models.CheckConstraint(
+                check=models.Q(valid_to__isnull=True) | models.Q(valid_to__gte=models.F("valid_from")),
+                name="schedule_template_valid_to_gte_valid_from",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.bus.bus_number} on {self.route} from {self.valid_from}"
+
+    def runs_on(self, date):
+        """
+        Return whether the bus runs the route on `date`.
+        """
+        return (
+            self.valid_from <= date
+            and (self.valid_to is None or date <= self.valid_to)
+            and bool(self.weekdays & (1 << date.weekday()))
+        )
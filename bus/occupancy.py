@@ -0,0 +1,148 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from main.metrics import BOOKING_DETAILS, SEATS
+
+from .models import BookingDetail, BusRoute, DailyRouteOccupancy
+
+OCCUPANCY_FIELDS = ["departures", "capacity", "seats_sold", "bookings"]
+
+
+def occupancy_key(bus_route):
+    """
+    Return the `DailyRouteOccupancy` row of a bus route (with its bus loaded) as a (route id, date, bus type) key.
+    """
+    return bus_route.route_id, bus_route.date, bus_route.bus.bus_type
+
+
+def compute_occupancy(bus_routes):
+    """
+    Compute the occupancy of the `bus_routes` queryset from the bus routes and booking details, in two grouped
+    queries.
+
+    Returns the `OCCUPANCY_FIELDS` values by (route id, date, bus type) key.
+    """
+    rows = {}
+    departures = (
+        bus_routes.values("route_id", "date", "bus__bus_type")
+        .annotate(departures=Count("id"), capacity=Sum("bus__capacity"))
+        .order_by()
+    )
+    for row in departures:
+        rows[(row["route_id"], row["date"], row["bus__bus_type"])] = {
+            "departures": row["departures"],
+            "capacity": row["capacity"],
+            "seats_sold": 0,
+            "bookings": 0,
+        }
+    sales = (
+        BookingDetail.objects.filter(bus_route__in=bus_routes)
+        .values("bus_route__route_id", "bus_route__date", "bus_route__bus__bus_type")
+        .annotate(seats_sold=Sum("seat_numbers"), bookings=Count("id"))
+        .order_by()
+    )
+    for row in sales:
+        key = (row["bus_route__route_id"], row["bus_route__date"], row["bus_route__bus__bus_type"])
+        rows[key].update(seats_sold=row["seats_sold"], bookings=row["bookings"])
+    return rows
+
+
+def _write_occupancy(locked, rows):
+    """
+    Store the computed `rows` over the `locked` occupancy rows, creating and deleting rows as needed.
+    """
+    now = timezone.now()
+    changed, created = [], []
+    for key, values in rows.items():
+        occupancy = locked.pop(key, None)
+        if occupancy is None:
+            route_id, date, bus_type = key
+            created.append(DailyRouteOccupancy(route_id=route_id, date=date, bus_type=bus_type, **values))
+            continue
+        if all(getattr(occupancy, field) == value for field, value in values.items()):
+            continue
+        for field, value in values.items():
+            setattr(occupancy, field, value)
+        # `bulk_update` skips the `auto_now` of `updated_at`
+        occupancy.updated_at = now
+        changed.append(occupancy)
+    DailyRouteOccupancy.objects.bulk_update(changed, [*OCCUPANCY_FIELDS, "updated_at"], batch_size=1000)
+    DailyRouteOccupancy.objects.bulk_create(created, batch_size=1000)
+    # Nothing is scheduled on those anymore
+    DailyRouteOccupancy.objects.filter(pk__in=[occupancy.pk for occupancy in locked.values()]).delete()
+
+
+def _lock_occupancy(occupancy):
+    rows = occupancy.select_for_update().order_by("route_id", "date", "bus_type")
+    return {(row.route_id, row.date, row.bus_type): row for row in rows}
+
+
+def refresh_occupancy(keys):
+    """
+    Recompute the occupancy rows of the (route id, date, bus type) `keys`, e.g. after bus routes were created,
+    moved or deleted.
+
+    The existing rows are locked before computing them, so bookings recorded meanwhile by `record_bookings` are
+    applied on top of the recomputed values instead of being overwritten.
+    """
+    keys = set(keys)
+    if not keys:
+        return
+    occupancy, bus_routes = Q(), Q()
+    for route_id, date, bus_type in keys:
+        occupancy |= Q(route_id=route_id, date=date, bus_type=bus_type)
+        bus_routes |= Q(route_id=route_id, date=date, bus__bus_type=bus_type)
+    with transaction.atomic():
+        locked = _lock_occupancy(DailyRouteOccupancy.objects.filter(occupancy))
+        _write_occupancy(locked, compute_occupancy(BusRoute.objects.filter(bus_routes)))
+
+
+def rebuild_occupancy(start, end):
+    """
+    Recompute the occupancy rows of every route between the `start` and `end` dates, returning the number of rows.
+
+    Like `refresh_occupancy`, the existing rows are updated in place under a lock, so a rebuild can run while
+    bookings are made.
+    """
+    with transaction.atomic():
+        locked = _lock_occupancy(DailyRouteOccupancy.objects.filter(date__range=(start, end)))
+        rows = compute_occupancy(BusRoute.objects.filter(date__range=(start, end)))
+        _write_occupancy(locked, rows)
+    return len(rows)
+
+
+def record_bookings(details, bus_routes, sign=1):
+    """
+    Add the seats of booked `BookingDetail` instances to the occupancy of their bus routes, or remove them with a
+    `sign` of -1 when the seats are released.
+
+    `bus_routes` are the (locked) bus routes of the details by id. Each affected row is changed with a single
+    relative `UPDATE`, in key order so concurrent bookings cannot deadlock on them. Rows that do not exist yet are
+    left to `rebuild_occupancy`. The seat and booking detail metrics are counted once the transaction commits.
+    """
+    changes = defaultdict(lambda: {"seats_sold": 0, "bookings": 0})
+    seats = count = 0
+    for detail in details:
+        change = changes[occupancy_key(bus_routes[detail.bus_route_id])]
+        change["seats_sold"] += sign * detail.seat_numbers
+        change["bookings"] += sign
+        seats += detail.seat_numbers
+        count += 1
+    now = timezone.now()
+    for (route_id, date, bus_type), change in sorted(changes.items()):
+        DailyRouteOccupancy.objects.filter(route_id=route_id, date=date, bus_type=bus_type).update(
+            seats_sold=F("seats_sold") + change["seats_sold"],
+            bookings=F("bookings") + change["bookings"],
+            updated_at=now,
+        )
+
+    event = "booked" if sign > 0 else "released"
+
+    def count_bookings():
+        SEATS.inc(seats, event=event)
+        BOOKING_DETAILS.inc(count, event=event)
+
+    transaction.on_commit(count_bookings)
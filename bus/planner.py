@@ -0,0 +1,222 @@
+import bisect
+import datetime
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+
+from django.core.cache import cache
+
+from .models import BusRoute, RouteStop
+
+# Travel time assumed for a route whose end stop has no known offset.
+DEFAULT_TRIP_MINUTES = 8 * 60
+TIMETABLE_VERSION_CACHE_KEY = "bus:planner:timetable-version"
+# Number of times a plan is recomputed after a leg turned out to be sold out.
+MAX_REPLANS = 3
+
+
+@dataclass(frozen=True)
+class Connection:
+    """
+    A ride on a bus route from one of its stops to a later one.
+    """
+
+    departure: datetime.datetime
+    arrival: datetime.datetime
+    bus_route_id: int
+    bus_number: str
+    from_key: str
+    from_location: str
+    to_key: str
+    to_location: str
+
+
+def _stop_offsets(stops):
+    """
+    Return the offset in minutes of every stop, interpolating the unknown ones between the known ones.
+    """
+    offsets = [stop["offset_minutes"] for stop in stops]
+    offsets[0] = offsets[0] or 0
+    if offsets[-1] is None:
+        offsets[-1] = max([DEFAULT_TRIP_MINUTES, *[offset for offset in offsets if offset is not None]])
+    last_known = 0
+    for index, offset in enumerate(offsets):
+        if offset is None:
+            next_known = next(i for i in range(index + 1, len(offsets)) if offsets[i] is not None)
+            step = (offsets[next_known] - offsets[last_known]) / (next_known - last_known)
+            offsets[index] = offsets[last_known] + step * (index - last_known)
+        else:
+            last_known = index
+    return offsets
+
+
+class Timetable:
+    """
+    Time-expanded graph of all bus route departures of a day.
+
+    Connections are grouped by boarding stop and sorted by departure, so finding the next departures from a stop is
+    a binary search.
+    """
+
+    def __init__(self, connections):
+        self.departures = defaultdict(list)
+        for connection in sorted(connections, key=lambda connection: connection.departure):
+            self.departures[connection.from_key].append(connection)
+        self.departure_times = {key: [c.departure for c in value] for key, value in self.departures.items()}
+
+    @classmethod
+    def build(cls, date):
+        bus_routes = list(
+            BusRoute.objects.filter(date=date, bus__availability_status=True, available_seats__gt=0).values(
+                "id", "route_id", "date", "route__scheduled_time", "bus__bus_number"
+            )
+        )
+        stops_by_route = defaultdict(list)
+        route_stops = RouteStop.objects.filter(route_id__in={bus_route["route_id"] for bus_route in bus_routes})
+        for stop in route_stops.order_by("route_id", "sequence").values(
+            "route_id", "location", "location_key", "offset_minutes"
+        ):
+            stops_by_route[stop["route_id"]].append(stop)
+
+        connections = []
+        for bus_route in bus_routes:
+            stops = stops_by_route[bus_route["route_id"]]
+            if len(stops) < 2:
+                continue
+            departure = datetime.datetime.combine(bus_route["date"], bus_route["route__scheduled_time"])
+            times = [departure + datetime.timedelta(minutes=offset) for offset in _stop_offsets(stops)]
+            for board in range(len(stops) - 1):
+                for alight in range(board + 1, len(stops)):
+                    connections.append(
+                        Connection(
+                            departure=times[board],
+                            arrival=times[alight],
+                            bus_route_id=bus_route["id"],
+                            bus_number=bus_route["bus__bus_number"],
+                            from_key=stops[board]["location_key"],
+                            from_location=stops[board]["location"],
+                            to_key=stops[alight]["location_key"],
+                            to_location=stops[alight]["location"],
+                        )
+                    )
+        return cls(connections)
+
+    def next_departures(self, location_key, ready):
+        connections = self.departures.get(location_key, [])
+        return connections[bisect.bisect_left(self.departure_times.get(location_key, []), ready) :]
+
+
+class TimetableCache:
+    """
+    Per-process cache of the daily timetables.
+
+    Signals bump a version number in the shared Django cache whenever buses, routes or bus routes change, so every
+    process rebuilds its timetables lazily after the next change.
+    """
+
+    def __init__(self):
+        self.timetables = {}
+        self.lock = threading.Lock()
+
+    def get(self, date):
+        version = cache.get(TIMETABLE_VERSION_CACHE_KEY, 0)
+        cached = self.timetables.get(date)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        timetable = Timetable.build(date)
+        with self.lock:
+            if len(self.timetables) > 32:
+                self.timetables.clear()
+            self.timetables[date] = (version, timetable)
+        return timetable
+
+    def clear(self):
+        with self.lock:
+            self.timetables.clear()
+
+
+timetables = TimetableCache()
+
+
+def invalidate_timetables():
+    try:
+        cache.incr(TIMETABLE_VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(TIMETABLE_VERSION_CACHE_KEY, 1, timeout=None)
+    timetables.clear()
+
+
+def _search(timetables_by_day, origin, destination, departure_after, max_legs, min_transfer, excluded):
+    """
+    Round based earliest arrival search: round `k` finds the earliest arrival at every stop using at most `k` buses.
+
+    Returns one journey (a list of connections) for every number of legs that arrives earlier than with fewer legs.
+    """
+    # label: stop -> (ready time for the next departure, arrival time, connection used, round of the previous label)
+    labels = [{origin: (departure_after, departure_after, None, None)}]
+    marked = {origin}
+    journeys = []
+    for round_number in range(1, max_legs + 1):
+        previous = labels[-1]
+        current = dict(previous)
+        improved = set()
+        for stop in marked:
+            ready = previous[stop][0]
+            # Journeys have to leave on the first day, later days are only used for connections.
+            for timetable in timetables_by_day[:1] if stop == origin else timetables_by_day:
+                for connection in timetable.next_departures(stop, ready):
+                    if connection.bus_route_id in excluded or connection.to_key == origin:
+                        continue
+                    label = current.get(connection.to_key)
+                    if label is not None and label[1] <= connection.arrival:
+                        continue
+                    current[connection.to_key] = (
+                        connection.arrival + min_transfer,
+                        connection.arrival,
+                        connection,
+                        round_number - 1,
+                    )
+                    improved.add(connection.to_key)
+        labels.append(current)
+        marked = improved
+        if destination in improved:
+            journeys.append(_journey(labels, destination, round_number))
+        if not marked:
+            break
+    return journeys
+
+
+def _journey(labels, stop, round_number):
+    legs = []
+    while True:
+        _, _, connection, previous_round = labels[round_number][stop]
+        if connection is None:
+            return legs[::-1]
+        legs.append(connection)
+        stop, round_number = connection.from_key, previous_round
+
+
+def plan_journeys(origin, destination, date, passengers=1, max_legs=3, min_transfer_minutes=30, days=2):
+    """
+    Find the journeys from `origin` to `destination` leaving on `date`, with up to `max_legs` buses.
+
+    `origin` and `destination` are normalized location keys. Trips of the following `days - 1` days are considered
+    for overnight connections. Every returned journey arrives earlier than the journeys with fewer legs, and all of
+    its bus routes have at least `passengers` seats left.
+    """
+    timetables_by_day = [timetables.get(date + datetime.timedelta(days=day)) for day in range(days)]
+    departure_after = datetime.datetime.combine(date, datetime.time.min)
+    min_transfer = datetime.timedelta(minutes=min_transfer_minutes)
+
+    excluded = set()
+    for _ in range(MAX_REPLANS + 1):
+        journeys = _search(timetables_by_day, origin, destination, departure_after, max_legs, min_transfer, excluded)
+        bus_route_ids = {connection.bus_route_id for journey in journeys for connection in journey}
+        # The timetables are cached, so check the seats of the legs against the live inventory.
+        sold_out = set(
+            BusRoute.objects.filter(pk__in=bus_route_ids, available_seats__lt=passengers).values_list("pk", flat=True)
+        )
+        if not sold_out:
+            return journeys
+        excluded |= sold_out
+    return [journey for journey in journeys if not {c.bus_route_id for c in journey} & excluded]
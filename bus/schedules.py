@@ -0,0 +1,63 @@
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .availability import invalidate_route_calendar
+from .models import BusRoute, ScheduleTemplate
+from .occupancy import rebuild_occupancy
+from .planner import invalidate_timetables
+
+
+def scheduled_bus_routes(templates, start, end, existing=frozenset()):
+    """
+    Yield the (unsaved) `BusRoute` trips of `templates` between the `start` and `end` dates, except the
+    (bus id, route id, date) trips of `existing`.
+    """
+    days = [start + datetime.timedelta(days=offset) for offset in range((end - start).days + 1)]
+    for template in templates:
+        available_seats = template.bus.capacity if template.available_seats is None else template.available_seats
+        for date in days:
+            if template.runs_on(date) and (template.bus_id, template.route_id, date) not in existing:
+                yield BusRoute(
+                    bus_id=template.bus_id, route_id=template.route_id, date=date, available_seats=available_seats
+                )
+
+
+def generate_bus_routes(days=None, start=None, batch_size=1000):
+    """
+    Create the `BusRoute` trips of the active schedule templates for `days` days from `start` (today by default),
+    returning the number of trips created.
+
+    The trips that already exist (generated before, or created by hand) are skipped, and the ones created
+    concurrently are ignored by `bulk_create(ignore_conflicts=True)` thanks to the unique (bus, route, date)
+    constraint, so running the generator again is harmless. As `bulk_create` sends no signals, the caches and
+    the occupancy rollup of the generated dates are refreshed once at the end.
+    """
+    days = settings.SCHEDULE_DAYS_AHEAD if days is None else days
+    start = start or timezone.localdate()
+    end = start + datetime.timedelta(days=days - 1)
+    templates = (
+        ScheduleTemplate.objects.filter(is_active=True, valid_from__lte=end)
+        .filter(Q(valid_to__isnull=True) | Q(valid_to__gte=start))
+        .select_related("bus")
+    )
+    generated = BusRoute.objects.filter(date__range=(start, end))
+
+    with transaction.atomic():
+        # Building and inserting the trips costs far more than listing the existing ones, which makes reruns cheap
+        existing = set(generated.values_list("bus_id", "route_id", "date"))
+        BusRoute.objects.bulk_create(
+            scheduled_bus_routes(templates, start, end, existing), batch_size=batch_size, ignore_conflicts=True
+        )
+        created = generated.count() - len(existing)
+        if created:
+            rebuild_occupancy(start, end)
+
+    if created:
+        invalidate_timetables()
+        for route_id in set(templates.values_list("route_id", flat=True)):
+            invalidate_route_calendar(route_id)
+    return created
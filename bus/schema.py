@@ -0,0 +1,114 @@
+from typing import List
+
+import strawberry
+import strawberry_django
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Sum
+from django.utils import timezone
+from strawberry import auto
+from strawberry.types import Info
+
+from main.graphql import PageField, get_loader
+
+from . import models
+
+
+async def load_upcoming_trips(route_ids):
+    """
+    Load the number of trips with free seats from today of every route, in one query.
+    """
+    trips = (
+        models.BusRoute.objects.filter(route_id__in=route_ids, date__gte=timezone.localdate(), available_seats__gt=0)
+        .values("route_id")
+        .annotate(trips=Count("id"))
+        .values_list("route_id", "trips")
+        .order_by()
+    )
+    counts = await sync_to_async(dict)(trips)
+    return [counts.get(route_id, 0) for route_id in route_ids]
+
+
+async def load_booked_seats(bus_route_ids):
+    """
+    Load the number of booked seats of every bus route, in one query.
+    """
+    seats = (
+        models.BookingDetail.objects.filter(bus_route_id__in=bus_route_ids)
+        .values("bus_route_id")
+        .annotate(seats=Sum("seat_numbers"))
+        .values_list("bus_route_id", "seats")
+        .order_by()
+    )
+    counts = await sync_to_async(dict)(seats)
+    return [counts.get(bus_route_id, 0) for bus_route_id in bus_route_ids]
+
+
+@strawberry_django.type(models.Bus)
+class Bus:
+    id: auto
+    bus_number: auto
+    bus_type: auto
+    capacity: auto
+    availability_status: auto
+    bus_routes: List["BusRoute"] = strawberry_django.field(field_name="busroute_set", field_cls=PageField)
+
+
+@strawberry_django.type(models.Route)
+class Route:
+    id: auto
+    start_location: auto
+    end_location: auto
+    stops: auto
+    scheduled_time: auto
+    bus_routes: List["BusRoute"] = strawberry_django.field(field_name="busroute_set", field_cls=PageField)
+
+    @strawberry_django.field(only=["id"], description="Number of trips with free seats from today.")
+    async def upcoming_trips(self, info: Info) -> int:
+        return await get_loader(info, load_upcoming_trips).load(self.pk)
+
+
+@strawberry_django.type(models.BusRoute)
+class BusRoute:
+    id: auto
+    bus: Bus
+    route: Route
+    date: auto
+    available_seats: auto
+    booking_details: List["BookingDetail"] = strawberry_django.field(field_name="bookingdetail_set", field_cls=PageField)
+
+    @strawberry_django.field(only=["id"], description="Number of seats booked on the bus route.")
+    async def booked_seats(self, info: Info) -> int:
+        return await get_loader(info, load_booked_seats).load(self.pk)
+
+
+@strawberry_django.type(models.BookingDetail)
+class BookingDetail:
+    id: auto
+    bus_route: BusRoute
+    seat_numbers: auto
+    seats: List[int]
+
+
+@strawberry_django.type(models.Booking)
+class Booking:
+    id: auto
+    booking_time: auto
+    book: List[BookingDetail] = strawberry_django.field(field_cls=PageField)
+
+    @strawberry_django.field(only=["user_id"])
+    def user_id(self) -> strawberry.ID:
+        return self.user_id
+
+
+@strawberry.type
+class Query:
+    buses: List[Bus] = strawberry_django.field(field_cls=PageField)
+    bus: Bus = strawberry_django.field()
+    routes: List[Route] = strawberry_django.field(field_cls=PageField)
+    route: Route = strawberry_django.field()
+    bus_routes: List[BusRoute] = strawberry_django.field(field_cls=PageField)
+    bus_route: BusRoute = strawberry_django.field()
+    bookings: List[Booking] = strawberry_django.field(field_cls=PageField)
+    booking: Booking = strawberry_django.field()
+    booking_details: List[BookingDetail] = strawberry_django.field(field_cls=PageField)
+    booking_detail: BookingDetail = strawberry_django.field()
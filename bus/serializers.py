@@ -1,8 +1,21 @@
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from drf_writable_nested.serializers import NestedCreateMixin, NestedUpdateMixin
 from rest_framework import serializers
 
-from .models import Booking, BookingDetail, Bus, BusRoute, Route
+from .availability import MAX_CALENDAR_DAYS
+from .holds import hold_seats
+from .inventory import SeatMap, SeatsUnavailable
+from .locations import MAX_SUGGESTIONS
+from .models import (
+    Booking,
+    BookingDetail,
+    Bus,
+    BusRoute,
+    DailyRouteOccupancy,
+    Route,
+    SeatHold,
+)
 
 
 class BusSerializer(serializers.ModelSerializer):
@@ -50,9 +63,57 @@ class BusRouteSerializer(serializers.ModelSerializer):
         fields = ["id", "bus", "route", "date", "available_seats", "bus_details", "route_details"]
         extra_kwargs = {
             "date": {"help_text": _("Date on which the bus is scheduled for this route.")},
-            "available_seats": {"help_text": _("Number of seats available for booking on this bus.")},
+            "available_seats": {"help_text": _("Number of seats available for booking on this bus."), "min_value": 0},
         }
 
+    def validate(self, attrs):
+        bus = attrs.get("bus", getattr(self.instance, "bus", None))
+        available_seats = attrs.get("available_seats", getattr(self.instance, "available_seats", None))
+        if bus is not None and available_seats is not None and available_seats > bus.capacity:
+            raise serializers.ValidationError(
+                {
+                    "available_seats": _("Available seats cannot exceed the bus capacity (%(capacity)s).")
+                    % {"capacity": bus.capacity}
+                }
+            )
+        return attrs
+
+
+class BusRouteSeatMapSerializer(serializers.Serializer):
+    """
+    Serializer for the seat map of a BusRoute.
+    """
+
+    id = serializers.IntegerField(read_only=True)
+    capacity = serializers.IntegerField(read_only=True, help_text=_("Total number of seats available on the bus."))
+    available_seats = serializers.IntegerField(
+        read_only=True, help_text=_("Number of seats available for booking on this bus.")
+    )
+    seat_map = serializers.CharField(
+        read_only=True,
+        help_text=_(
+            "Base64 encoded bitmap of the booked seats: bit (n - 1) % 8 of byte (n - 1) // 8 is set when seat n is booked."
+        ),
+    )
+
+
+def validate_seat_count(attrs, partial=False):
+    """
+    Check that `seats` and `seat_numbers` of booking detail data agree, filling `seat_numbers` from `seats`.
+    """
+    seats = attrs.get("seats")
+    if not seats:
+        if "seat_numbers" not in attrs and not partial:
+            raise serializers.ValidationError({"seat_numbers": _("Either seat numbers or seats are required.")})
+        return attrs
+
+    if len(set(seats)) != len(seats):
+        raise serializers.ValidationError({"seats": _("Seats must not be repeated.")})
+    seat_numbers = attrs.setdefault("seat_numbers", len(seats))
+    if seat_numbers != len(seats):
+        raise serializers.ValidationError({"seats": _("The number of seats must match seat numbers.")})
+    return attrs
+
 
 class BookingDetailSerializer(serializers.ModelSerializer):
     """
@@ -60,11 +121,51 @@ class BookingDetailSerializer(serializers.ModelSerializer):
     """
 
     bus_route_details = BusRouteSerializer(read_only=True)
+    seats = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        help_text=_("The seat numbers (starting from 1) to book. Free seats are assigned when omitted."),
+    )
 
     class Meta:
         model = BookingDetail
-        fields = ["id", "bus_route", "seat_numbers", "bus_route_details"]
-        extra_kwargs = {"seat_numbers": {"help_text": _("The list of seat numbers assigned to the user for this route.")}}
+        fields = ["id", "bus_route", "seat_numbers", "seats", "bus_route_details"]
+        extra_kwargs = {
+            "seat_numbers": {
+                "help_text": _("The list of seat numbers assigned to the user for this route."),
+                "min_value": 1,
+                "required": False,
+            }
+        }
+
+    def validate(self, attrs):
+        attrs = validate_seat_count(attrs, partial=self.instance is not None)
+        seats = attrs.get("seats")
+        if not seats:
+            return attrs
+
+        # Early rejection of taken seats, the authoritative check happens under a row lock when reserving.
+        bus_route = attrs.get("bus_route", getattr(self.instance, "bus_route", None))
+        seat_map = SeatMap.for_bus_route(bus_route)
+        held = self.get_reserved_seats(bus_route)
+        for seat in seats:
+            if not seat_map.is_valid(seat) or (seat_map.is_taken(seat) and seat not in held):
+                raise serializers.ValidationError(
+                    {"seats": _("Seat %(seat)s is not available on this bus route.") % {"seat": seat}}
+                )
+        return attrs
+
+    def get_reserved_seats(self, bus_route):
+        """
+        Return the seats of `bus_route` reserved by the detail being updated, which it may keep. Nested in a
+        `BookingSerializer` the detail has no instance, the seats of the booking on `bus_route` are kept instead.
+        """
+        if self.instance is not None:
+            return set(self.instance.seats) if self.instance.bus_route_id == bus_route.pk else set()
+        booking = getattr(getattr(self.parent, "parent", None), "instance", None)
+        if not isinstance(booking, Booking):
+            return set()
+        return {seat for detail in booking.book.all() if detail.bus_route_id == bus_route.pk for seat in detail.seats}
 
 
 class BookingSerializer(NestedUpdateMixin, NestedCreateMixin, serializers.ModelSerializer):
@@ -78,3 +179,289 @@ class BookingSerializer(NestedUpdateMixin, NestedCreateMixin, serializers.ModelS
         model = Booking
         fields = ["id", "user", "booking_time", "book"]
         extra_kwargs = {"booking_time": {"help_text": _("Time when the booking was made.")}}
+
+
+class BulkBookingDetailSerializer(serializers.Serializer):
+    """
+    Serializer for a booking detail of a bulk booking.
+
+    Bus routes are looked up in the `bus_routes` of the serializer context, loaded once for the whole batch.
+    """
+
+    id = serializers.IntegerField(read_only=True)
+    bus_route = serializers.IntegerField(source="bus_route_id", help_text=_("The bus route to book."))
+    seat_numbers = serializers.IntegerField(
+        min_value=1, required=False, help_text=_("The number of seats to book on the bus route.")
+    )
+    seats = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        help_text=_("The seat numbers (starting from 1) to book. Free seats are assigned when omitted."),
+    )
+
+    def validate_bus_route(self, value):
+        if value not in self.context["bus_routes"]:
+            raise serializers.ValidationError(_('Invalid pk "%(pk)s" - object does not exist.') % {"pk": value})
+        return value
+
+    def validate(self, attrs):
+        return validate_seat_count(attrs)
+
+
+class BulkBookingSerializer(serializers.Serializer):
+    """
+    Serializer for a booking of a bulk booking.
+
+    Users are looked up in the `users` of the serializer context, loaded once for the whole batch.
+    """
+
+    id = serializers.IntegerField(read_only=True)
+    user = serializers.IntegerField(source="user_id", help_text=_("The user the booking is made for."))
+    booking_time = serializers.DateTimeField(read_only=True, help_text=_("Time when the booking was made."))
+    book = BulkBookingDetailSerializer(many=True, allow_empty=False)
+
+    def validate_user(self, value):
+        if value not in self.context["users"]:
+            raise serializers.ValidationError(_('Invalid pk "%(pk)s" - object does not exist.') % {"pk": value})
+        return value
+
+
+class BulkBookingResultSerializer(serializers.Serializer):
+    """
+    Serializer for the outcome of one booking of a bulk booking.
+    """
+
+    CREATED = "created"
+    REJECTED = "rejected"
+
+    index = serializers.IntegerField(help_text=_("Position of the booking in the request."))
+    status = serializers.ChoiceField(choices=[CREATED, REJECTED])
+    booking = BulkBookingSerializer(required=False, help_text=_("The created booking."))
+    errors = serializers.DictField(required=False, help_text=_("Why the booking was rejected."))
+
+
+class SeatHoldSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the SeatHold model. Saving it holds the seats, see `bus.holds.hold_seats`.
+    """
+
+    bus_route = serializers.PrimaryKeyRelatedField(
+        queryset=BusRoute.objects.select_related("bus"), help_text=_("The bus route to hold seats on.")
+    )
+    seat_numbers = serializers.IntegerField(min_value=1, required=False, help_text=_("The number of seats to hold."))
+    seats = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        help_text=_("The seat numbers (starting from 1) to hold. Free seats are held when omitted."),
+    )
+
+    class Meta:
+        model = SeatHold
+        fields = ["id", "bus_route", "seat_numbers", "seats", "expires_at"]
+        read_only_fields = ["expires_at"]
+
+    def validate(self, attrs):
+        return validate_seat_count(attrs)
+
+    def create(self, validated_data):
+        try:
+            return hold_seats(
+                validated_data["bus_route"],
+                self.context["request"].user,
+                seat_numbers=validated_data["seat_numbers"],
+                seats=validated_data.get("seats"),
+            )
+        except SeatsUnavailable as exc:
+            raise serializers.ValidationError({"seats": [str(exc)]})
+
+
+class TripSearchQuerySerializer(serializers.Serializer):
+    """
+    Serializer for the query parameters of the trip search.
+    """
+
+    from_location = serializers.CharField(help_text=_("Starting point of the trip."))
+    to_location = serializers.CharField(help_text=_("Destination of the trip."))
+    date = serializers.DateField(help_text=_("Date of the trip."))
+    bus_type = serializers.ChoiceField(choices=Bus.BusType.choices, required=False, help_text=_("Type of the bus."))
+    min_seats = serializers.IntegerField(
+        min_value=1, required=False, help_text=_("Minimum number of seats that must be available.")
+    )
+    via_stops = serializers.BooleanField(
+        default=False,
+        help_text=_("Also match buses that pass through both locations as stops, in that order."),
+    )
+
+    def to_internal_value(self, data):
+        # `from` is a reserved word, so accept the short names used by the clients as well.
+        data = {
+            "from_location": data.get("from", data.get("from_location")),
+            "to_location": data.get("to", data.get("to_location")),
+            **{key: data[key] for key in ("date", "bus_type", "min_seats", "via_stops") if key in data},
+        }
+        return super().to_internal_value({key: value for key, value in data.items() if value is not None})
+
+
+class TripSearchResultSerializer(serializers.Serializer):
+    """
+    Flat serializer for trip search results.
+    """
+
+    id = serializers.IntegerField(help_text=_("Bus route id, used for booking."))
+    date = serializers.DateField(help_text=_("Date on which the bus is scheduled for this route."))
+    scheduled_time = serializers.TimeField(source="route__scheduled_time", help_text=_("Scheduled departure time."))
+    start_location = serializers.CharField(source="route__start_location", help_text=_("Starting point of the route."))
+    end_location = serializers.CharField(source="route__end_location", help_text=_("Ending point of the route."))
+    bus_number = serializers.CharField(source="bus__bus_number", help_text=_("Unique identifier for the bus."))
+    bus_type = serializers.CharField(source="bus__bus_type", help_text=_("Type of the bus."))
+    available_seats = serializers.IntegerField(help_text=_("Number of seats available for booking on this bus."))
+
+
+class JourneyQuerySerializer(serializers.Serializer):
+    """
+    Serializer for the query parameters of the journey planner.
+    """
+
+    from_location = serializers.CharField(help_text=_("Starting point of the journey."))
+    to_location = serializers.CharField(help_text=_("Destination of the journey."))
+    date = serializers.DateField(help_text=_("Date of departure."))
+    passengers = serializers.IntegerField(default=1, min_value=1, help_text=_("Number of seats needed on every bus."))
+    max_legs = serializers.IntegerField(default=3, min_value=1, max_value=4, help_text=_("Maximum number of buses."))
+    min_transfer_minutes = serializers.IntegerField(
+        default=30, min_value=0, max_value=24 * 60, help_text=_("Minimum time to change buses, in minutes.")
+    )
+
+    def to_internal_value(self, data):
+        data = {
+            "from_location": data.get("from", data.get("from_location")),
+            "to_location": data.get("to", data.get("to_location")),
+            **{key: data[key] for key in ("date", "passengers", "max_legs", "min_transfer_minutes") if key in data},
+        }
+        return super().to_internal_value({key: value for key, value in data.items() if value is not None})
+
+
+class JourneyLegSerializer(serializers.Serializer):
+    """
+    Serializer for one bus ride of a planned journey.
+    """
+
+    bus_route_id = serializers.IntegerField(help_text=_("Bus route id, used for booking."))
+    bus_number = serializers.CharField(help_text=_("Unique identifier for the bus."))
+    from_location = serializers.CharField(help_text=_("Boarding stop."))
+    to_location = serializers.CharField(help_text=_("Alighting stop."))
+    departure = serializers.DateTimeField(help_text=_("Departure from the boarding stop."))
+    arrival = serializers.DateTimeField(help_text=_("Estimated arrival at the alighting stop."))
+
+
+class JourneySerializer(serializers.Serializer):
+    """
+    Serializer for a planned journey.
+    """
+
+    departure = serializers.DateTimeField(help_text=_("Departure of the first bus."))
+    arrival = serializers.DateTimeField(help_text=_("Estimated arrival of the last bus."))
+    legs = JourneyLegSerializer(many=True)
+
+
+class LocationAutocompleteQuerySerializer(serializers.Serializer):
+    """
+    Serializer for the query parameters of the location autocomplete.
+    """
+
+    q = serializers.CharField(help_text=_("What the user typed so far, in English or in Nepali."))
+    limit = serializers.IntegerField(
+        default=10, min_value=1, max_value=MAX_SUGGESTIONS, help_text=_("Maximum number of suggestions.")
+    )
+
+
+class LocationSerializer(serializers.Serializer):
+    """
+    Serializer for a suggested location.
+    """
+
+    key = serializers.CharField(help_text=_("Normalized location, as matched by the trip search and journey planner."))
+    name = serializers.CharField(help_text=_("Name of the location."))
+    routes = serializers.IntegerField(help_text=_("Number of routes stopping at the location."))
+
+
+class RouteCalendarQuerySerializer(serializers.Serializer):
+    """
+    Serializer for the query parameters of the availability calendar of a route.
+    """
+
+    start = serializers.DateField(default=timezone.localdate, help_text=_("First day of the calendar, today by default."))
+    days = serializers.IntegerField(
+        default=30, min_value=1, max_value=MAX_CALENDAR_DAYS, help_text=_("Number of days of the calendar.")
+    )
+
+
+class RouteCalendarDaySerializer(serializers.Serializer):
+    """
+    Serializer for the availability of a route on one day.
+    """
+
+    date = serializers.DateField()
+    departures = serializers.IntegerField(help_text=_("Number of buses scheduled on the route that day."))
+    min_available_seats = serializers.IntegerField(
+        allow_null=True, help_text=_("Fewest seats available on a bus that day, null without departures.")
+    )
+    max_available_seats = serializers.IntegerField(
+        allow_null=True, help_text=_("Most seats available on a bus that day, null without departures.")
+    )
+    bus_types = serializers.ListField(child=serializers.CharField(), help_text=_("Types of the buses scheduled that day."))
+
+
+class DailyRouteOccupancySerializer(serializers.ModelSerializer):
+    """
+    Serializer for the DailyRouteOccupancy model.
+    """
+
+    load_factor = serializers.FloatField(
+        read_only=True, allow_null=True, help_text=_("Share of the seats sold, null without capacity.")
+    )
+
+    class Meta:
+        model = DailyRouteOccupancy
+        fields = [
+            "id",
+            "route",
+            "date",
+            "bus_type",
+            "departures",
+            "capacity",
+            "seats_sold",
+            "bookings",
+            "load_factor",
+            "updated_at",
+        ]
+
+
+class OccupancyQuerySerializer(serializers.Serializer):
+    """
+    Serializer for the query parameters of the occupancy reports.
+    """
+
+    route = serializers.IntegerField(required=False, help_text=_("Only report this route."))
+    bus_type = serializers.ChoiceField(
+        choices=Bus.BusType.choices, required=False, help_text=_("Only report this type of bus.")
+    )
+    start = serializers.DateField(required=False, help_text=_("First date of the report."))
+    end = serializers.DateField(required=False, help_text=_("Last date of the report."))
+
+    def validate(self, attrs):
+        if "start" in attrs and "end" in attrs and attrs["start"] > attrs["end"]:
+            raise serializers.ValidationError({"end": _("The end date must not be before the start date.")})
+        return attrs
+
+
+class RouteOccupancySummarySerializer(serializers.Serializer):
+    """
+    Serializer for the occupancy of a route over the dates of a report.
+    """
+
+    route = serializers.IntegerField(source="route_id")
+    departures = serializers.IntegerField(help_text=_("Number of buses scheduled."))
+    capacity = serializers.IntegerField(help_text=_("Total number of seats of the buses."))
+    seats_sold = serializers.IntegerField(help_text=_("Number of seats booked on the buses."))
+    bookings = serializers.IntegerField(help_text=_("Number of booking details on the buses."))
+    load_factor = serializers.FloatField(allow_null=True, help_text=_("Share of the seats sold, null without capacity."))
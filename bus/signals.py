@@ -0,0 +1,73 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from main.caching import invalidate_namespace
+from rental.models import City
+
+from .availability import invalidate_route_calendar
+from .locations import invalidate_locations
+from .models import Bus, BusRoute, Route, RouteStop
+from .occupancy import occupancy_key, refresh_occupancy
+from .planner import invalidate_timetables
+from .utils import CATALOG_CACHE_NAMESPACE
+
+
+@receiver([post_save, post_delete], sender=Bus)
+@receiver([post_save, post_delete], sender=Route)
+@receiver([post_save, post_delete], sender=RouteStop)
+@receiver([post_save, post_delete], sender=BusRoute)
+def invalidate_journey_planner(sender, **kwargs):
+    # Once committed, or another process could build the timetables of the old rows under the new version
+    transaction.on_commit(invalidate_timetables)
+
+
+@receiver([post_save, post_delete], sender=Route)
+@receiver([post_save, post_delete], sender=RouteStop)
+@receiver([post_save, post_delete], sender=City)
+def invalidate_location_index(sender, **kwargs):
+    transaction.on_commit(invalidate_locations)
+
+
+@receiver([post_save, post_delete], sender=Bus)
+@receiver([post_save, post_delete], sender=Route)
+def invalidate_catalog_cache(sender, **kwargs):
+    # Once committed, or a concurrent request could cache the old rows under the new version
+    transaction.on_commit(lambda: invalidate_namespace(CATALOG_CACHE_NAMESPACE))
+
+
+@receiver([post_save, post_delete], sender=BusRoute)
+def invalidate_bus_route_calendar(sender, instance, **kwargs):
+    transaction.on_commit(partial(invalidate_route_calendar, instance.route_id))
+
+
+@receiver(post_save, sender=Bus)
+def invalidate_bus_calendars(sender, instance, created, **kwargs):
+    # The calendars list the bus types
+    if not created:
+        for route_id in set(instance.busroute_set.values_list("route_id", flat=True)):
+            transaction.on_commit(partial(invalidate_route_calendar, route_id))
+
+
+@receiver(pre_save, sender=BusRoute)
+def remember_occupancy_key(sender, instance, raw, **kwargs):
+    # A changed bus, route or date moves the bus route to another occupancy row
+    if instance.pk and not raw:
+        stored = BusRoute.objects.select_related("bus").filter(pk=instance.pk).first()
+        instance._previous_occupancy_key = occupancy_key(stored) if stored else None
+
+
+@receiver([post_save, post_delete], sender=BusRoute)
+def refresh_bus_route_occupancy(sender, instance, raw=False, **kwargs):
+    if not raw:
+        refresh_occupancy({occupancy_key(instance), getattr(instance, "_previous_occupancy_key", None)} - {None})
+
+
+@receiver(post_save, sender=Bus)
+def refresh_bus_occupancy(sender, instance, created, raw, **kwargs):
+    # The rows sum the capacities by bus type, and the type may have changed
+    if not created and not raw:
+        bus_routes = instance.busroute_set.values_list("route_id", "date").distinct()
+        refresh_occupancy({(route_id, date, bus_type) for route_id, date in bus_routes for bus_type in Bus.BusType.values})
@@ -0,0 +1,21 @@
+from celery import shared_task
+
+from .holds import release_expired_holds
+from .schedules import generate_bus_routes
+
+
+@shared_task
+def release_expired_seat_holds():
+    """
+    Release the expired seat holds, run periodically by celery beat (see `CELERY_BEAT_SCHEDULE`).
+    """
+    return release_expired_holds()
+
+
+@shared_task
+def generate_scheduled_bus_routes(days=None):
+    """
+    Create the trips of the schedule templates for the next `days` days (`SCHEDULE_DAYS_AHEAD` by default), run
+    periodically by celery beat so the booking window keeps moving forward.
+    """
+    return generate_bus_routes(days)
@@ -0,0 +1,76 @@
+import datetime
+import io
+import json
+import tempfile
+
+from django.core.management import CommandError, call_command
+from django.db.models import Sum
+from django.test import TestCase
+
+from .dataset import DatasetGenerator
+from .inventory import SeatMap
+from .models import Booking, BookingDetail, BusRoute, DailyRouteOccupancy
+
+START = datetime.date(2099, 1, 1)
+
+
+class DatasetGeneratorTestCase(TestCase):
+
+    def generate(self, seed=0):
+        DatasetGenerator(buses=8, routes=4, days=3, users=5, bookings=150, seed=seed, start=START, batch_size=50).generate()
+        return [
+            list(BusRoute.objects.order_by("pk").values_list("bus__bus_number", "route__start_location", "available_seats")),
+            list(BookingDetail.objects.order_by("pk").values_list("bus_route", "seats")),
+            list(Booking.objects.order_by("pk").values_list("user__username", "booking_time", "book")),
+        ]
+
+    def test_dataset_is_consistent(self):
+        self.generate()
+        self.assertEqual(BusRoute.objects.count(), 24)
+        self.assertGreaterEqual(BookingDetail.objects.count(), Booking.objects.count())
+        for bus_route in BusRoute.objects.select_related("bus"):
+            seats = sorted(seat for detail in bus_route.bookingdetail_set.all() for seat in detail.seats)
+            self.assertEqual(seats, list(range(1, bus_route.bus.capacity - bus_route.available_seats + 1)))
+            seat_map = SeatMap.for_bus_route(bus_route)
+            self.assertEqual([seat for seat in range(1, bus_route.bus.capacity + 1) if seat_map.is_taken(seat)], seats)
+        self.assertEqual(
+            DailyRouteOccupancy.objects.aggregate(seats=Sum("seats_sold"))["seats"],
+            BookingDetail.objects.aggregate(seats=Sum("seat_numbers"))["seats"],
+        )
+        response = self.client.get("/api/v1/bookings/", {"limit": 1})
+        self.assertEqual(response.data["count"], Booking.objects.count())
+
+    def test_dataset_is_deterministic(self):
+        first = self.generate()
+        self.assertEqual(self.generate(), first)
+        self.assertNotEqual(self.generate(seed=1), first)
+
+    def test_load_bus_command(self):
+        out = io.StringIO()
+        call_command("load_bus", buses=2, days=2, bookings=5, start=START, stdout=out)
+        self.assertIn("4 bus routes", out.getvalue())
+
+
+class BenchmarkAPITestCase(TestCase):
+
+    def test_benchmark_and_compare(self):
+        with tempfile.TemporaryDirectory() as directory:
+            baseline, results = f"{directory}/baseline.json", f"{directory}/results.json"
+            options = dict(buses=4, routes=2, days=2, users=3, bookings=10, requests=3, stdout=io.StringIO())
+            call_command("benchmark_api", output=baseline, **options)
+            with open(baseline) as file:
+                report = json.load(file)
+            self.assertEqual(report["scenarios"]["booking-create"]["requests"], 3)
+            self.assertIn("login", report["scenarios"])
+            self.assertEqual(Booking.objects.count(), 13)
+
+            out = io.StringIO()
+            call_command("benchmark_compare", baseline, baseline, stdout=out)
+            self.assertIn("No performance regression", out.getvalue())
+
+            report["scenarios"]["search"]["queries"] += 1
+            report["scenarios"]["search"]["p99_ms"] *= 2
+            with open(results, "w") as file:
+                json.dump(report, file)
+            with self.assertRaisesMessage(CommandError, "search: queries per request grew"):
+                call_command("benchmark_compare", baseline, results, min_ms=0, stdout=io.StringIO())
@@ -1,3 +1,4 @@
+from django.db import IntegrityError, transaction
 from django.test import TestCase
 
 from .factories import (
@@ -7,6 +8,7 @@ from .factories import (
     BusRouteFactory,
     RouteFactory,
 )
+from .inventory import SeatMap
 from .models import Booking, BookingDetail, Bus, BusRoute, Route
 
 
@@ -23,6 +25,20 @@ class RouteModelTest(TestCase):
         self.assertTrue(isinstance(route, Route))
         self.assertEqual(route.__str__(), f"{route.start_location} to {route.end_location}")
 
+    def test_route_stops_follow_route(self):
+        route = RouteFactory(start_location="Kathmandu", end_location="Pokhara", stops="Mugling , Damauli,")
+        self.assertEqual(
+            list(route.route_stops.values_list("sequence", "location", "location_key")),
+            [(0, "Kathmandu", "kathmandu"), (1, "Mugling", "mugling"), (2, "Damauli", "damauli"), (3, "Pokhara", "pokhara")],
+        )
+        route.route_stops.filter(location="Damauli").update(offset_minutes=180)
+        route.stops = "Damauli"
+        route.save()
+        self.assertEqual(
+            list(route.route_stops.values_list("location", "offset_minutes")),
+            [("Kathmandu", 0), ("Damauli", 180), ("Pokhara", None)],
+        )
+
 
 class BusRouteModelTest(TestCase):
     def test_create_bus_route(self):
@@ -30,6 +46,10 @@ class BusRouteModelTest(TestCase):
         self.assertTrue(isinstance(bus_route, BusRoute))
         self.assertEqual(bus_route.__str__(), f"{bus_route.bus.bus_number} on {bus_route.route} - {bus_route.date}")
 
+    def test_available_seats_cannot_go_negative(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            BusRouteFactory(available_seats=-1)
+
 
 class BookingModelTest(TestCase):
     def test_create_booking(self):
@@ -42,3 +62,17 @@ class BookingDetailModelTest(TestCase):
     def test_create_booking_detail(self):
         booking_detail = BookingDetailFactory()
         self.assertTrue(isinstance(booking_detail, BookingDetail))
+
+
+class SeatMapTest(TestCase):
+    def test_seat_map(self):
+        seat_map = SeatMap(b"", 10)
+        self.assertEqual(bytes(seat_map), bytes(2))
+        seat_map.take([1, 3, 10])
+        self.assertEqual(bytes(seat_map), bytes([0b101, 0b10]))
+        self.assertTrue(seat_map.is_taken(3))
+        self.assertFalse(seat_map.is_free(11))
+        self.assertEqual(seat_map.free_seats(3), [2, 4, 5])
+        self.assertEqual(seat_map.free_seats(20), [2, 4, 5, 6, 7, 8, 9])
+        seat_map.release([3])
+        self.assertTrue(seat_map.is_free(3))
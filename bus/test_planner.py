@@ -0,0 +1,71 @@
+import datetime
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .factories import BusRouteFactory, RouteFactory
+from .models import BusRoute
+
+
+class JourneyPlanAPITestCase(APITestCase):
+
+    def setUp(self):
+        self.url = "/api/v1/journeys/"
+        self.date = datetime.date(2024, 8, 1)
+        # The timetables are invalidated once the bus routes are committed
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first_leg = self.create_bus_route("Dhangadhi", "Nepalgunj", datetime.time(6, 0), 300)
+            self.second_leg = self.create_bus_route("Nepalgunj", "Kathmandu", datetime.time(12, 0), 480)
+            self.quick_second_leg = self.create_bus_route("Nepalgunj", "Kathmandu", datetime.time(11, 10), 480)
+            self.direct = self.create_bus_route("Dhangadhi", "Kathmandu", datetime.time(5, 0), 1200)
+
+    def create_bus_route(self, start_location, end_location, scheduled_time, minutes, **kwargs):
+        route = RouteFactory(
+            start_location=start_location, end_location=end_location, stops="", scheduled_time=scheduled_time
+        )
+        route.route_stops.filter(location=end_location).update(offset_minutes=minutes)
+        return BusRouteFactory(route=route, date=self.date, bus__availability_status=True, available_seats=10, **kwargs)
+
+    def plan(self, **params):
+        response = self.client.get(self.url, {"from": "Dhangadhi", "to": "kathmandu", "date": self.date, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [[leg["bus_route_id"] for leg in journey["legs"]] for journey in response.data]
+
+    def test_plan_journeys(self):
+        self.assertEqual(self.plan(), [[self.direct.id], [self.first_leg.id, self.second_leg.id]])
+        self.assertEqual(
+            self.plan(min_transfer_minutes=5), [[self.direct.id], [self.first_leg.id, self.quick_second_leg.id]]
+        )
+        self.assertEqual(self.plan(max_legs=1), [[self.direct.id]])
+
+    def test_plan_journeys_response(self):
+        response = self.client.get(self.url, {"from": "Dhangadhi", "to": "Kathmandu", "date": self.date})
+        journey = response.data[1]
+        self.assertEqual(journey["legs"][0]["from_location"], "Dhangadhi")
+        self.assertEqual(journey["legs"][0]["to_location"], "Nepalgunj")
+        self.assertEqual(journey["legs"][1]["bus_number"], self.second_leg.bus.bus_number)
+        self.assertEqual(journey["departure"], journey["legs"][0]["departure"])
+        self.assertTrue(journey["arrival"].startswith("2024-08-01T20:00"))
+
+    def test_plan_journeys_skips_sold_out_legs(self):
+        self.assertEqual(len(self.plan()), 2)
+        # Seats change without invalidating the cached timetable, they are checked on every plan
+        BusRoute.objects.filter(pk=self.direct.pk).update(available_seats=1)
+        self.assertEqual(self.plan(passengers=2), [[self.first_leg.id, self.second_leg.id]])
+        BusRoute.objects.filter(pk=self.second_leg.pk).update(available_seats=0)
+        self.assertEqual(self.plan(passengers=2), [])
+        self.assertEqual(self.plan(passengers=2, min_transfer_minutes=5), [[self.first_leg.id, self.quick_second_leg.id]])
+
+    def test_timetables_are_invalidated_on_commit(self):
+        self.plan()
+        with self.captureOnCommitCallbacks() as callbacks:
+            later = self.create_bus_route("Dhangadhi", "Kathmandu", datetime.time(7, 0), 300)
+        self.assertNotIn([later.id], self.plan())
+        for callback in callbacks:
+            callback()
+        self.assertIn([later.id], self.plan())
+
+    def test_plan_journeys_requires_parameters(self):
+        response = self.client.get(self.url, {"from": "Dhangadhi", "max_legs": 9})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data), {"to_location", "date", "max_legs"})
@@ -0,0 +1,48 @@
+import datetime
+import io
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from .factories import BusRouteFactory, ScheduleTemplateFactory
+from .models import BusRoute, DailyRouteOccupancy, ScheduleTemplate
+from .schedules import generate_bus_routes
+from .tasks import generate_scheduled_bus_routes
+
+# A Monday
+START = datetime.date(2099, 1, 5)
+
+
+class ScheduleGeneratorTestCase(TestCase):
+
+    def test_generate_bus_routes(self):
+        weekdays = ScheduleTemplateFactory(
+            bus__capacity=40, valid_from=START, weekdays=0b0011111, available_seats=30  # Monday to Friday
+        )
+        daily = ScheduleTemplateFactory(bus__capacity=50, valid_from=START, valid_to=START + datetime.timedelta(days=2))
+        ScheduleTemplateFactory(valid_from=START, is_active=False)
+
+        self.assertEqual(generate_bus_routes(14, START), 10 + 3)
+        self.assertEqual(
+            list(BusRoute.objects.filter(bus=weekdays.bus).values_list("date", flat=True).order_by("date")[:6]),
+            [START + datetime.timedelta(days=days) for days in (0, 1, 2, 3, 4, 7)],
+        )
+        self.assertEqual(set(BusRoute.objects.filter(bus=weekdays.bus).values_list("available_seats", flat=True)), {30})
+        self.assertEqual(set(BusRoute.objects.filter(bus=daily.bus).values_list("available_seats", flat=True)), {50})
+        occupancy = DailyRouteOccupancy.objects.get(route=daily.route, date=START)
+        self.assertEqual((occupancy.departures, occupancy.capacity), (1, 50))
+
+    def test_existing_bus_routes_are_skipped(self):
+        template = ScheduleTemplateFactory(valid_from=START)
+        existing = BusRouteFactory(bus=template.bus, route=template.route, date=START + datetime.timedelta(days=1))
+        self.assertEqual(generate_bus_routes(3, START), 2)
+        self.assertEqual(generate_bus_routes(3, START), 0)
+        self.assertEqual(BusRoute.objects.count(), 3)
+        self.assertTrue(BusRoute.objects.filter(pk=existing.pk, available_seats=existing.available_seats).exists())
+
+    def test_generate_schedule_command_and_task(self):
+        ScheduleTemplateFactory(valid_from=START, weekdays=ScheduleTemplate.EVERY_DAY)
+        out = io.StringIO()
+        call_command("generate_schedule", days=7, start=START, stdout=out)
+        self.assertIn("Created 7 bus routes", out.getvalue())
+        self.assertEqual(generate_scheduled_bus_routes.apply(args=(3,)).get(), 0)
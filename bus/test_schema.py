@@ -0,0 +1,98 @@
+import datetime
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from main.graphql import MAX_PAGE_SIZE
+
+from .factories import (
+    BookingDetailFactory,
+    BookingFactory,
+    BusFactory,
+    BusRouteFactory,
+    RouteFactory,
+)
+
+BOOKINGS_QUERY = """
+{
+  bookings(pagination: {limit: 20}) {
+    id
+    userId
+    book(pagination: {limit: 5}) {
+      seatNumbers
+      busRoute {
+        date
+        bookedSeats
+        bus { busNumber }
+        route {
+          startLocation
+          upcomingTrips
+          busRoutes(pagination: {limit: 5}) { id bus { busNumber } }
+        }
+      }
+    }
+  }
+}
+"""
+
+
+class GraphQLTestCase(APITestCase):
+
+    def query(self, query, variables=None):
+        response = self.client.post("/graphql/", {"query": query, "variables": variables or {}}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def create_bookings(self, count):
+        routes = RouteFactory.create_batch(2)
+        buses = BusFactory.create_batch(2)
+        for index in range(count):
+            bus_route = BusRouteFactory(
+                bus=buses[index % 2],
+                route=routes[index % 2],
+                date=timezone.localdate() + datetime.timedelta(days=index),
+                available_seats=10,
+            )
+            booking = BookingFactory()
+            booking.book.set(BookingDetailFactory.create_batch(2, bus_route=bus_route))
+
+    def test_nested_query_runs_a_bounded_number_of_queries(self):
+        counts = []
+        for count in (1, 5):
+            self.create_bookings(count)
+            with CaptureQueriesContext(connection) as context:
+                data = self.query(BOOKINGS_QUERY)
+            self.assertNotIn("errors", data)
+            counts.append(len(context))
+        self.assertEqual(len(data["data"]["bookings"]), 6)
+        detail = data["data"]["bookings"][-1]["book"][0]
+        self.assertEqual(
+            detail["busRoute"]["bookedSeats"], sum(d["seatNumbers"] for d in data["data"]["bookings"][-1]["book"])
+        )
+        self.assertEqual(detail["busRoute"]["route"]["upcomingTrips"], 3)
+        # Bookings, their details joined with the bus routes, buses and routes, the bus routes of those routes
+        # joined with their buses, then one query per data loader
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(counts[1], 5)
+
+    def test_lists_are_paginated(self):
+        BusFactory.create_batch(3)
+        data = self.query("{ buses(pagination: {offset: 1, limit: 1}) { id } }")
+        self.assertEqual(len(data["data"]["buses"]), 1)
+
+        BusFactory.create_batch(MAX_PAGE_SIZE)
+        data = self.query("{ buses { id } }")
+        self.assertEqual(len(data["data"]["buses"]), MAX_PAGE_SIZE)
+
+    def test_query_limits(self):
+        data = self.query("{ buses { busRoutes { bookingDetails { busRoute { bookingDetails { id } } } } } }")
+        self.assertIn("more than the maximum", data["errors"][0]["message"])
+
+        data = self.query(
+            "{ routes(pagination: {limit: 1}) { busRoutes(pagination: {limit: 1}) { route { busRoutes(pagination: "
+            "{limit: 1}) { route { busRoutes(pagination: {limit: 1}) { route { busRoutes(pagination: {limit: 1}) "
+            "{ route { id } } } } } } } } } }"
+        )
+        self.assertIn("exceeds maximum operation depth", data["errors"][0]["message"])
@@ -1,14 +1,47 @@
+import base64
+import datetime
+import io
+import json
+import tempfile
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from celery.signals import after_task_publish
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from main.caching import cache_stats
+from main.fast_serializers import ValuesSerializer
+from main.metrics import escape, registry
+from main.pagination import CursorLimitOffsetPagination
+from main.tests import QueryBudgetMixin
+from main.timing import fingerprint, slow_queries
 
 from .factories import (
+    BookingDetailFactory,
     BookingFactory,
     BusFactory,
     BusRouteFactory,
     RouteFactory,
     UserFactory,
 )
-from .models import Booking, BusRoute
+from .holds import release_expired_holds, seat_holds
+from .models import Booking, BookingDetail, Bus, BusRoute, DailyRouteOccupancy, Route
+from .serializers import (
+    BookingSerializer,
+    BusRouteSerializer,
+    BusSerializer,
+    RouteSerializer,
+)
+from .views import BookingViewSet
 
 
 class BusAPITestCase(APITestCase):
@@ -52,3 +85,919 @@ class BusAPITestCase(APITestCase):
         response = self.client.post("/api/v1/bookings/", data, format="json")
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(Booking.objects.count(), 1)
+
+
+class BookingSeatInventoryAPITestCase(APITestCase):
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.bus_route = BusRouteFactory(bus__capacity=40, available_seats=10)
+
+    def test_create_booking_reserves_seats(self):
+        other_bus_route = BusRouteFactory(bus__capacity=40, available_seats=5)
+        data = {
+            "user": self.user.id,
+            "book": [
+                {"bus_route": self.bus_route.id, "seat_numbers": 3},
+                {"bus_route": other_bus_route.id, "seat_numbers": 2},
+                {"bus_route": self.bus_route.id, "seat_numbers": 1},
+            ],
+        }
+        response = self.client.post("/api/v1/bookings/", data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.bus_route.refresh_from_db()
+        other_bus_route.refresh_from_db()
+        self.assertEqual(self.bus_route.available_seats, 6)
+        self.assertEqual(other_bus_route.available_seats, 3)
+
+    def test_create_booking_rejects_oversell(self):
+        other_bus_route = BusRouteFactory(bus__capacity=40, available_seats=5)
+        data = {
+            "user": self.user.id,
+            "book": [
+                {"bus_route": other_bus_route.id, "seat_numbers": 2},
+                {"bus_route": self.bus_route.id, "seat_numbers": 11},
+            ],
+        }
+        response = self.client.post("/api/v1/bookings/", data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("book", response.data)
+        self.assertEqual(Booking.objects.count(), 0)
+        self.assertEqual(BookingDetail.objects.count(), 0)
+        # The first leg is rolled back together with the failing one
+        other_bus_route.refresh_from_db()
+        self.assertEqual(other_bus_route.available_seats, 5)
+
+    def test_delete_booking_releases_seats(self):
+        data = {"user": self.user.id, "book": [{"bus_route": self.bus_route.id, "seat_numbers": 4}]}
+        response = self.client.post("/api/v1/bookings/", data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.delete(f"/api/v1/bookings/{response.data['id']}/")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.bus_route.refresh_from_db()
+        self.assertEqual(self.bus_route.available_seats, 10)
+        self.assertEqual(BookingDetail.objects.count(), 0)
+
+    def test_update_booking_detail_adjusts_seats(self):
+        response = self.client.post(
+            "/api/v1/booking-details/", {"bus_route": self.bus_route.id, "seat_numbers": 4}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        detail_url = f"/api/v1/booking-details/{response.data['id']}/"
+        response = self.client.patch(detail_url, {"seat_numbers": 2}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.bus_route.refresh_from_db()
+        self.assertEqual(self.bus_route.available_seats, 8)
+        response = self.client.patch(detail_url, {"seat_numbers": 20}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.bus_route.refresh_from_db()
+        self.assertEqual(self.bus_route.available_seats, 8)
+
+    def test_update_booking_keeps_its_seats(self):
+        data = {"user": self.user.id, "book": [{"bus_route": self.bus_route.id, "seats": [3, 4]}]}
+        response = self.client.post("/api/v1/bookings/", data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        data["book"][0].update(id=response.data["book"][0]["id"], seats=[3, 4, 5])
+        response = self.client.put(f"/api/v1/bookings/{response.data['id']}/", data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(response.data["book"][0]["seats"], [3, 4, 5])
+        self.bus_route.refresh_from_db()
+        self.assertEqual(self.bus_route.available_seats, 7)
+
+    def test_bus_route_seats_cannot_exceed_capacity(self):
+        data = {"bus": self.bus_route.bus.id, "route": self.bus_route.route.id, "date": "2024-08-01", "available_seats": 41}
+        response = self.client.post("/api/v1/bus-routes/", data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("available_seats", response.data)
+
+    def test_create_booking_assigns_requested_seats(self):
+        data = {"user": self.user.id, "book": [{"bus_route": self.bus_route.id, "seats": [5, 7]}]}
+        response = self.client.post("/api/v1/bookings/", data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["book"][0]["seats"], [5, 7])
+        self.assertEqual(response.data["book"][0]["seat_numbers"], 2)
+
+        # Unspecified seats get the lowest free seat numbers
+        data = {"user": self.user.id, "book": [{"bus_route": self.bus_route.id, "seat_numbers": 5}]}
+        response = self.client.post("/api/v1/bookings/", data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["book"][0]["seats"], [1, 2, 3, 4, 6])
+
+        data = {"user": self.user.id, "book": [{"bus_route": self.bus_route.id, "seats": [8, 7]}]}
+        response = self.client.post("/api/v1/bookings/", data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.bus_route.refresh_from_db()
+        self.assertEqual(self.bus_route.available_seats, 3)
+
+    def test_create_booking_rejects_invalid_seats(self):
+        for seats in ([41], [3, 3]):
+            data = {"user": self.user.id, "book": [{"bus_route": self.bus_route.id, "seats": seats}]}
+            response = self.client.post("/api/v1/bookings/", data, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Booking.objects.count(), 0)
+
+    def test_get_bus_route_seat_map(self):
+        data = {"user": self.user.id, "book": [{"bus_route": self.bus_route.id, "seats": [1, 2, 10]}]}
+        self.client.post("/api/v1/bookings/", data, format="json")
+        response = self.client.get(f"/api/v1/bus-routes/{self.bus_route.id}/seat-map/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["capacity"], 40)
+        self.assertEqual(response.data["available_seats"], 7)
+        self.assertEqual(base64.b64decode(response.data["seat_map"]), bytes([0b11, 0b10, 0, 0, 0]))
+        response = self.client.get("/api/v1/bus-routes/0/seat-map/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get("/api/v1/bus-routes/abc/seat-map/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BulkBookingAPITestCase(APITestCase):
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.bus_route = BusRouteFactory(bus__capacity=40, available_seats=4)
+        self.other_bus_route = BusRouteFactory(bus__capacity=40, available_seats=40)
+
+    def test_bulk_booking(self):
+        data = [
+            {"user": self.user.id, "book": [{"bus_route": self.bus_route.id, "seat_numbers": 2}]},
+            {"user": self.user.id, "book": [{"bus_route": self.bus_route.id, "seat_numbers": 3}]},
+            {"user": 0, "book": [{"bus_route": self.other_bus_route.id, "seat_numbers": 1}]},
+            {
+                "user": self.user.id,
+                "book": [
+                    {"bus_route": self.bus_route.id, "seats": [7, 8]},
+                    {"bus_route": self.other_bus_route.id, "seat_numbers": 5},
+                ],
+            },
+        ]
+        response = self.client.post("/api/v1/bookings/bulk/", data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result["status"] for result in response.data], ["created", "rejected", "rejected", "created"])
+        self.assertIn("book", response.data[1]["errors"])
+        self.assertIn("user", response.data[2]["errors"])
+        self.assertEqual(response.data[0]["booking"]["book"][0]["seats"], [1, 2])
+
+        self.bus_route.refresh_from_db()
+        self.other_bus_route.refresh_from_db()
+        self.assertEqual(self.bus_route.available_seats, 0)
+        self.assertEqual(self.other_bus_route.available_seats, 35)
+        booking = Booking.objects.get(pk=response.data[3]["booking"]["id"])
+        self.assertEqual(sorted(detail.seats for detail in booking.book.all()), [[1, 2, 3, 4, 5], [7, 8]])
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_bulk_booking_query_count(self):
+        data = [{"user": self.user.id, "book": [{"bus_route": self.other_bus_route.id, "seat_numbers": 1}]}] * 20
+        # bus routes, held seats, users, bookings, details, M2M rows, bus route and occupancy updates (plus savepoints)
+        with self.assertNumQueries(10):
+            response = self.client.post("/api/v1/bookings/bulk/", data, format="json")
+        self.assertTrue(all(result["status"] == "created" for result in response.data))
+
+    def test_bulk_booking_requires_list(self):
+        response = self.client.post("/api/v1/bookings/bulk/", {"user": self.user.id}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class IdempotentBookingAPITestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = UserFactory()
+        self.bus_route = BusRouteFactory(bus__capacity=40, available_seats=10)
+        self.data = {"user": self.user.id, "book": [{"bus_route": self.bus_route.id, "seat_numbers": 2}]}
+
+    def test_retries_replay_the_first_response(self):
+        response = self.client.post("/api/v1/bookings/", self.data, format="json", HTTP_IDEMPOTENCY_KEY="key-1")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn("Idempotent-Replayed", response)
+        # The replay neither validates nor saves anything
+        with self.assertNumQueries(0):
+            replay = self.client.post("/api/v1/bookings/", self.data, format="json", HTTP_IDEMPOTENCY_KEY="key-1")
+        self.assertEqual(replay.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replay.data, response.data)
+        self.assertEqual(replay["Idempotent-Replayed"], "true")
+        self.assertEqual(Booking.objects.count(), 1)
+        self.bus_route.refresh_from_db()
+        self.assertEqual(self.bus_route.available_seats, 8)
+
+        # Other keys and requests without a key are new bookings
+        self.client.post("/api/v1/bookings/", self.data, format="json", HTTP_IDEMPOTENCY_KEY="key-2")
+        self.client.post("/api/v1/bookings/", self.data, format="json")
+        self.assertEqual(Booking.objects.count(), 3)
+
+    def test_key_reused_with_other_body(self):
+        self.client.post("/api/v1/bookings/", self.data, format="json", HTTP_IDEMPOTENCY_KEY="key-1")
+        self.data["book"][0]["seat_numbers"] = 3
+        response = self.client.post("/api/v1/bookings/", self.data, format="json", HTTP_IDEMPOTENCY_KEY="key-1")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Idempotency-Key", response.data)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_concurrent_duplicate_is_rejected(self):
+        request = Request(APIRequestFactory().post("/api/v1/bookings/", HTTP_IDEMPOTENCY_KEY="key-1"))
+        key = BookingViewSet().get_idempotency_key(request)
+        cache.add(f"{key}:lock", True)
+        with mock.patch.object(BookingViewSet, "idempotency_lock_timeout", 0.1):
+            response = self.client.post("/api/v1/bookings/", self.data, format="json", HTTP_IDEMPOTENCY_KEY="key-1")
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Booking.objects.count(), 0)
+
+
+class SeatHoldAPITestCase(APITestCase):
+
+    def setUp(self):
+        # The Redis store, when the tests run against Redis, outlives the test cases
+        seat_holds.clear()
+        self.user = UserFactory()
+        self.bus_route = BusRouteFactory(bus__capacity=40, available_seats=4)
+        self.client.force_authenticate(self.user)
+
+    def test_hold_seats(self):
+        response = self.client.post(
+            "/api/v1/seat-holds/", {"bus_route": self.bus_route.id, "seat_numbers": 2}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["seats"], [1, 2])
+        self.assertIsNotNone(response.data["expires_at"])
+        hold_url = f"/api/v1/seat-holds/{response.data['id']}/"
+        self.assertEqual(self.client.get(hold_url).data["seats"], [1, 2])
+
+        # Held seats can neither be held again nor booked
+        response = self.client.post("/api/v1/seat-holds/", {"bus_route": self.bus_route.id, "seats": [2]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(
+            "/api/v1/seat-holds/", {"bus_route": self.bus_route.id, "seat_numbers": 3}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        data = {"user": self.user.id, "book": [{"bus_route": self.bus_route.id, "seat_numbers": 2}]}
+        response = self.client.post("/api/v1/bookings/", data, format="json")
+        self.assertEqual(response.data["book"][0]["seats"], [3, 4])
+        response = self.client.post("/api/v1/bookings/bulk/", [data], format="json")
+        self.assertEqual(response.data[0]["status"], "rejected")
+
+        # Releasing the hold frees its seats
+        self.assertEqual(self.client.delete(hold_url).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.get(hold_url).status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.post("/api/v1/bookings/bulk/", [data], format="json")
+        self.assertEqual(response.data[0]["status"], "created")
+
+    def test_confirm_hold(self):
+        response = self.client.post("/api/v1/seat-holds/", {"bus_route": self.bus_route.id, "seats": [3, 4]}, format="json")
+        hold_url = f"/api/v1/seat-holds/{response.data['id']}/"
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"{hold_url}confirm/")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["user"], self.user.id)
+        self.assertEqual(response.data["book"][0]["seats"], [3, 4])
+        self.bus_route.refresh_from_db()
+        self.assertEqual(self.bus_route.available_seats, 2)
+        self.assertEqual(self.client.post(f"{hold_url}confirm/").status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_holds_are_private(self):
+        response = self.client.post(
+            "/api/v1/seat-holds/", {"bus_route": self.bus_route.id, "seat_numbers": 1}, format="json"
+        )
+        hold_url = f"/api/v1/seat-holds/{response.data['id']}/"
+        self.client.force_authenticate(UserFactory())
+        self.assertEqual(self.client.get(hold_url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get("/api/v1/seat-holds/unknown/").status_code, status.HTTP_404_NOT_FOUND)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(hold_url).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_release_expired_holds(self):
+        with override_settings(SEAT_HOLD_TTL=60):
+            response = self.client.post(
+                "/api/v1/seat-holds/", {"bus_route": self.bus_route.id, "seat_numbers": 4}, format="json"
+            )
+        other = self.client.post(
+            "/api/v1/seat-holds/", {"bus_route": BusRouteFactory().id, "seat_numbers": 1}, format="json"
+        )
+
+        # In the store of the holds, the database or Redis, the first hold expires
+        later = timezone.now() + datetime.timedelta(seconds=120)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            # Expired holds no longer hold their seats, even before they are released
+            data = {"user": self.user.id, "book": [{"bus_route": self.bus_route.id, "seat_numbers": 1}]}
+            response = self.client.post("/api/v1/bookings/", data, format="json")
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(release_expired_holds(batch_size=1), 1)
+            self.assertEqual(self.client.get(f"/api/v1/seat-holds/{other.data['id']}/").status_code, status.HTTP_200_OK)
+
+
+class TripSearchAPITestCase(APITestCase):
+
+    def setUp(self):
+        self.route = RouteFactory(start_location="Kathmandu", end_location="Pokhara")
+        self.bus_route = BusRouteFactory(
+            route=self.route, bus__bus_type=Bus.BusType.AC, date="2024-08-01", available_seats=10
+        )
+        BusRouteFactory(route=self.route, bus__bus_type=Bus.BusType.NON_AC, date="2024-08-01", available_seats=2)
+        BusRouteFactory(route=self.route, date="2024-08-02")
+        BusRouteFactory(route=RouteFactory(start_location="Pokhara", end_location="Kathmandu"), date="2024-08-01")
+
+    def test_search_trips(self):
+        response = self.client.get("/api/v1/search/", {"from": " kathmandu", "to": "POKHARA", "date": "2024-08-01"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertEqual(
+            set(response.data["results"][0]),
+            {"id", "date", "scheduled_time", "start_location", "end_location", "bus_number", "bus_type", "available_seats"},
+        )
+
+    def test_search_trips_filters(self):
+        params = {"from": "Kathmandu", "to": "Pokhara", "date": "2024-08-01"}
+        response = self.client.get("/api/v1/search/", {**params, "bus_type": Bus.BusType.AC})
+        self.assertEqual([trip["id"] for trip in response.data["results"]], [self.bus_route.id])
+        response = self.client.get("/api/v1/search/", {**params, "min_seats": 5})
+        self.assertEqual([trip["id"] for trip in response.data["results"]], [self.bus_route.id])
+
+    def test_search_trips_via_stops(self):
+        route = RouteFactory(start_location="Kathmandu", end_location="Pokhara", stops="Bharatpur, Damauli")
+        bus_route = BusRouteFactory(route=route, date="2024-08-01")
+        params = {"from": "Bharatpur", "to": "Pokhara", "date": "2024-08-01"}
+        response = self.client.get("/api/v1/search/", params)
+        self.assertEqual(response.data["results"], [])
+        response = self.client.get("/api/v1/search/", {**params, "via_stops": True})
+        self.assertEqual([trip["id"] for trip in response.data["results"]], [bus_route.id])
+        # Stops have to be visited in order
+        response = self.client.get("/api/v1/search/", {**params, "from": "Damauli", "to": "Bharatpur", "via_stops": True})
+        self.assertEqual(response.data["results"], [])
+        # Start and end locations are stops too
+        response = self.client.get("/api/v1/search/", {**params, "from": "Kathmandu", "via_stops": True})
+        self.assertEqual(len(response.data["results"]), 3)
+
+    def test_search_trips_requires_parameters(self):
+        response = self.client.get("/api/v1/search/", {"from": "Kathmandu"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("to_location", response.data)
+        self.assertIn("date", response.data)
+
+
+class LocationAutocompleteAPITestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.url = "/api/v1/locations/autocomplete/"
+        with self.captureOnCommitCallbacks(execute=True):
+            RouteFactory(start_location="Kathmandu", end_location="Pokhara", stops="Mugling, Damauli")
+            RouteFactory(start_location="Kathmandu", end_location="Chitwan National Park", stops="Mugling")
+
+    def suggest(self, q, **params):
+        response = self.client.get(self.url, {"q": q, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [location["name"] for location in response.data]
+
+    def test_prefix_suggestions(self):
+        response = self.client.get(self.url, {"q": " KATH"})
+        self.assertEqual(response.data, [{"key": "kathmandu", "name": "Kathmandu", "routes": 2}])
+        # Route stops, words inside names and rental cities are suggested, the most served first
+        self.assertEqual(self.suggest("m"), ["Mugling", "Mechinagar (Kakarbhitta)"])
+        self.assertEqual(self.suggest("park"), ["Chitwan National Park"])
+        self.assertEqual(self.suggest("dama"), ["Damauli", "Damak"])
+        self.assertEqual(self.suggest("b", limit=2), ["Bhadrapur", "Bhaktapur"])
+
+    def test_alias_suggestions(self):
+        self.assertEqual(self.suggest("काठ"), ["Kathmandu"])
+        self.assertEqual(self.suggest("bhaira"), ["Siddharthanagar (Bhairahawa)"])
+        self.assertEqual(self.suggest("patan"), ["Lalitpur"])
+
+    def test_typo_suggestions(self):
+        self.assertEqual(self.suggest("pokhra"), ["Pokhara"])
+        self.assertEqual(self.suggest("kathmanud"), ["Kathmandu"])
+        self.assertEqual(self.suggest("xy"), [])
+
+    def test_index_is_cached_until_routes_change(self):
+        self.suggest("kath")
+        with CaptureQueriesContext(connection) as context:
+            self.suggest("pokh")
+        self.assertEqual(len(context), 0)
+
+        self.assertEqual(self.suggest("tanse"), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            RouteFactory(start_location="Pokhara", end_location="Tansen", stops="")
+            # Not before the route is committed
+            self.assertEqual(self.suggest("tanse"), [])
+        response = self.client.get(self.url, {"q": "tanse"})
+        self.assertEqual(response.data, [{"key": "tansen", "name": "Tansen", "routes": 1}])
+        self.assertEqual(self.client.get(self.url, {"q": "pokh"}).data[0]["routes"], 2)
+
+    def test_query_validation(self):
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {"q": "k", "limit": 50}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CatalogCacheAPITestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        cache_stats.reset()
+
+    def test_bus_list_is_cached(self):
+        BusFactory.create_batch(2)
+        response = self.client.get("/api/v1/buses/")
+        self.assertEqual(response["X-Cache"], "MISS")
+        with CaptureQueriesContext(connection) as context:
+            cached = self.client.get("/api/v1/buses/")
+        self.assertEqual(cached["X-Cache"], "HIT")
+        self.assertEqual(len(context), 0)
+        self.assertEqual(cached.json(), response.json())
+        self.assertEqual(cache_stats.get("catalog"), {"hits": 1, "misses": 1})
+
+    def test_cache_is_keyed_by_query_params_and_language(self):
+        route = RouteFactory.create()
+        self.client.get("/api/v1/routes/")
+        self.assertEqual(self.client.get("/api/v1/routes/", {"limit": 1})["X-Cache"], "MISS")
+        self.assertEqual(self.client.get("/api/v1/routes/", HTTP_ACCEPT_LANGUAGE="ne")["X-Cache"], "MISS")
+        self.assertEqual(self.client.get(f"/api/v1/routes/{route.id}/")["X-Cache"], "MISS")
+        self.assertEqual(self.client.get(f"/api/v1/routes/{route.id}/")["X-Cache"], "HIT")
+
+    def test_changes_invalidate_cache(self):
+        bus = BusFactory.create(capacity=40)
+        route = RouteFactory.create()
+        self.client.get("/api/v1/buses/")
+        self.client.get(f"/api/v1/routes/{route.id}/")
+
+        bus.capacity = 50
+        with self.captureOnCommitCallbacks(execute=True):
+            bus.save()
+            # Not before the change is committed
+            self.assertEqual(self.client.get("/api/v1/buses/")["X-Cache"], "HIT")
+        response = self.client.get("/api/v1/buses/")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["results"][0]["capacity"], 50)
+
+        route_id = route.id
+        with self.captureOnCommitCallbacks(execute=True):
+            route.delete()
+        self.assertEqual(self.client.get(f"/api/v1/routes/{route_id}/").status_code, status.HTTP_404_NOT_FOUND)
+
+
+class RouteCalendarAPITestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = UserFactory()
+        self.route = RouteFactory()
+        self.ac_bus_route = BusRouteFactory(
+            route=self.route, bus__bus_type=Bus.BusType.AC, date=datetime.date(2099, 1, 31), available_seats=10
+        )
+        BusRouteFactory(
+            route=self.route, bus__bus_type=Bus.BusType.NON_AC, date=datetime.date(2099, 1, 31), available_seats=25
+        )
+        BusRouteFactory(route=self.route, bus__bus_type=Bus.BusType.AC, date=datetime.date(2099, 2, 1), available_seats=5)
+        BusRouteFactory(date=datetime.date(2099, 1, 31))
+        self.url = f"/api/v1/routes/{self.route.id}/calendar/"
+
+    def test_calendar_aggregates_days(self):
+        response = self.client.get(self.url, {"start": "2099-01-30", "days": 4})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json(),
+            [
+                {
+                    "date": "2099-01-30",
+                    "departures": 0,
+                    "min_available_seats": None,
+                    "max_available_seats": None,
+                    "bus_types": [],
+                },
+                {
+                    "date": "2099-01-31",
+                    "departures": 2,
+                    "min_available_seats": 10,
+                    "max_available_seats": 25,
+                    "bus_types": [Bus.BusType.AC, Bus.BusType.NON_AC],
+                },
+                {
+                    "date": "2099-02-01",
+                    "departures": 1,
+                    "min_available_seats": 5,
+                    "max_available_seats": 5,
+                    "bus_types": [Bus.BusType.AC],
+                },
+                {
+                    "date": "2099-02-02",
+                    "departures": 0,
+                    "min_available_seats": None,
+                    "max_available_seats": None,
+                    "bus_types": [],
+                },
+            ],
+        )
+
+    def test_calendar_is_cached_by_month(self):
+        response = self.client.get(self.url, {"start": "2099-01-30", "days": 4})
+        with CaptureQueriesContext(connection) as context:
+            cached = self.client.get(self.url, {"start": "2099-01-30", "days": 4})
+            # Overlapping ranges share the cached months
+            self.client.get(self.url, {"start": "2099-02-01", "days": 10})
+        self.assertEqual(len(context), 0)
+        self.assertEqual(cached.json(), response.json())
+
+    def test_changes_invalidate_calendar(self):
+        self.client.get(self.url, {"start": "2099-01-31", "days": 2})
+        data = {"user": self.user.id, "book": [{"bus_route": self.ac_bus_route.id, "seat_numbers": 4}]}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/v1/bookings/", data, format="json")
+        response = self.client.get(self.url, {"start": "2099-01-31", "days": 2})
+        self.assertEqual(response.data[0]["min_available_seats"], 6)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            BusRouteFactory(route=self.route, date=datetime.date(2099, 2, 1), available_seats=30)
+            # Not before the bus route is committed
+            response = self.client.get(self.url, {"start": "2099-01-31", "days": 2})
+            self.assertEqual(response.data[1]["departures"], 1)
+        response = self.client.get(self.url, {"start": "2099-01-31", "days": 2})
+        self.assertEqual(response.data[1]["departures"], 2)
+        self.assertEqual(response.data[1]["max_available_seats"], 30)
+
+        bus = self.ac_bus_route.bus
+        bus.bus_type = Bus.BusType.NON_AC
+        with self.captureOnCommitCallbacks(execute=True):
+            bus.save()
+        response = self.client.get(self.url, {"start": "2099-01-31", "days": 2})
+        self.assertEqual(response.data[0]["bus_types"], [Bus.BusType.NON_AC])
+
+    def test_calendar_validation(self):
+        self.assertEqual(self.client.get(self.url, {"days": 63}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {"start": "tomorrow"}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(self.client.get(self.url).data), 30)
+        self.assertEqual(self.client.get("/api/v1/routes/0/calendar/").status_code, status.HTTP_404_NOT_FOUND)
+
+
+class DailyRouteOccupancyAPITestCase(APITestCase):
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.route = RouteFactory()
+        self.bus_route = BusRouteFactory(
+            route=self.route,
+            bus__bus_type=Bus.BusType.AC,
+            bus__capacity=40,
+            date=datetime.date(2099, 1, 1),
+            available_seats=40,
+        )
+        self.other_bus_route = BusRouteFactory(
+            route=self.route,
+            bus__bus_type=Bus.BusType.AC,
+            bus__capacity=20,
+            date=datetime.date(2099, 1, 1),
+            available_seats=20,
+        )
+
+    def occupancy(self, bus_type=Bus.BusType.AC):
+        return DailyRouteOccupancy.objects.get(route=self.route, date=datetime.date(2099, 1, 1), bus_type=bus_type)
+
+    def test_bookings_update_occupancy(self):
+        occupancy = self.occupancy()
+        self.assertEqual((occupancy.departures, occupancy.capacity, occupancy.seats_sold), (2, 60, 0))
+
+        data = {
+            "user": self.user.id,
+            "book": [
+                {"bus_route": self.bus_route.id, "seat_numbers": 3},
+                {"bus_route": self.other_bus_route.id, "seat_numbers": 2},
+            ],
+        }
+        response = self.client.post("/api/v1/bookings/", data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.client.post("/api/v1/bookings/bulk/", [data], format="json")
+        occupancy = self.occupancy()
+        self.assertEqual((occupancy.seats_sold, occupancy.bookings), (10, 4))
+        self.assertEqual(occupancy.load_factor, 10 / 60)
+
+        self.client.delete(f"/api/v1/bookings/{response.data['id']}/")
+        self.assertEqual((self.occupancy().seats_sold, self.occupancy().bookings), (5, 2))
+
+    def test_bus_route_changes_update_occupancy(self):
+        BookingDetailFactory(bus_route=self.bus_route, seat_numbers=4)
+        bus = self.bus_route.bus
+        bus.bus_type = Bus.BusType.NON_AC
+        bus.save()
+        self.assertEqual((self.occupancy().departures, self.occupancy().seats_sold), (1, 0))
+        non_ac = self.occupancy(Bus.BusType.NON_AC)
+        self.assertEqual((non_ac.departures, non_ac.capacity, non_ac.seats_sold), (1, 40, 4))
+
+        self.bus_route.date = datetime.date(2099, 1, 2)
+        self.bus_route.save()
+        self.assertFalse(DailyRouteOccupancy.objects.filter(date=datetime.date(2099, 1, 1), bus_type=Bus.BusType.NON_AC))
+        self.other_bus_route.delete()
+        self.assertEqual(list(DailyRouteOccupancy.objects.values_list("date", flat=True)), [datetime.date(2099, 1, 2)])
+
+    def test_rebuild_occupancy(self):
+        self.client.post(
+            "/api/v1/bookings/",
+            {"user": self.user.id, "book": [{"bus_route": self.bus_route.id, "seat_numbers": 3}]},
+            format="json",
+        )
+        expected = list(DailyRouteOccupancy.objects.values("route", "date", "bus_type", "capacity", "seats_sold"))
+        DailyRouteOccupancy.objects.update(seats_sold=0, bookings=0)
+        DailyRouteOccupancy.objects.create(route=self.route, date=datetime.date(2099, 3, 1), bus_type=Bus.BusType.AC)
+        call_command("rebuild_occupancy", batch_days=30, stdout=io.StringIO())
+        self.assertEqual(
+            list(DailyRouteOccupancy.objects.values("route", "date", "bus_type", "capacity", "seats_sold")), expected
+        )
+
+    def test_occupancy_reports(self):
+        BusRouteFactory(route=self.route, bus__bus_type=Bus.BusType.NON_AC, bus__capacity=30, date=datetime.date(2099, 1, 2))
+        BookingDetailFactory(bus_route=self.bus_route, seat_numbers=2)
+        call_command("rebuild_occupancy", stdout=io.StringIO())
+
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get("/api/v1/occupancy/").status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=UserFactory(is_staff=True))
+        response = self.client.get("/api/v1/occupancy/", {"bus_type": Bus.BusType.NON_AC, "start": "2099-01-02"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["capacity"] for row in response.data["results"]], [30])
+        response = self.client.get("/api/v1/occupancy/summary/", {"route": self.route.id, "end": "2099-01-02"})
+        self.assertEqual(
+            response.json()["results"],
+            [
+                {
+                    "route": self.route.id,
+                    "departures": 3,
+                    "capacity": 90,
+                    "seats_sold": 2,
+                    "bookings": 1,
+                    "load_factor": 2 / 90,
+                }
+            ],
+        )
+        response = self.client.get("/api/v1/occupancy/", {"start": "2099-01-02", "end": "2099-01-01"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ConditionalGetAPITestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_unchanged_buses_are_not_modified(self):
+        BusFactory.create_batch(3)
+        response = self.client.get("/api/v1/buses/")
+        self.assertIn("ETag", response)
+        self.assertIn("Last-Modified", response)
+
+        with CaptureQueriesContext(connection) as context:
+            not_modified = self.client.get("/api/v1/buses/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(not_modified.content, b"")
+        # the validators are cached along with the response
+        self.assertEqual(len(context), 0)
+
+    def test_malformed_pk_is_not_found(self):
+        for url in ("/api/v1/buses/abc/", "/api/v1/routes/abc/", "/api/v1/faqs/abc/"):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND, url)
+
+    def test_changed_routes_are_sent_again(self):
+        routes = RouteFactory.create_batch(2)
+        response = self.client.get("/api/v1/routes/")
+        etag = response["ETag"]
+        self.assertNotEqual(self.client.get("/api/v1/routes/", {"limit": 1})["ETag"], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            routes[0].delete()
+        response = self.client.get("/api/v1/routes/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 1)
+
+        response = self.client.get(f"/api/v1/routes/{routes[1].id}/")
+        routes[1].stops = "Mugling"
+        with self.captureOnCommitCallbacks(execute=True):
+            routes[1].save()
+        response = self.client.get(f"/api/v1/routes/{routes[1].id}/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["stops"], "Mugling")
+
+
+class ValuesListAPITestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_list_matches_serializers(self):
+        BusRouteFactory.create_batch(3)
+        for url, queryset, serializer_class in [
+            ("/api/v1/buses/", Bus.objects.all(), BusSerializer),
+            ("/api/v1/routes/", Route.objects.all(), RouteSerializer),
+            ("/api/v1/bus-routes/", BusRoute.objects.all(), BusRouteSerializer),
+        ]:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.json()["results"], serializer_class(queryset, many=True).data, url)
+
+    def test_unsupported_serializer(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ValuesSerializer(BookingSerializer)
+
+
+@override_settings(ROOT_URLCONF="main.asgi_urls")
+class AsyncViewsAPITestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        route = RouteFactory(start_location="Kathmandu", end_location="Pokhara")
+        self.bus_route = BusRouteFactory(route=route, date="2024-08-01")
+        BusRouteFactory.create_batch(2, route=route, date="2024-08-01")
+
+    async def test_async_views_match_sync_views(self):
+        for url, data in [
+            ("/api/v1/bus-routes/", None),
+            ("/api/v1/bus-routes/", {"limit": 2, "offset": 1}),
+            (f"/api/v1/bus-routes/{self.bus_route.id}/", None),
+            ("/api/v1/search/", {"from": "kathmandu", "to": "pokhara", "date": "2024-08-01"}),
+        ]:
+            with override_settings(ROOT_URLCONF="main.urls"):
+                response = await sync_to_async(self.client.get)(url, data)
+            async_response = await self.async_client.get(url, data)
+            self.assertEqual(async_response.status_code, status.HTTP_200_OK, url)
+            self.assertEqual(async_response.content, response.content, url)
+
+    async def test_async_view_errors(self):
+        response = await self.async_client.get("/api/v1/bus-routes/0/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.json(), {"detail": "Not found."})
+        response = await self.async_client.get("/api/v1/search/", {"from": "kathmandu"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("to_location", response.json())
+
+    async def test_other_methods_use_sync_views(self):
+        data = {"bus": self.bus_route.bus_id, "route": self.bus_route.route_id, "date": "2024-08-02", "available_seats": 1}
+        response = await self.async_client.post("/api/v1/bus-routes/", data, content_type="application/json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(await BusRoute.objects.acount(), 4)
+
+
+class CursorPaginationAPITestCase(APITestCase):
+
+    def test_booking_details_cursor_pages(self):
+        today = datetime.date.today()
+        for days in [2, 0, 1, 1, 0]:
+            BookingDetailFactory(bus_route=BusRouteFactory(date=today + datetime.timedelta(days=days)))
+        expected = list(BookingDetail.objects.order_by("bus_route__date", "id").values_list("id", flat=True))
+
+        response = self.client.get("/api/v1/booking-details/", {"cursor": "", "limit": 2})
+        self.assertNotIn("count", response.data)
+        self.assertIsNone(response.data["previous"])
+        ids, pages = [], []
+        while response.data["next"]:
+            pages.append(response)
+            ids += [detail["id"] for detail in response.data["results"]]
+            response = self.client.get(response.data["next"])
+        ids += [detail["id"] for detail in response.data["results"]]
+        self.assertEqual(ids, expected)
+
+        previous = self.client.get(response.data["previous"])
+        self.assertEqual(previous.data["results"], pages[-1].data["results"])
+        self.assertEqual(self.client.get(previous.data["previous"]).data["results"], pages[-2].data["results"])
+
+    def test_limit_offset_pagination_is_kept(self):
+        BookingFactory.create_batch(3)
+        response = self.client.get("/api/v1/bookings/", {"limit": 1, "offset": 1})
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual(len(response.data["results"]), 1)
+
+        response = self.client.get("/api/v1/bookings/", {"cursor": "", "limit": 2})
+        self.assertEqual(len(response.data["results"]), 2)
+        response = self.client.get(response.data["next"])
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertIsNone(response.data["next"])
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/v1/bookings/", {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        # Well-formed cursors with tampered values
+        for position in (["x", 1], ["2024-08-01", "x"], ["2024-08-01", None], ["2024-08-01", [1]]):
+            cursor = CursorLimitOffsetPagination.encode_cursor(position)
+            response = self.client.get("/api/v1/booking-details/", {"cursor": cursor})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, position)
+
+
+class ServerTimingAPITestCase(APITestCase):
+
+    def setUp(self):
+        slow_queries.reset()
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=1.0, SLOW_QUERY_MS=0)
+    def test_sampled_request_is_timed(self):
+        BusRouteFactory.create_batch(2)
+        with self.assertLogs("main.timing") as logs:
+            response = self.client.get("/api/v1/bus-routes/")
+        timings = dict(metric.split(";", 1) for metric in response["Server-Timing"].split(", "))
+        self.assertEqual(list(timings), ["db", "view", "render", "total"])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["view"], "bus.views.BusRouteViewSet")
+        self.assertEqual(record["action"], "list")
+        self.assertEqual(record["status"], 200)
+        self.assertIn(f'desc="{record["queries"]} queries"', timings["db"])
+        top = slow_queries.top()
+        self.assertEqual(sum(query["count"] for query in top), record["queries"])
+        self.assertNotIn("%s", "".join(query["sql"] for query in top))
+
+        # The top offenders are exposed with the metrics
+        metrics = self.client.get("/metrics").content.decode()
+        self.assertIn(f'db_slow_queries_total{{query="{escape(top[0]["sql"])}"}} {top[0]["count"]}', metrics)
+        self.assertIn(f'db_slow_query_seconds_total{{query="{escape(top[0]["sql"])}"}}', metrics)
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=1.0, ROOT_URLCONF="main.asgi_urls")
+    async def test_async_request_is_timed(self):
+        await sync_to_async(BusRouteFactory.create_batch)(2)
+        with self.assertLogs("main.timing") as logs:
+            response = await self.async_client.get("/api/v1/bus-routes/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["view"], "bus.views.AsyncBusRouteView")
+        # The queries of the async ORM run in another thread, with its own connection
+        self.assertGreater(record["queries"], 0)
+        self.assertIn("view", response["Server-Timing"])
+
+    def test_requests_are_not_timed_by_default(self):
+        response = self.client.get("/api/v1/bus-routes/")
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(slow_queries.top(), [])
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM \"bus_bus\"\n WHERE id IN (%s, %s, %s) AND bus_number = 'BA 1 KHA'  LIMIT 21"),
+            'SELECT * FROM "bus_bus" WHERE id IN (...) AND bus_number = ? LIMIT ?',
+        )
+
+
+class MetricsAPITestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        cache_stats.reset()
+        registry.reset()
+
+    def get_metrics(self, **extra):
+        response = self.client.get("/metrics", **extra)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return dict(line.rsplit(" ", 1) for line in response.content.decode().splitlines() if not line.startswith("#"))
+
+    def test_request_metrics(self):
+        BusFactory.create_batch(2)
+        self.client.get("/api/v1/buses/")
+        self.client.get("/api/v1/buses/")
+        self.client.get("/api/v1/not-found/")
+        metrics = self.get_metrics()
+        self.assertEqual(metrics['http_requests_total{view="buses",action="list",status="200"}'], "2")
+        self.assertEqual(metrics['http_requests_total{view="unmatched",action="",status="404"}'], "1")
+        self.assertEqual(metrics['http_request_duration_seconds_count{view="buses",action="list",method="GET"}'], "2")
+        self.assertEqual(
+            metrics['http_request_duration_seconds_bucket{view="buses",action="list",method="GET",le="+Inf"}'], "2"
+        )
+        self.assertIn('db_queries_total{view="buses",action="list"}', metrics)
+        self.assertEqual(metrics['cache_requests_total{namespace="catalog",result="hit"}'], "1")
+        self.assertEqual(metrics['cache_requests_total{namespace="catalog",result="miss"}'], "1")
+
+    def test_booking_and_task_metrics(self):
+        bus_route = BusRouteFactory(bus__capacity=40, available_seats=10)
+        data = {"user": UserFactory().id, "book": [{"bus_route": bus_route.id, "seat_numbers": 3}]}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/v1/bookings/", data, format="json")
+        after_task_publish.send(sender="rental.tasks.send_booking_confirmation_email", headers={}, body=())
+        metrics = self.get_metrics()
+        self.assertEqual(metrics['booking_seats_total{event="booked"}'], "3")
+        self.assertEqual(metrics['booking_details_total{event="booked"}'], "1")
+        self.assertEqual(metrics['celery_tasks_published_total{task="rental.tasks.send_booking_confirmation_email"}'], "1")
+
+    def test_metrics_of_every_process_are_added_up(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            self.client.get("/api/v1/faqs/")
+            registry.flush()
+            # The file of another worker
+            with open(f"{directory}/1.json", "w") as file:
+                json.dump({"http_requests_total": [[["faq", "list", 200], 4]]}, file)
+            metrics = self.get_metrics()
+        self.assertEqual(metrics['http_requests_total{view="faq",action="list",status="200"}'], "5")
+
+    @override_settings(ROOT_URLCONF="main.asgi_urls")
+    async def test_async_request_metrics(self):
+        await sync_to_async(BusRouteFactory.create_batch)(2)
+        response = await self.async_client.get("/api/v1/bus-routes/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        metrics = await sync_to_async(self.get_metrics)()
+        self.assertEqual(metrics['http_requests_total{view="bus-routes-list-async",action="",status="200"}'], "1")
+        self.assertIn('db_queries_total{view="bus-routes-list-async",action=""}', metrics)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, status.HTTP_403_FORBIDDEN)
+        self.get_metrics(HTTP_AUTHORIZATION="Bearer secret")
+
+
+class QueryBudgetAPITestCase(QueryBudgetMixin, APITestCase):
+
+    def create_bookings(self, count):
+        for booking in BookingFactory.create_batch(count):
+            booking.book.add(*BookingDetailFactory.create_batch(2))
+
+    def test_list_query_budgets(self):
+        # conditional GET validators, count and page
+        self.assertQueryBudget("/api/v1/buses/", 3, BusFactory.create_batch)
+        self.assertQueryBudget("/api/v1/routes/", 3, RouteFactory.create_batch)
+        self.assertQueryBudget("/api/v1/bus-routes/", 2, BusRouteFactory.create_batch)
+        self.assertQueryBudget("/api/v1/booking-details/", 2, BookingDetailFactory.create_batch)
+        # bookings, their count and the prefetched booking details
+        self.assertQueryBudget("/api/v1/bookings/", 3, self.create_bookings)
@@ -0,0 +1,24 @@
+# Cache namespace of the bus and route responses, invalidated by `bus.signals`
+CATALOG_CACHE_NAMESPACE = "catalog"
+
+
+def normalize_location(location):
+    """
+    Normalize a location name for lookups, e.g. "  Kathmandu   Valley" -> "kathmandu valley".
+    """
+    return " ".join((location or "").split()).casefold()
+
+
+def split_stops(stops):
+    """
+    Split a comma separated list of stops, e.g. "Mugling, Damauli," -> ["Mugling", "Damauli"].
+    """
+    return [stop.strip() for stop in (stops or "").split(",") if stop.strip()]
+
+
+def percentile(values, percent):
+    """
+    Return the `percent` percentile of `values` (nearest rank), used by the benchmark commands.
+    """
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
@@ -1,21 +1,84 @@
-from rest_framework import viewsets
+import base64
+import copy
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch, Sum
+from django.http import Http404
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.utils import extend_schema
+from rest_framework import generics, mixins, serializers, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
-from .models import Booking, BookingDetail, Bus, BusRoute, Route
+from main.async_views import AsyncValuesView
+from main.caching import CachedResponseMixin, ConditionalGetMixin
+from main.fast_serializers import ValuesListMixin
+from main.idempotency import IdempotencyMixin
+from main.pagination import CursorLimitOffsetPagination
+
+from .availability import get_route_calendar
+from .bulk import MAX_BULK_BOOKINGS, create_bookings
+from .holds import confirm_hold, get_hold, release_hold
+from .inventory import (
+    SeatMap,
+    SeatsUnavailable,
+    lock_bus_routes,
+    release_seats,
+    reserve_seats,
+)
+from .locations import autocomplete_locations
+from .models import (
+    Booking,
+    BookingDetail,
+    Bus,
+    BusRoute,
+    DailyRouteOccupancy,
+    Route,
+    RouteStop,
+)
+from .planner import plan_journeys
 from .serializers import (
     BookingDetailSerializer,
     BookingSerializer,
+    BulkBookingResultSerializer,
+    BulkBookingSerializer,
+    BusRouteSeatMapSerializer,
     BusRouteSerializer,
     BusSerializer,
+    DailyRouteOccupancySerializer,
+    JourneyQuerySerializer,
+    JourneySerializer,
+    LocationAutocompleteQuerySerializer,
+    LocationSerializer,
+    OccupancyQuerySerializer,
+    RouteCalendarDaySerializer,
+    RouteCalendarQuerySerializer,
+    RouteOccupancySummarySerializer,
     RouteSerializer,
+    SeatHoldSerializer,
+    TripSearchQuerySerializer,
+    TripSearchResultSerializer,
 )
+from .utils import CATALOG_CACHE_NAMESPACE, normalize_location
 
 
-class BusViewSet(viewsets.ReadOnlyModelViewSet):
+def reserve_or_raise(details, field):
+    """
+    Reserve seats for `details`, reporting shortages as a validation error on `field`.
+    """
+    try:
+        reserve_seats(details)
+    except SeatsUnavailable as exc:
+        raise serializers.ValidationError({field: [str(exc)]})
+
+
+class BusViewSet(ConditionalGetMixin, CachedResponseMixin, ValuesListMixin, viewsets.ReadOnlyModelViewSet):
     """
     A viewset for viewing and editing bus instances.
     """
 
+    cache_namespace = CATALOG_CACHE_NAMESPACE
     queryset = Bus.objects.all()
     serializer_class = BusSerializer
     filterset_fields = ["bus_type", "availability_status"]
@@ -23,49 +86,238 @@ class BusViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ["bus_number", "capacity"]
 
 
-class RouteViewSet(viewsets.ReadOnlyModelViewSet):
+class RouteViewSet(ConditionalGetMixin, CachedResponseMixin, ValuesListMixin, viewsets.ReadOnlyModelViewSet):
     """
     A viewset for viewing and editing route instances.
     """
 
+    cache_namespace = CATALOG_CACHE_NAMESPACE
     queryset = Route.objects.all()
     serializer_class = RouteSerializer
     search_fields = ["start_location", "end_location"]
     ordering_fields = ["start_location", "end_location", "scheduled_time"]
 
+    @extend_schema(parameters=[RouteCalendarQuerySerializer], responses=RouteCalendarDaySerializer(many=True))
+    @action(detail=True, serializer_class=RouteCalendarDaySerializer, pagination_class=None)
+    def calendar(self, request, *args, **kwargs):
+        """
+        Return the departures and available seats of the route by day (see `bus.availability`).
+        """
+        if not kwargs["pk"].isdigit():
+            raise Http404
+        query = RouteCalendarQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        calendar = get_route_calendar(int(kwargs["pk"]), query.validated_data["start"], query.validated_data["days"])
+        if calendar is None:
+            raise Http404
+        return Response(self.get_serializer(calendar, many=True).data)
+
 
-class BusRouteViewSet(viewsets.ModelViewSet):
+class BusRouteViewSet(ValuesListMixin, viewsets.ModelViewSet):
     """
     A viewset for viewing and editing bus route instances.
     """
 
-    queryset = BusRoute.objects.all()
+    queryset = BusRoute.objects.select_related("bus", "route")
     serializer_class = BusRouteSerializer
     filterset_fields = ["date", "bus__bus_type", "route__start_location", "route__end_location"]
     search_fields = ["bus__bus_number", "route__start_location", "route__end_location"]
     ordering_fields = ["date", "available_seats"]
 
+    @extend_schema(responses=BusRouteSeatMapSerializer)
+    @action(detail=True, url_path="seat-map", serializer_class=BusRouteSeatMapSerializer)
+    def seat_map(self, request, *args, **kwargs):
+        """
+        Return the booked seats of a bus route as a base64 encoded bitmap (see `bus.inventory.SeatMap`).
+        """
+        if not kwargs["pk"].isdigit():
+            raise Http404
+        row = BusRoute.objects.filter(pk=kwargs["pk"]).values("id", "available_seats", "seat_map", "bus__capacity").first()
+        if row is None:
+            raise Http404
+        seat_map = SeatMap(row["seat_map"], row["bus__capacity"])
+        data = {
+            "id": row["id"],
+            "capacity": row["bus__capacity"],
+            "available_seats": row["available_seats"],
+            "seat_map": base64.b64encode(bytes(seat_map)).decode(),
+        }
+        return Response(self.get_serializer(data).data)
+
+
+class AsyncBusRouteView(AsyncValuesView):
+    """
+    Async `list` and `retrieve` of `BusRouteViewSet` for the ASGI deployment.
+    """
+
+    queryset = BusRouteViewSet.queryset
+    serializer_class = BusRouteSerializer
 
-class BookingViewSet(viewsets.ModelViewSet):
+
+def search_trips(query_params):
+    """
+    Return the `.values()` rows of the trips matching the `TripSearchQuerySerializer` query params.
+    """
+    query = TripSearchQuerySerializer(data=query_params)
+    query.is_valid(raise_exception=True)
+    params = query.validated_data
+
+    from_key, to_key = normalize_location(params["from_location"]), normalize_location(params["to_location"])
+    if params["via_stops"]:
+        alighting = RouteStop.objects.filter(route=OuterRef("route"), location_key=to_key, sequence__gt=OuterRef("sequence"))
+        route_ids = RouteStop.objects.filter(Exists(alighting), location_key=from_key).values("route_id")
+        queryset = BusRoute.objects.filter(route__in=route_ids, date=params["date"])
+    else:
+        queryset = BusRoute.objects.filter(
+            route__start_location_key=from_key, route__end_location_key=to_key, date=params["date"]
+        )
+    if "bus_type" in params:
+        queryset = queryset.filter(bus__bus_type=params["bus_type"])
+    if "min_seats" in params:
+        queryset = queryset.filter(available_seats__gte=params["min_seats"])
+    return queryset.order_by("route__scheduled_time", "id").values(
+        "id",
+        "date",
+        "available_seats",
+        "route__scheduled_time",
+        "route__start_location",
+        "route__end_location",
+        "bus__bus_number",
+        "bus__bus_type",
+    )
+
+
+@extend_schema(parameters=[TripSearchQuerySerializer])
+class TripSearchView(generics.ListAPIView):
+    """
+    Search the trips between two locations on a date.
+
+    Locations are matched on the normalized `Route` location keys, so the lookup is served by the
+    `route_location_key_idx` and `bus_route_route_date_idx` indexes and only the flat result columns are fetched.
+    With `via_stops` the locations may be any boarding and alighting stop of the route, looked up through
+    `route_stop_location_key_idx`.
+    """
+
+    serializer_class = TripSearchResultSerializer
+
+    def get_queryset(self):
+        return search_trips(self.request.query_params)
+
+
+class AsyncTripSearchView(AsyncValuesView):
+    """
+    Async version of `TripSearchView` for the ASGI deployment.
+    """
+
+    serializer_class = TripSearchResultSerializer
+
+    def get_queryset(self, request):
+        return search_trips(request.query_params)
+
+
+@extend_schema(parameters=[JourneyQuerySerializer], responses=JourneySerializer(many=True))
+class JourneyPlanView(generics.GenericAPIView):
+    """
+    Plan journeys between two locations, changing buses if there is no direct one.
+
+    Returns the fastest journey for every number of buses that arrives earlier than with fewer buses, see
+    `bus.planner.plan_journeys`.
+    """
+
+    serializer_class = JourneySerializer
+    pagination_class = None
+
+    def get(self, request, *args, **kwargs):
+        query = JourneyQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        journeys = plan_journeys(
+            normalize_location(params["from_location"]),
+            normalize_location(params["to_location"]),
+            params["date"],
+            passengers=params["passengers"],
+            max_legs=params["max_legs"],
+            min_transfer_minutes=params["min_transfer_minutes"],
+        )
+        data = [{"departure": legs[0].departure, "arrival": legs[-1].arrival, "legs": legs} for legs in journeys]
+        return Response(self.get_serializer(data, many=True).data)
+
+
+@extend_schema(parameters=[LocationAutocompleteQuerySerializer], responses=LocationSerializer(many=True))
+class LocationAutocompleteView(generics.GenericAPIView):
+    """
+    Suggest locations for a city picker, on every keystroke.
+
+    Suggestions come from a per-process prefix index of the route stops and rental cities, with their Nepali and
+    English aliases, and fall back to similar names when nothing starts with the query, see
+    `bus.locations.autocomplete_locations`.
+    """
+
+    serializer_class = LocationSerializer
+    pagination_class = None
+
+    def get(self, request, *args, **kwargs):
+        query = LocationAutocompleteQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        locations = autocomplete_locations(query.validated_data["q"], query.validated_data["limit"])
+        return Response(self.get_serializer(locations, many=True).data)
+
+
+class BookingViewSet(IdempotencyMixin, viewsets.ModelViewSet):
     """
     A viewset for viewing and editing booking instances.
     """
 
-    queryset = Booking.objects.all()
+    queryset = Booking.objects.select_related("user").prefetch_related(
+        Prefetch("book", queryset=BookingDetail.objects.select_related("bus_route__bus", "bus_route__route"))
+    )
     serializer_class = BookingSerializer
+    pagination_class = CursorLimitOffsetPagination
+    cursor_ordering = ("booking_time", "id")
     filterset_fields = ["user__username", "booking_time"]
     search_fields = ["user__username"]
     ordering_fields = ["booking_time"]
 
-    def create(self, request, *args, **kwargs):
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            booking = serializer.save()
+            reserve_or_raise(booking.book.all(), "book")
+
+    @extend_schema(request=BulkBookingSerializer(many=True), responses=BulkBookingResultSerializer(many=True))
+    @action(detail=False, methods=["post"], serializer_class=BulkBookingSerializer)
+    def bulk(self, request, *args, **kwargs):
         """
-        Override create to handle nested BookingDetail data.
+        Create many bookings at once, e.g. for travel agents.
+
+        Every booking is validated and booked on its own: the response lists, in request order, the created
+        bookings and the errors of the rejected ones. See `bus.bulk.create_bookings`.
         """
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
-        headers = self.get_success_headers(serializer.data)
-        return Response(serializer.data, status=201, headers=headers)
+        if not isinstance(request.data, list) or not request.data:
+            raise serializers.ValidationError({"non_field_errors": [_("Expected a non-empty list of bookings.")]})
+        if len(request.data) > MAX_BULK_BOOKINGS:
+            raise serializers.ValidationError(
+                {"non_field_errors": [_("At most %(max)s bookings are allowed per request.") % {"max": MAX_BULK_BOOKINGS}]}
+            )
+        results = create_bookings(request.data, self.get_serializer_context())
+        return Response(BulkBookingResultSerializer(results, many=True).data)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            reserved = list(serializer.instance.book.all())
+            requested = serializer.validated_data.get("book", [])
+            lock_bus_routes([detail.bus_route_id for detail in reserved] + [detail["bus_route"].pk for detail in requested])
+            release_seats(reserved)
+            booking = serializer.save()
+            # Not `booking.book.all()`, which may still hold the details prefetched by the queryset
+            reserve_or_raise(BookingDetail.objects.filter(booking=booking), "book")
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            details = list(instance.book.all())
+            release_seats(details)
+            BookingDetail.objects.filter(pk__in=[detail.pk for detail in details]).delete()
+            instance.delete()
 
 
 class BookingDetailViewSet(viewsets.ModelViewSet):
@@ -73,8 +325,117 @@ class BookingDetailViewSet(viewsets.ModelViewSet):
     A viewset for viewing and editing booking detail instances.
     """
 
-    queryset = BookingDetail.objects.all()
+    queryset = BookingDetail.objects.select_related("bus_route__bus", "bus_route__route")
     serializer_class = BookingDetailSerializer
+    pagination_class = CursorLimitOffsetPagination
+    # Across two tables, which no index covers: the pages still join and sort the rows, the cursor only spares the
+    # OFFSET and the COUNT(*)
+    cursor_ordering = ("bus_route__date", "id")
     filterset_fields = ["bus_route__date", "bus_route__bus__bus_type", "bus_route__route__start_location"]
     search_fields = ["bus_route__bus__bus_number", "bus_route__route__start_location", "bus_route__route__end_location"]
     ordering_fields = ["bus_route__date"]
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            detail = serializer.save()
+            reserve_or_raise([detail], "seats")
+
+    def perform_update(self, serializer):
+        reserved = copy.copy(serializer.instance)
+        with transaction.atomic():
+            lock_bus_routes([reserved.bus_route_id, serializer.validated_data.get("bus_route", reserved.bus_route).pk])
+            release_seats([reserved])
+            detail = serializer.save()
+            reserve_or_raise([detail], "seats")
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            release_seats([instance])
+            instance.delete()
+
+
+class SeatHoldViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    A viewset for holding seats while the user pays, then confirming the hold into a booking or releasing it.
+
+    Holds expire after `SEAT_HOLD_TTL` seconds and are only visible to the user holding the seats.
+    """
+
+    serializer_class = SeatHoldSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_object(self):
+        # Holds may live in Redis rather than in the database, see `bus.holds`
+        hold = get_hold(self.kwargs["pk"])
+        if hold is None or hold.user_id != self.request.user.pk:
+            raise Http404
+        return hold
+
+    def perform_destroy(self, instance):
+        release_hold(instance)
+
+    @extend_schema(request=None, responses={201: BookingSerializer})
+    @action(detail=True, methods=["post"])
+    def confirm(self, request, *args, **kwargs):
+        """
+        Book the held seats and release the hold.
+        """
+        try:
+            booking = confirm_hold(self.get_object())
+        except SeatsUnavailable as exc:
+            raise serializers.ValidationError({"seats": [str(exc)]})
+        return Response(BookingSerializer(booking, context=self.get_serializer_context()).data, status=201)
+
+
+@extend_schema(parameters=[OccupancyQuerySerializer])
+class DailyRouteOccupancyViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Occupancy of the routes by date and bus type, for the operator dashboards.
+
+    Reads the `DailyRouteOccupancy` rollup (see `bus.occupancy`), never the booking details.
+    """
+
+    queryset = DailyRouteOccupancy.objects.order_by("date", "route_id", "bus_type")
+    serializer_class = DailyRouteOccupancySerializer
+    permission_classes = [IsAdminUser]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "retrieve":
+            return queryset
+        query = OccupancyQuerySerializer(data=self.request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        if "route" in params:
+            queryset = queryset.filter(route_id=params["route"])
+        if "bus_type" in params:
+            queryset = queryset.filter(bus_type=params["bus_type"])
+        if "start" in params:
+            queryset = queryset.filter(date__gte=params["start"])
+        if "end" in params:
+            queryset = queryset.filter(date__lte=params["end"])
+        return queryset
+
+    @extend_schema(responses=RouteOccupancySummarySerializer(many=True))
+    @action(detail=False, serializer_class=RouteOccupancySummarySerializer)
+    def summary(self, request, *args, **kwargs):
+        """
+        Return the occupancy of every route over the dates of the report.
+        """
+        totals = (
+            self.get_queryset()
+            .values("route_id")
+            .annotate(
+                departures=Sum("departures"),
+                capacity=Sum("capacity"),
+                seats_sold=Sum("seats_sold"),
+                bookings=Sum("bookings"),
+            )
+            .order_by("route_id")
+        )
+        page = self.paginate_queryset(totals)
+        rows = totals if page is None else page
+        for row in rows:
+            row["load_factor"] = row["seats_sold"] / row["capacity"] if row["capacity"] else None
+        serializer = self.get_serializer(rows, many=True)
+        return Response(serializer.data) if page is None else self.get_paginated_response(serializer.data)
@@ -3,6 +3,10 @@ ASGI config for main project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Served over ASGI (e.g. ``uvicorn main.asgi:application``), the public read-only endpoints use the async views of
+``main.asgi_urls`` unless ``DJANGO_ASYNC_VIEWS`` is set to false. uWSGI keeps serving ``main.wsgi`` with the sync
+views.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -12,5 +16,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "main.settings")
+os.environ.setdefault("DJANGO_ASYNC_VIEWS", "true")
 
 application = get_asgi_application()
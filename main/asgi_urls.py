@@ -0,0 +1,54 @@
+"""
+URL configuration of the ASGI deployment (`DJANGO_ASYNC_VIEWS`).
+
+The GET requests of the public read-only endpoints are served by async views, every other request by the sync
+views of `main.urls`.
+"""
+
+from django.urls import path
+
+from bus.views import (
+    AsyncBusRouteView,
+    AsyncTripSearchView,
+    BusRouteViewSet,
+    TripSearchView,
+)
+from review.views import AsyncFAQView, FAQViewSet
+
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path(
+        "api/v1/search/",
+        AsyncTripSearchView.as_view(sync_view=TripSearchView.as_view()),
+        name="trip-search-async",
+    ),
+    path(
+        "api/v1/bus-routes/",
+        AsyncBusRouteView.as_view(
+            sync_view=BusRouteViewSet.as_view({"get": "list", "post": "create"}, basename="bus-routes", detail=False)
+        ),
+        name="bus-routes-list-async",
+    ),
+    path(
+        "api/v1/bus-routes/<int:pk>/",
+        AsyncBusRouteView.as_view(
+            sync_view=BusRouteViewSet.as_view(
+                {"get": "retrieve", "put": "update", "patch": "partial_update", "delete": "destroy"},
+                basename="bus-routes",
+                detail=True,
+            )
+        ),
+        name="bus-routes-detail-async",
+    ),
+    path(
+        "api/v1/faqs/",
+        AsyncFAQView.as_view(sync_view=FAQViewSet.as_view({"get": "list"}, basename="faq", detail=False)),
+        name="faq-list-async",
+    ),
+    path(
+        "api/v1/faqs/<int:pk>/",
+        AsyncFAQView.as_view(sync_view=FAQViewSet.as_view({"get": "retrieve"}, basename="faq", detail=True)),
+        name="faq-detail-async",
+    ),
+] + sync_urlpatterns
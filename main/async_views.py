@@ -0,0 +1,125 @@
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Count, Max
+from django.http import Http404, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from .caching import make_validators
+from .fast_serializers import get_values_serializer
+
+
+class AsyncValuesView(View):
+    """
+    Async version of the `list` and `retrieve` actions of a public read-only viewset, for the ASGI deployment.
+
+    Rows are fetched with the async ORM (`acount`, `aiterator`, `aget`) as `.values()` and rendered by
+    `ValuesSerializer`, so a slow query suspends the request instead of pinning a worker. The responses are the
+    ones of the viewset: same body, limit/offset pagination, error format and, with `last_modified_field`, the
+    conditional GET validators of `ConditionalGetMixin`. Authentication, permissions, throttling and content
+    negotiation are not run, hence public JSON endpoints only.
+
+    Other methods (POST, OPTIONS, ...) are handed to `sync_view`, the viewset itself, which keeps serving every
+    request under WSGI.
+    """
+
+    queryset = None
+    serializer_class = None
+    pagination_class = api_settings.DEFAULT_PAGINATION_CLASS
+    lookup_field = "pk"
+    last_modified_field = None
+    sync_view = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Like DRF views, the sync views rely on authentication rather than on the CSRF middleware
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    def get_queryset(self, request):
+        return self.queryset.all()
+
+    def render(self, data, status=200):
+        return JsonResponse(
+            data,
+            status=status,
+            safe=False,
+            encoder=JSONEncoder,
+            json_dumps_params={"ensure_ascii": False, "separators": (",", ":")},
+        )
+
+    async def get(self, request, *args, **kwargs):
+        request = Request(request)
+        try:
+            if self.lookup_field in kwargs:
+                return await self.retrieve(request, kwargs[self.lookup_field])
+            return await self.list(request)
+        except Http404:
+            return self.handle_exception(exceptions.NotFound())
+        except exceptions.APIException as exc:
+            return self.handle_exception(exc)
+
+    def handle_exception(self, exc):
+        detail = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+        return self.render(detail, status=exc.status_code)
+
+    async def list(self, request):
+        values_serializer = get_values_serializer(self.serializer_class)
+        queryset = self.get_queryset(request)
+
+        async def render(count=None):
+            rows = queryset.values(*values_serializer.paths)
+            paginator = self.pagination_class() if self.pagination_class else None
+            if paginator is None or paginator.get_limit(request) is None:
+                return self.render(values_serializer.to_representation([row async for row in rows.aiterator()]))
+            paginator.request = request
+            paginator.limit = paginator.get_limit(request)
+            paginator.offset = paginator.get_offset(request)
+            paginator.count = await rows.acount() if count is None else count
+            page = rows[paginator.offset : paginator.offset + paginator.limit]
+            data = values_serializer.to_representation([row async for row in page.aiterator()])
+            return self.render(paginator.get_paginated_response(data).data)
+
+        return await self.conditional_response(request, "list", queryset, render)
+
+    async def retrieve(self, request, pk):
+        values_serializer = get_values_serializer(self.serializer_class)
+        queryset = self.get_queryset(request).filter(**{self.lookup_field: pk})
+
+        async def render(count=None):
+            try:
+                row = await queryset.values(*values_serializer.paths).aget()
+            except ObjectDoesNotExist:
+                raise Http404
+            return self.render(values_serializer.to_representation([row])[0])
+
+        return await self.conditional_response(request, "retrieve", queryset, render)
+
+    async def conditional_response(self, request, action, queryset, render):
+        if self.last_modified_field is None:
+            return await render()
+
+        aggregate = await queryset.order_by().aaggregate(last_modified=Max(self.last_modified_field), count=Count("pk"))
+        etag, last_modified = make_validators(request, action, aggregate)
+        response = get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+        if response is None:
+            # The aggregate counted the rows already, the paginator does not need to count them again
+            response = await render(count=aggregate["count"])
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            if last_modified:
+                response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def options(self, request, *args, **kwargs):
+        return self.http_method_not_allowed(request, *args, **kwargs)
+
+    def http_method_not_allowed(self, request, *args, **kwargs):
+        if self.sync_view is None:
+            return super().http_method_not_allowed(request, *args, **kwargs)
+        return sync_to_async(self.sync_view)(request, *args, **kwargs)
@@ -0,0 +1,173 @@
+import hashlib
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.http import Http404
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from django.utils.translation import get_language
+from rest_framework.response import Response
+
+NAMESPACE_VERSION_KEY = "ns:{namespace}:version"
+
+
+class CacheStats:
+    """
+    Hit/miss counters of the cached responses, per namespace.
+
+    The counters live in the process, every worker reports its own numbers.
+    """
+
+    def __init__(self):
+        self.counters = Counter()
+        self.lock = threading.Lock()
+
+    def record(self, namespace, hit):
+        with self.lock:
+            self.counters[(namespace, "hits" if hit else "misses")] += 1
+
+    def get(self, namespace):
+        with self.lock:
+            return {
+                "hits": self.counters[(namespace, "hits")],
+                "misses": self.counters[(namespace, "misses")],
+            }
+
+    def totals(self):
+        """
+        Return the counters of every namespace, by (namespace, "hits" or "misses").
+        """
+        with self.lock:
+            return dict(self.counters)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+
+
+cache_stats = CacheStats()
+
+
+def get_namespace_version(namespace):
+    return cache.get_or_set(NAMESPACE_VERSION_KEY.format(namespace=namespace), 1, timeout=None)
+
+
+def invalidate_namespace(namespace):
+    """
+    Invalidate every entry cached in `namespace`.
+
+    The version is part of all keys of the namespace, so bumping it orphans the old entries in one call (they
+    expire with their timeout) instead of scanning the cache for the keys to delete.
+    """
+    key = NAMESPACE_VERSION_KEY.format(namespace=namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, timeout=None)
+
+
+def make_validators(request, action, aggregate):
+    """
+    Return the ETag and Last-Modified timestamp of the rows of `aggregate` (see `ConditionalGetMixin`).
+    """
+    last_modified = aggregate["last_modified"]
+    params = sorted(request.query_params.lists())
+    key = f"{action}:{get_language()}:{params}:{aggregate['count']}:{last_modified and last_modified.isoformat()}"
+    etag = quote_etag(hashlib.md5(key.encode()).hexdigest())
+    return etag, last_modified and int(last_modified.timestamp())
+
+
+class CachedResponseMixin:
+    """
+    Read-through cache of the `list` and `retrieve` responses of a viewset.
+
+    Responses are cached per action, query params and language under a versioned `cache_namespace`, see
+    `invalidate_namespace`. The `X-Cache` response header tells whether a response was served from the cache.
+    """
+
+    cache_namespace = None
+    cache_timeout = settings.CATALOG_CACHE_TIMEOUT
+
+    def get_cache_key(self, request):
+        params = sorted(request.query_params.lists())
+        # The host is part of the key because paginated responses link to it
+        digest = hashlib.md5(f"{request.get_host()}:{self.kwargs}:{params}".encode()).hexdigest()
+        version = get_namespace_version(self.cache_namespace)
+        return f"response:{self.cache_namespace}:v{version}:{self.basename}:{self.action}:{get_language()}:{digest}"
+
+    def cached_response(self, request, view, *args, **kwargs):
+        key = self.get_cache_key(request)
+        data = cache.get(key)
+        cache_stats.record(self.cache_namespace, hit=data is not None)
+        if data is not None:
+            response = Response(data)
+            response["X-Cache"] = "HIT"
+            return response
+
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, timeout=self.cache_timeout)
+        response["X-Cache"] = "MISS"
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
+
+
+class ConditionalGetMixin:
+    """
+    Answer `If-None-Match` and `If-Modified-Since` on the `list` and `retrieve` actions of a viewset.
+
+    The validators come from a single aggregate over the (filtered) queryset, the latest `updated_at` and the row
+    count, so a 304 is sent without fetching or serializing any row. Combined with `CachedResponseMixin` the aggregate
+    is cached too. The count in the ETag catches deletions,
+    `Last-Modified` alone cannot see them, which is why clients should prefer the ETag.
+    """
+
+    last_modified_field = "updated_at"
+
+    def get_validators_aggregate(self, queryset):
+        return queryset.order_by().aggregate(last_modified=Max(self.last_modified_field), count=Count("pk"))
+
+    def get_validators(self, request, queryset):
+        if isinstance(self, CachedResponseMixin):
+            # The namespace version changes with the rows, so the aggregate can be cached along with the response
+            key = f"{self.get_cache_key(request)}:validators"
+            aggregate = cache.get(key)
+            if aggregate is None:
+                aggregate = self.get_validators_aggregate(queryset)
+                cache.set(key, aggregate, timeout=self.cache_timeout)
+        else:
+            aggregate = self.get_validators_aggregate(queryset)
+        return make_validators(request, self.action, aggregate)
+
+    def conditional_response(self, request, view, queryset, *args, **kwargs):
+        etag, last_modified = self.get_validators(request, queryset)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = view(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            if last_modified:
+                response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional_response(request, super().list, queryset, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})
+        except (TypeError, ValueError, ValidationError):
+            # Like `get_object()`, a malformed lookup value is not found
+            raise Http404
+        return self.conditional_response(request, super().retrieve, queryset, *args, **kwargs)
@@ -0,0 +1,105 @@
+from functools import lru_cache
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.response import Response
+
+# Fields whose `to_representation` needs a model instance or a file rather than a column value
+UNSUPPORTED_FIELDS = (
+    serializers.BaseSerializer,
+    serializers.FileField,
+    serializers.ModelField,
+    serializers.MultipleChoiceField,
+    serializers.RelatedField,
+    serializers.SerializerMethodField,
+)
+# Fields whose representation of a value fetched with `.values()` is the value itself
+IDENTITY_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.IntegerField,
+    serializers.ReadOnlyField,
+)
+
+
+class ValuesSerializer:
+    """
+    Render rows fetched with `.values()` exactly like `serializer_class` renders model instances.
+
+    The serializer fields are compiled once into `(values path, converter)` pairs, so rendering a row only looks up
+    its values and converts the few types that need it (dates, times, ...) instead of instantiating the serializer
+    and walking its fields for every row. Plain model fields, primary key relations and nested model
+    serializers (e.g. `BusSerializer(source="bus")`) of non-null relations are supported.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.fields = self.compile(serializer_class(), prefix="")
+        self.paths = [path for _, path, _ in self.flatten(self.fields)]
+
+    def compile(self, serializer, prefix):
+        """
+        Return `(name, values path, converter)` for every field, or `(name, None, fields)` for nested serializers.
+        """
+        fields = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if field.source == "*" or "." in field.source:
+                raise ImproperlyConfigured(f"{self.serializer_class.__name__}.{name}: unsupported source {field.source!r}.")
+            path = f"{prefix}{field.source}"
+            if isinstance(field, serializers.ModelSerializer):
+                fields.append((name, None, self.compile(field, prefix=f"{path}__")))
+            elif isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+                fields.append((name, path, None))
+            elif isinstance(field, UNSUPPORTED_FIELDS):
+                raise ImproperlyConfigured(f"{self.serializer_class.__name__}.{name}: unsupported field {field!r}.")
+            elif isinstance(field, IDENTITY_FIELDS):
+                fields.append((name, path, None))
+            else:
+                fields.append((name, path, field.to_representation))
+        return fields
+
+    def flatten(self, fields):
+        for name, path, converter in fields:
+            if path is None:
+                yield from self.flatten(converter)
+            else:
+                yield name, path, converter
+
+    def render(self, row, fields):
+        data = {}
+        for name, path, converter in fields:
+            if path is None:
+                data[name] = self.render(row, converter)
+                continue
+            value = row[path]
+            data[name] = value if converter is None or value is None else converter(value)
+        return data
+
+    def to_representation(self, rows):
+        return [self.render(row, self.fields) for row in rows]
+
+
+@lru_cache(maxsize=None)
+def get_values_serializer(serializer_class):
+    return ValuesSerializer(serializer_class)
+
+
+class ValuesListMixin:
+    """
+    Serve the `list` action of a read-only viewset from `.values()` rows rendered by `ValuesSerializer`.
+
+    The response and the OpenAPI schema are the ones of `serializer_class`, only the model instances and the
+    serializer are skipped. Nested serializers are fetched with joins, so `select_related` is not needed.
+    """
+
+    def list(self, request, *args, **kwargs):
+        values_serializer = get_values_serializer(self.get_serializer_class())
+        queryset = self.filter_queryset(self.get_queryset()).values(*values_serializer.paths)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(values_serializer.to_representation(page))
+        return Response(values_serializer.to_representation(queryset))
@@ -0,0 +1,132 @@
+from dataclasses import dataclass, field
+
+from graphql import GraphQLError, get_named_type, get_nullable_type, is_list_type
+from graphql.language import (
+    FieldNode,
+    FragmentSpreadNode,
+    InlineFragmentNode,
+    IntValueNode,
+    ObjectValueNode,
+)
+from graphql.validation import ValidationRule
+from strawberry.dataloader import DataLoader
+from strawberry.django.context import StrawberryDjangoContext
+from strawberry.django.views import AsyncGraphQLView
+from strawberry.types import Info
+from strawberry_django.fields.field import StrawberryDjangoField
+from strawberry_django.pagination import OffsetPaginationInput
+
+# Rows of a list field, at the root or for every parent object
+MAX_PAGE_SIZE = 100
+MAX_QUERY_DEPTH = 8
+MAX_QUERY_COST = 20_000
+
+
+class PageField(StrawberryDjangoField):
+    """
+    List field paginated with a `pagination` argument, whose limit is capped to `MAX_PAGE_SIZE` rows.
+
+    Nested lists are paginated for every parent object with window functions, in the prefetch query of the
+    optimizer.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs["pagination"] = True
+        super().__init__(*args, **kwargs)
+
+    def apply_pagination(self, queryset, pagination=None, *, related_field_id=None):
+        offset = getattr(pagination, "offset", 0) or 0
+        limit = getattr(pagination, "limit", -1)
+        if limit is None or limit < 0 or limit > MAX_PAGE_SIZE:
+            limit = MAX_PAGE_SIZE
+        if not queryset.ordered:
+            # Pages of an unordered queryset are not stable
+            queryset = queryset.order_by("pk")
+        return super().apply_pagination(
+            queryset, OffsetPaginationInput(offset=offset, limit=limit), related_field_id=related_field_id
+        )
+
+
+@dataclass
+class Context(StrawberryDjangoContext):
+    """
+    Context of a GraphQL request, with its data loaders.
+    """
+
+    loaders: dict = field(default_factory=dict)
+
+
+def get_loader(info: Info, load_fn) -> DataLoader:
+    """
+    Return the data loader of `load_fn` for the request, so that the keys loaded by the whole query are batched
+    (and cached) together.
+    """
+    loaders = info.context.loaders
+    if load_fn not in loaders:
+        loaders[load_fn] = DataLoader(load_fn=load_fn)
+    return loaders[load_fn]
+
+
+class GraphQLView(AsyncGraphQLView):
+    """
+    GraphQL endpoint, async so that data loaders can batch the loads of a query.
+    """
+
+    async def get_context(self, request, response):
+        return Context(request=request, response=response)
+
+
+def pagination_limit(node):
+    """
+    Return the limit of the `pagination` argument of a list field node, `MAX_PAGE_SIZE` if it is not a literal.
+    """
+    for argument in node.arguments or ():
+        if argument.name.value == "pagination" and isinstance(argument.value, ObjectValueNode):
+            for pagination_field in argument.value.fields:
+                if pagination_field.name.value == "limit" and isinstance(pagination_field.value, IntValueNode):
+                    limit = int(pagination_field.value.value)
+                    return limit if 0 <= limit <= MAX_PAGE_SIZE else MAX_PAGE_SIZE
+    return MAX_PAGE_SIZE
+
+
+class QueryCostRule(ValidationRule):
+    """
+    Reject the operations costing more than `MAX_QUERY_COST`.
+
+    Every field costs 1, times the rows of every list it is nested in, which are their pagination limit
+    (`MAX_PAGE_SIZE` by default): the cost bounds the number of objects a query can return, whatever its depth.
+    """
+
+    def enter_operation_definition(self, node, *args):
+        root_type = self.context.schema.get_root_type(node.operation)
+        cost = self.selection_cost(node.selection_set, root_type, set())
+        if cost > MAX_QUERY_COST:
+            self.report_error(
+                GraphQLError(f"The query costs {cost}, more than the maximum of {MAX_QUERY_COST}: paginate its lists.", node)
+            )
+
+    def selection_cost(self, selection_set, parent_type, fragments):
+        if selection_set is None or parent_type is None:
+            return 0
+        cost = 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                definition = getattr(parent_type, "fields", {}).get(selection.name.value)
+                if definition is None:
+                    # Introspection fields, or unknown fields reported by the other rules
+                    continue
+                field_type = get_nullable_type(definition.type)
+                # Lists of scalars cost as much as a scalar
+                rows = pagination_limit(selection) if is_list_type(field_type) and selection.selection_set else 1
+                cost += rows * (1 + self.selection_cost(selection.selection_set, get_named_type(field_type), fragments))
+            elif isinstance(selection, InlineFragmentNode):
+                condition = selection.type_condition
+                fragment_type = self.context.schema.get_type(condition.name.value) if condition else parent_type
+                cost += self.selection_cost(selection.selection_set, fragment_type, fragments)
+            elif isinstance(selection, FragmentSpreadNode) and selection.name.value not in fragments:
+                # Fragment cycles are reported by the other rules
+                fragment = self.context.get_fragment(selection.name.value)
+                if fragment is not None:
+                    fragment_type = self.context.schema.get_type(fragment.type_condition.name.value)
+                    cost += self.selection_cost(fragment.selection_set, fragment_type, fragments | {selection.name.value})
+        return cost
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+IDEMPOTENCY_KEY_PARAMETER = OpenApiParameter(
+    IDEMPOTENCY_HEADER,
+    OpenApiTypes.STR,
+    OpenApiParameter.HEADER,
+    description=_(
+        "Unique key of the request (e.g. a UUID). Retrying the request with the same key returns the first response "
+        "instead of creating the object again."
+    ),
+)
+
+
+class IdempotencyConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = _("A request with this idempotency key is still being processed, retry later.")
+    default_code = "idempotency_conflict"
+
+
+class IdempotencyMixin:
+    """
+    Make the `create` action of a view idempotent with the `Idempotency-Key` request header.
+
+    The first response (status and body) to a key is stored in the cache for `idempotency_timeout` seconds, keyed
+    by the user, the path and the key. Retries with the same key get that response back, with the
+    `Idempotent-Replayed` header, without validating or saving anything again. Concurrent duplicates are
+    serialized with a lock: they wait up to `idempotency_lock_timeout` seconds for the first response and get a
+    409 if it is still not there. Reusing a key with a different body is rejected. Server errors and errors raised
+    as exceptions (e.g. validation errors) are not stored, those requests can be retried with the same key.
+    Requests without the header are not affected.
+    """
+
+    idempotency_timeout = settings.IDEMPOTENCY_KEY_TTL
+    idempotency_lock_timeout = 30
+    idempotency_poll_interval = 0.05
+
+    def get_idempotency_key(self, request):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return None
+        if len(key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+            message = _("Ensure this value has at most %(max)s characters.") % {"max": MAX_IDEMPOTENCY_KEY_LENGTH}
+            raise serializers.ValidationError({IDEMPOTENCY_HEADER: [message]})
+        user = request.user.pk if request.user.is_authenticated else "anonymous"
+        digest = hashlib.md5(f"{user}:{request.path}:{key}".encode()).hexdigest()
+        return f"idempotency:{digest}"
+
+    def get_request_fingerprint(self, request):
+        data = request.data
+        if hasattr(data, "lists"):
+            data = sorted(data.lists())
+        return hashlib.md5(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+    def wait_for_response(self, key):
+        deadline = time.monotonic() + self.idempotency_lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.idempotency_poll_interval)
+            stored = cache.get(key)
+            if stored is not None or cache.get(f"{key}:lock") is None:
+                return stored
+        return None
+
+    def replay(self, request, stored):
+        if stored["fingerprint"] != self.get_request_fingerprint(request):
+            raise serializers.ValidationError(
+                {IDEMPOTENCY_HEADER: [_("This idempotency key was already used with a different request body.")]}
+            )
+        response = Response(stored["data"], status=stored["status"])
+        response[IDEMPOTENCY_REPLAYED_HEADER] = "true"
+        return response
+
+    def idempotent_response(self, request, view, *args, **kwargs):
+        key = self.get_idempotency_key(request)
+        if key is None:
+            return view(request, *args, **kwargs)
+
+        stored = cache.get(key)
+        while stored is None:
+            if not cache.add(f"{key}:lock", True, timeout=self.idempotency_lock_timeout):
+                stored = self.wait_for_response(key)
+                if stored is None and cache.get(f"{key}:lock") is not None:
+                    raise IdempotencyConflict()
+                continue
+            try:
+                # The first request may have finished between the lookup and the lock
+                stored = cache.get(key)
+                if stored is not None:
+                    break
+                # Fingerprinted first, saving nested data may alter `request.data`
+                fingerprint = self.get_request_fingerprint(request)
+                response = view(request, *args, **kwargs)
+                if response.status_code < 500:
+                    stored = {
+                        "fingerprint": fingerprint,
+                        "status": response.status_code,
+                        "data": response.data,
+                    }
+                    cache.set(key, stored, timeout=self.idempotency_timeout)
+                return response
+            finally:
+                cache.delete(f"{key}:lock")
+        return self.replay(request, stored)
+
+    @extend_schema(parameters=[IDEMPOTENCY_KEY_PARAMETER])
+    def create(self, request, *args, **kwargs):
+        return self.idempotent_response(request, super().create, *args, **kwargs)
@@ -0,0 +1,338 @@
+import atexit
+import bisect
+import hmac
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from celery.signals import after_task_publish
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse, HttpResponseForbidden
+
+from .caching import cache_stats
+from .timing import (
+    add_request_wrapper,
+    install_request_wrappers,
+    request_wrappers,
+    slow_queries,
+)
+
+# Seconds, like the default buckets of the Prometheus clients
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+CACHE_RESULTS = {"hits": "hit", "misses": "miss"}
+
+
+class Metric:
+    """
+    A counter or histogram of the `Registry`, with its samples by label values.
+    """
+
+    def __init__(self, registry, kind, name, documentation, labelnames, buckets=None):
+        self.registry = registry
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+
+    def inc(self, amount=1, **labels):
+        self.registry.add(self, tuple(labels[name] for name in self.labelnames), amount)
+
+    def observe(self, value, **labels):
+        self.registry.add(self, tuple(labels[name] for name in self.labelnames), value)
+
+
+class Registry:
+    """
+    Counters and histograms of the process, exposed in the Prometheus text format by `metrics_view`.
+
+    Updating a metric only changes a dict of the process under a lock. With `METRICS_DIR` set, every process
+    (e.g. uWSGI worker) also writes its samples to `<pid>.json` in that directory, at most every
+    `METRICS_FLUSH_INTERVAL` seconds and when it exits, and the endpoint adds up the files of all the processes:
+    whichever worker serves the scrape reports the whole fleet, a few seconds late at most. Like the multiprocess
+    mode of the Prometheus clients, the files of exited workers are kept so that counters never go down, and the
+    directory must be emptied when the service (re)starts.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = []
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.samples = {}
+            self.flushed = time.monotonic()
+
+    def forked(self):
+        # Another thread may have held the lock while forking
+        self.lock = threading.Lock()
+        self.reset()
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Metric(self, "counter", name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Metric(self, "histogram", name, documentation, labelnames, buckets))
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def collector(self, function):
+        """
+        Register `function`, returning (metric name, label values, value) counter samples computed when the
+        metrics are collected, e.g. from stats kept elsewhere.
+        """
+        self.collectors.append(function)
+        return function
+
+    def add(self, metric, labels, value):
+        with self.lock:
+            samples = self.samples.setdefault(metric.name, {})
+            if metric.kind == "counter":
+                samples[labels] = samples.get(labels, 0) + value
+                return
+            # Non-cumulative bucket counts, then the sum and the count
+            sample = samples.get(labels)
+            if sample is None:
+                sample = samples[labels] = [0] * (len(metric.buckets) + 3)
+            sample[bisect.bisect_left(metric.buckets, value)] += 1
+            sample[-2] += value
+            sample[-1] += 1
+
+    def snapshot(self):
+        """
+        Return the samples of the process, with those of the collectors, as JSON-compatible data.
+        """
+        with self.lock:
+            snapshot = {
+                name: [[list(labels), value] for labels, value in samples.items()] for name, samples in self.samples.items()
+            }
+        for collect in self.collectors:
+            for name, labels, value in collect():
+                snapshot.setdefault(name, []).append([list(labels), value])
+        return snapshot
+
+    def maybe_flush(self):
+        if settings.METRICS_DIR and time.monotonic() - self.flushed >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the samples of the process to its file of `METRICS_DIR`, atomically so readers never see half a file.
+        """
+        if not settings.METRICS_DIR:
+            return
+        self.flushed = time.monotonic()
+        directory = Path(settings.METRICS_DIR)
+        with tempfile.NamedTemporaryFile("w", dir=directory, suffix=".tmp", delete=False) as file:
+            json.dump(self.snapshot(), file)
+        os.replace(file.name, directory / f"{os.getpid()}.json")
+
+    def collect(self):
+        """
+        Return the samples of every process by metric name and label values, adding up those of the same series.
+        """
+        snapshots = [self.snapshot()]
+        if settings.METRICS_DIR:
+            for path in Path(settings.METRICS_DIR).glob("*.json"):
+                if path.stem != str(os.getpid()):
+                    try:
+                        snapshots.append(json.loads(path.read_text()))
+                    except (OSError, ValueError):
+                        # Removed meanwhile
+                        continue
+        merged = {}
+        for snapshot in snapshots:
+            for name, samples in snapshot.items():
+                series = merged.setdefault(name, {})
+                for labels, value in samples:
+                    labels = tuple(labels)
+                    if isinstance(value, list):
+                        total = series.setdefault(labels, [0] * len(value))
+                        series[labels] = [a + b for a, b in zip(total, value)]
+                    else:
+                        series[labels] = series.get(labels, 0) + value
+        return merged
+
+    def render(self):
+        """
+        Return the metrics of every process in the Prometheus text exposition format.
+        """
+        merged = self.collect()
+        lines = []
+        for name, metric in self.metrics.items():
+            lines += [f"# HELP {name} {metric.documentation}", f"# TYPE {name} {metric.kind}"]
+            for labels, value in sorted(merged.get(name, {}).items()):
+                pairs = [f'{label}="{escape(label_value)}"' for label, label_value in zip(metric.labelnames, labels)]
+                if metric.kind == "counter":
+                    lines.append(f"{name}{format_labels(pairs)} {format_value(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip([*metric.buckets, math.inf], value):
+                    cumulative += count
+                    le = "+Inf" if bound == math.inf else format_value(bound)
+                    bucket = f'le="{le}"'
+                    lines.append(f"{name}_bucket{format_labels([*pairs, bucket])} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(pairs)} {format_value(value[-2])}")
+                lines.append(f"{name}_count{format_labels(pairs)} {value[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(pairs):
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = Registry()
+atexit.register(registry.flush)
+# The samples of the parent (e.g. the uWSGI master) are in its own file
+os.register_at_fork(after_in_child=registry.forked)
+
+REQUEST_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "Duration of the requests by view and action.", ("view", "action", "method")
+)
+REQUESTS = registry.counter("http_requests_total", "Requests by view, action and status.", ("view", "action", "status"))
+DB_QUERIES = registry.counter("db_queries_total", "Database queries of the requests by view and action.", ("view", "action"))
+CACHE_REQUESTS = registry.counter(
+    "cache_requests_total", "Lookups of the cached responses by namespace and result (hit or miss).", ("namespace", "result")
+)
+CELERY_TASKS = registry.counter("celery_tasks_published_total", "Celery tasks enqueued by task name.", ("task",))
+SEATS = registry.counter("booking_seats_total", "Seats booked or released.", ("event",))
+BOOKING_DETAILS = registry.counter("booking_details_total", "Booking details booked or released.", ("event",))
+EMAILS = registry.counter("emails_total", "Emails of the outbox sent, retried or dead-lettered.", ("outcome",))
+SLOW_QUERIES = registry.counter(
+    "db_slow_queries_total", "Queries of the timed requests slower than SLOW_QUERY_MS, by fingerprint.", ("query",)
+)
+SLOW_QUERY_SECONDS = registry.counter(
+    "db_slow_query_seconds_total", "Time spent in the slow queries of the timed requests, by fingerprint.", ("query",)
+)
+SLOW_QUERIES_DROPPED = registry.counter(
+    "db_slow_queries_dropped_total", "Slow queries not counted by fingerprint, beyond the most distinct fingerprints."
+)
+
+
+@registry.collector
+def collect_cache_stats():
+    for (namespace, result), count in cache_stats.totals().items():
+        yield CACHE_REQUESTS.name, (namespace, CACHE_RESULTS[result]), count
+
+
+@registry.collector
+def collect_slow_queries():
+    # Every process reports its fingerprints, added up with those of the other processes like the counters
+    for query in slow_queries.top(limit=None):
+        yield SLOW_QUERIES.name, (query["sql"],), query["count"]
+        yield SLOW_QUERY_SECONDS.name, (query["sql"],), query["total_ms"] / 1000
+    if slow_queries.dropped:
+        yield SLOW_QUERIES_DROPPED.name, (), slow_queries.dropped
+
+
+@after_task_publish.connect
+def count_published_task(sender=None, **kwargs):
+    CELERY_TASKS.inc(task=sender)
+
+
+def resolve_view(request):
+    """
+    Return the (view, action) labels of a request: the router basename and the viewset action of the router
+    URLs, the URL name (or the view path) of the others.
+    """
+    match = request.resolver_match
+    if match is None:
+        # Unresolved paths would make a series each
+        return "unmatched", ""
+    initkwargs = getattr(match.func, "initkwargs", None) or {}
+    actions = getattr(match.func, "actions", None) or {}
+    return initkwargs.get("basename") or match.url_name or match._func_path, actions.get(request.method.lower(), "")
+
+
+class QueryCounter:
+    """
+    Database execute wrapper counting the queries.
+    """
+
+    def __init__(self):
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """
+    Record the latency, status and number of queries of every request in the metrics `registry`.
+
+    Like `main.timing.ServerTimingMiddleware`, it runs in the mode of the next handler and counts the queries of
+    the async views too.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        install_request_wrappers(connection)
+        counter = QueryCounter()
+        token = add_request_wrapper(counter)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            request_wrappers.reset(token)
+        self.record(request, response, counter, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        counter = QueryCounter()
+        token = add_request_wrapper(counter)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_wrappers.reset(token)
+        self.record(request, response, counter, time.perf_counter() - started)
+        return response
+
+    def record(self, request, response, counter, duration):
+        view, action = resolve_view(request)
+        REQUEST_LATENCY.observe(duration, view=view, action=action, method=request.method)
+        REQUESTS.inc(view=view, action=action, status=response.status_code)
+        if counter.queries:
+            DB_QUERIES.inc(counter.queries, view=view, action=action)
+        registry.maybe_flush()
+
+
+def metrics_view(request):
+    """
+    Serve the metrics in the Prometheus text format, to the bearer of `METRICS_TOKEN` when it is set.
+    """
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        if not hmac.compare_digest(request.headers.get("Authorization", ""), expected):
+            return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,166 @@
+import base64
+import datetime
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class CursorLimitOffsetPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination with an opt-in keyset cursor mode.
+
+    Requests with a `cursor` query param (empty for the first page) are paginated by the view's `cursor_ordering`,
+    e.g. `("booking_time", "id")`: a page is the `limit` rows following the position encoded in the opaque cursor.
+    Such pages filter on the ordering columns instead of skipping `OFFSET` rows and skip the `COUNT(*)`, so deep
+    pages are as fast as the first one. Requests without `cursor` keep the limit/offset behaviour.
+
+    The ordering has to end with a unique column and its columns must not be null.
+    """
+
+    cursor_query_param = "cursor"
+    cursor_query_description = _(
+        "Opaque position of the page, send an empty value for the first page. Replaces limit/offset pagination."
+    )
+    invalid_cursor_message = _("Invalid cursor")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.ordering = view.cursor_ordering
+        self.limit = self.get_limit(request)
+        position, reverse = self.decode_cursor(request, queryset.model)
+
+        ordering = [self.order_by(field, reverse) for field in self.ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(position, reverse))
+        results = list(queryset[: self.limit + 1])
+        has_more = len(results) > self.limit
+        results = results[: self.limit]
+        if reverse:
+            results.reverse()
+
+        self.next_position = self.get_position(results[-1]) if results and (reverse or has_more) else None
+        self.previous_position = (
+            self.get_position(results[0]) if results and position is not None and (has_more or not reverse) else None
+        )
+        return results
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response({"next": self.get_next_link(), "previous": self.get_previous_link(), "results": data})
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        return self.get_cursor_link(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.cursor_mode:
+            return super().get_previous_link()
+        return self.get_cursor_link(self.previous_position, reverse=True)
+
+    def get_cursor_link(self, position, reverse):
+        if position is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position, reverse))
+
+    @staticmethod
+    def order_by(field, reverse):
+        descending = field.startswith("-") != reverse
+        return f"-{field.lstrip('-')}" if descending else field.lstrip("-")
+
+    def after(self, position, reverse):
+        """
+        Return the filter for the rows after `position` in the (reversed) ordering, e.g. for `("date", "id")`:
+        `date >= position[0] AND (date > position[0] OR (date = position[0] AND id > position[1]))`.
+
+        The redundant bound on the first column lets the database range scan its index despite the `OR`.
+        """
+        conditions = []
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") != reverse else "gt"
+            equal = {ordering.lstrip("-"): value for ordering, value in zip(self.ordering[:index], position)}
+            conditions.append(Q(**equal, **{f"{name}__{lookup}": position[index]}))
+        first = self.ordering[0]
+        lookup = "lte" if first.startswith("-") != reverse else "gte"
+        return Q(**{f"{first.lstrip('-')}__{lookup}": position[0]}) & reduce(or_, conditions)
+
+    def get_position(self, instance):
+        position = []
+        for field in self.ordering:
+            if isinstance(instance, dict):
+                value = instance[field.lstrip("-")]
+            else:
+                value = instance
+                for attr in field.lstrip("-").split("__"):
+                    value = getattr(value, attr)
+            position.append(value.isoformat() if isinstance(value, (datetime.date, datetime.time)) else value)
+        return position
+
+    @staticmethod
+    def encode_cursor(position, reverse=False):
+        data = json.dumps({"p": position, "r": reverse}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, request, model):
+        """
+        Return the position and direction of the cursor of `request`, the values of the position converted by the
+        fields of `model` they order by.
+        """
+        cursor = request.query_params[self.cursor_query_param]
+        if not cursor:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            position, reverse = data["p"], bool(data["r"])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            # A tampered value would reach the query otherwise
+            position = [self.get_field(model, field).to_python(value) for field, value in zip(self.ordering, position)]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in position:
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    @staticmethod
+    def get_field(model, ordering):
+        for name in ordering.lstrip("-").split("__"):
+            field = model._meta.get_field(name)
+            model = field.related_model
+        return field
+
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        schema["properties"]["count"]["description"] = "Not returned in cursor mode."
+        return schema
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            *super().get_schema_operation_parameters(view),
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": str(self.cursor_query_description),
+                "schema": {"type": "string"},
+            },
+        ]
@@ -0,0 +1,34 @@
+"""
+GraphQL schema of the public API, served at `/graphql/`.
+
+The optimizer turns the selected fields and relations into `only`, `select_related` and `prefetch_related`
+calls, and the fields computed from other tables batch their loads with data loaders, so that a query runs a
+bounded number of SQL statements however many objects it returns. The depth and cost of the queries are limited
+(see `main.graphql.QueryCostRule`).
+"""
+
+import strawberry
+from strawberry.extensions import (
+    AddValidationRules,
+    MaxAliasesLimiter,
+    QueryDepthLimiter,
+)
+from strawberry.tools import merge_types
+from strawberry_django.optimizer import DjangoOptimizerExtension
+
+from bus.schema import Query as BusQuery
+from review.schema import Query as ReviewQuery
+
+from .graphql import MAX_QUERY_DEPTH, QueryCostRule
+
+Query = merge_types("Query", (BusQuery, ReviewQuery))
+
+schema = strawberry.Schema(
+    query=Query,
+    extensions=[
+        DjangoOptimizerExtension,
+        QueryDepthLimiter(max_depth=MAX_QUERY_DEPTH),
+        MaxAliasesLimiter(max_alias_count=15),
+        AddValidationRules([QueryCostRule]),
+    ],
+)
@@ -23,6 +23,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 env = environ.Env(
     DJANGO_DEBUG=(bool, False),
+    # Serve the public read-only endpoints with async views, set by `main.asgi`
+    DJANGO_ASYNC_VIEWS=(bool, False),
     DJANGO_SECRET_KEY=str,
     DJANGO_CORS_ORIGIN_REGEX_WHITELIST=(list, []),
     DJANGO_ADDITIONAL_ALLOWED_HOSTS=(list, []),
@@ -38,6 +40,29 @@ env = environ.Env(
     CACHE_REDIS_URL=str,
     # -- For running test (Optional)
     TEST_DJANGO_CACHE_REDIS_URL=(str, None),
+    CATALOG_CACHE_TIMEOUT=(int, 60 * 60),
+    # Seconds seats stay held before they are released
+    SEAT_HOLD_TTL=(int, 10 * 60),
+    # Seconds the responses to requests with an Idempotency-Key are replayed
+    IDEMPOTENCY_KEY_TTL=(int, 24 * 60 * 60),
+    # Days ahead for which the trips of the schedule templates are generated
+    SCHEDULE_DAYS_AHEAD=(int, 90),
+    # Share (0 to 1) of the requests timed by `main.timing.ServerTimingMiddleware`
+    SERVER_TIMING_SAMPLE_RATE=(float, 0.0),
+    # Milliseconds from which the queries of the timed requests are aggregated as slow queries
+    SLOW_QUERY_MS=(int, 100),
+    # Directory shared by the uWSGI workers to add up their metrics, emptied when the service starts
+    METRICS_DIR=(str, None),
+    METRICS_FLUSH_INTERVAL=(float, 5.0),
+    # Bearer token required to scrape /metrics, when set
+    METRICS_TOKEN=(str, None),
+    # Emails sent over one SMTP connection by the email outbox, which is also sent as soon as that many are queued
+    EMAIL_BATCH_SIZE=(int, 100),
+    # Seconds between the periodic sends of the email outbox
+    EMAIL_OUTBOX_INTERVAL=(int, 10),
+    # Attempts to send an email before it is dead-lettered, and seconds before the first retry (doubled every time)
+    EMAIL_MAX_ATTEMPTS=(int, 5),
+    EMAIL_RETRY_BACKOFF=(int, 30),
     # Static, Media configs
     DJANGO_STATIC_URL=(str, "/static/"),
     DJANGO_MEDIA_URL=(str, "/media/"),
@@ -87,6 +112,7 @@ INSTALLED_APPS = [
     "drf_spectacular",
     "rest_framework",
     "rest_framework.authtoken",
+    "django_celery_beat",
     # Local apps
     "user",
     "bus",
@@ -95,6 +121,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, to time the other middleware as well
+    "main.timing.ServerTimingMiddleware",
+    "main.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -106,7 +135,8 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
-ROOT_URLCONF = "main.urls"
+ASYNC_VIEWS = env("DJANGO_ASYNC_VIEWS")
+ROOT_URLCONF = "main.asgi_urls" if ASYNC_VIEWS else "main.urls"
 
 TEMPLATES = [
     {
@@ -222,6 +252,7 @@ CORS_ALLOW_HEADERS = (
     "x-csrftoken",
     "x-requested-with",
     "sentry-trace",
+    "idempotency-key",
 )
 
 
@@ -244,6 +275,48 @@ TESTING = (
     or env("PYTEST_XDIST_WORKER") is not None
 )
 
+CACHES = {
+    "default": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": env("CACHE_REDIS_URL"),
+        "OPTIONS": {
+            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+        },
+        "KEY_PREFIX": "bus-ticket",
+    }
+}
+if TESTING:
+    # Point TEST_DJANGO_CACHE_REDIS_URL to a local redis to run the tests against it
+    if env("TEST_DJANGO_CACHE_REDIS_URL"):
+        CACHES["default"]["LOCATION"] = env("TEST_DJANGO_CACHE_REDIS_URL")
+    else:
+        CACHES["default"] = {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+
+# Seconds the read-only catalog responses (buses, routes) stay cached, changes invalidate them right away
+CATALOG_CACHE_TIMEOUT = env("CATALOG_CACHE_TIMEOUT")
+SEAT_HOLD_TTL = env("SEAT_HOLD_TTL")
+IDEMPOTENCY_KEY_TTL = env("IDEMPOTENCY_KEY_TTL")
+SCHEDULE_DAYS_AHEAD = env("SCHEDULE_DAYS_AHEAD")
+SERVER_TIMING_SAMPLE_RATE = env("SERVER_TIMING_SAMPLE_RATE")
+SLOW_QUERY_MS = env("SLOW_QUERY_MS")
+METRICS_DIR = env("METRICS_DIR")
+METRICS_FLUSH_INTERVAL = env("METRICS_FLUSH_INTERVAL")
+METRICS_TOKEN = env("METRICS_TOKEN")
+EMAIL_BATCH_SIZE = env("EMAIL_BATCH_SIZE")
+EMAIL_OUTBOX_INTERVAL = env("EMAIL_OUTBOX_INTERVAL")
+EMAIL_MAX_ATTEMPTS = env("EMAIL_MAX_ATTEMPTS")
+EMAIL_RETRY_BACKOFF = env("EMAIL_RETRY_BACKOFF")
+
+# The request timings are logged as one JSON line per sampled request
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {"main.timing": {"handlers": ["console"], "level": "INFO", "propagate": False}},
+}
+
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
@@ -301,3 +374,18 @@ CELERY_BROKER_URL = CELERY_REDIS_URL
 CELERY_RESULT_BACKEND = CELERY_REDIS_URL
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_ACKS_LATE = True
+CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
+CELERY_BEAT_SCHEDULE = {
+    "release-expired-seat-holds": {
+        "task": "bus.tasks.release_expired_seat_holds",
+        "schedule": 60,
+    },
+    "generate-scheduled-bus-routes": {
+        "task": "bus.tasks.generate_scheduled_bus_routes",
+        "schedule": 24 * 60 * 60,
+    },
+    "send-email-outbox": {
+        "task": "rental.tasks.send_email_outbox",
+        "schedule": EMAIL_OUTBOX_INTERVAL,
+    },
+}
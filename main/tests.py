@@ -1,7 +1,42 @@
+from django.db import connection
 from django.test import TestCase as BaseTestCase
+from django.test.utils import CaptureQueriesContext
 
 
-class TestCase(BaseTestCase):
+class QueryBudgetMixin:
+    """
+    Assert that list endpoints run a fixed number of queries, however many rows they return.
+
+    Usage (in a Django/DRF test case)::
+
+        self.assertQueryBudget("/api/v1/buses/", 2, BusFactory.create_batch)
+    """
+
+    def assertQueryBudget(self, url, budget, create_batch, batch_sizes=(1, 5, 20), msg=None, **extra):
+        """
+        Call `create_batch(n)` for each of `batch_sizes`, request `url` after each batch and check that every
+        response takes the same number of queries, at most `budget`.
+        :url str: Endpoint to request
+        :budget int: Maximum number of queries per request
+        :create_batch callable: Adds `n` rows to the data the endpoint returns
+        """
+        counts = []
+        for batch_size in batch_sizes:
+            # As if the batch was committed, some caches are only invalidated then
+            with self.captureOnCommitCallbacks(execute=True):
+                create_batch(batch_size)
+            with CaptureQueriesContext(connection) as context:
+                resp = self.client.get(url, **extra)
+            self.assertEqual(resp.status_code, 200, msg or resp.content)
+            queries = "\n".join(query["sql"] for query in context.captured_queries)
+            self.assertLessEqual(
+                len(context), budget, msg or f"{url} ran {len(context)} queries (budget {budget}):\n{queries}"
+            )
+            counts.append(len(context))
+        self.assertEqual(len(set(counts)), 1, msg or f"{url} query count grows with the rows returned: {counts}")
+
+
+class TestCase(QueryBudgetMixin, BaseTestCase):
 
     def setUp(self):
         from django.core.cache import cache
@@ -0,0 +1,251 @@
+import functools
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# Most distinct statements kept by `SlowQueryStats`, new ones are counted as dropped beyond that
+MAX_FINGERPRINTS = 500
+
+FINGERPRINT_PATTERNS = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"%s"), "?"),
+    # `pk__in` lookups have one placeholder per value
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)"), "(...)"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def fingerprint(sql):
+    """
+    Normalize `sql` so that the statements differing only by their values (and the length of their `IN` lists)
+    are aggregated together.
+    """
+    for pattern, replacement in FINGERPRINT_PATTERNS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+class SlowQueryStats:
+    """
+    Count and duration of the slow queries, per fingerprint.
+
+    Like `main.caching.CacheStats`, the stats are per process: every worker only counts the queries of the requests
+    it timed. `main.metrics` exposes them as counters by fingerprint, which `/metrics` adds up across the workers,
+    so the top offenders of the fleet are a `topk()` away.
+    """
+
+    def __init__(self):
+        self.queries = defaultdict(lambda: {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        self.dropped = 0
+        self.lock = threading.Lock()
+
+    def record(self, sql, duration_ms):
+        key = fingerprint(sql)
+        with self.lock:
+            if key not in self.queries and len(self.queries) >= MAX_FINGERPRINTS:
+                self.dropped += 1
+                return
+            stats = self.queries[key]
+            stats["count"] += 1
+            stats["total_ms"] += duration_ms
+            stats["max_ms"] = max(stats["max_ms"], duration_ms)
+
+    def top(self, limit=10):
+        """
+        Return the `limit` (all if None) fingerprints that took the most time in total, with their stats.
+        """
+        with self.lock:
+            queries = [{"sql": sql, **stats} for sql, stats in self.queries.items()]
+        return sorted(queries, key=lambda query: query["total_ms"], reverse=True)[:limit]
+
+    def reset(self):
+        with self.lock:
+            self.queries.clear()
+            self.dropped = 0
+
+
+slow_queries = SlowQueryStats()
+
+# The execute wrappers of the current request. Async views run their queries in the threads of `sync_to_async`,
+# with connections of their own but a copy of the context: every connection runs the wrappers of the context.
+request_wrappers = ContextVar("request_wrappers", default=())
+
+
+def run_request_wrappers(execute, sql, params, many, context):
+    for wrapper in request_wrappers.get():
+        execute = functools.partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+def install_request_wrappers(connection, **kwargs):
+    if run_request_wrappers not in connection.execute_wrappers:
+        connection.execute_wrappers.append(run_request_wrappers)
+
+
+connection_created.connect(install_request_wrappers)
+# The connections opened before this module was imported, e.g. by the test runner
+for opened in connections.all(initialized_only=True):
+    install_request_wrappers(opened)
+
+
+def add_request_wrapper(wrapper):
+    """
+    Run the execute wrapper `wrapper` around the queries of the current request, in any thread, until the returned
+    token is passed to `request_wrappers.reset()`.
+    """
+    return request_wrappers.set((*request_wrappers.get(), wrapper))
+
+
+class RequestTiming:
+    """
+    Timings of one request: its queries, seen as an execute wrapper of the request, and its phases.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = self.view_finished = self.render_finished = None
+        self.queries = 0
+        self.db_ms = 0.0
+        self.slow_queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            self.queries += 1
+            self.db_ms += duration_ms
+            if duration_ms >= settings.SLOW_QUERY_MS:
+                self.slow_queries += 1
+                slow_queries.record(sql, duration_ms)
+
+    def phases(self, finished):
+        """
+        Return the duration in ms of the phases of the request finished at `finished`, by Server-Timing name.
+        """
+        phases = {"db": self.db_ms}
+        if self.view_started is not None:
+            view_finished = self.view_finished or finished
+            phases["view"] = (view_finished - self.view_started) * 1000
+            if self.render_finished is not None:
+                phases["render"] = (self.render_finished - view_finished) * 1000
+        phases["total"] = (finished - self.started) * 1000
+        return phases
+
+
+class ServerTimingMiddleware:
+    """
+    Time a sample of the requests and report where the time went in the `Server-Timing` header and in a JSON log
+    line of the `main.timing` logger.
+
+    A `SERVER_TIMING_SAMPLE_RATE` share of the requests is timed: their queries are counted and timed with
+    `add_request_wrapper()`, and the view and rendering phases are timed with `process_view` and a post
+    render callback of the template responses (DRF responses are rendered after the view returns). Queries
+    slower than `SLOW_QUERY_MS` are aggregated by fingerprint in `slow_queries`. The other requests only cost a
+    random draw.
+
+    Like the middleware of Django, it runs in the mode of the next handler, so that ASGI requests do not go
+    through a thread to reach the async views.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            # Hooks in the same mode, which Django would run in a thread otherwise
+            self.process_view = self.aprocess_view
+            self.process_template_response = self.aprocess_template_response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        install_request_wrappers(connection)
+        timing = request._timing = RequestTiming()
+        token = add_request_wrapper(timing)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_wrappers.reset(token)
+        return self.report(request, response, timing)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        timing = request._timing = RequestTiming()
+        token = add_request_wrapper(timing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_wrappers.reset(token)
+        return self.report(request, response, timing)
+
+    def sampled(self):
+        return settings.SERVER_TIMING_SAMPLE_RATE and random.random() < settings.SERVER_TIMING_SAMPLE_RATE
+
+    def report(self, request, response, timing):
+        phases = timing.phases(time.perf_counter())
+        response["Server-Timing"] = ", ".join(
+            f'db;dur={duration:.1f};desc="{timing.queries} queries"' if name == "db" else f"{name};dur={duration:.1f}"
+            for name, duration in phases.items()
+        )
+        logger.info(json.dumps(self.log_record(request, response, timing, phases)))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = getattr(request, "_timing", None)
+        if timing is not None:
+            timing.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        timing = getattr(request, "_timing", None)
+        if timing is not None:
+            timing.view_finished = time.perf_counter()
+            response.add_post_render_callback(lambda response: setattr(timing, "render_finished", time.perf_counter()))
+        return response
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        return ServerTimingMiddleware.process_view(self, request, view_func, view_args, view_kwargs)
+
+    async def aprocess_template_response(self, request, response):
+        return ServerTimingMiddleware.process_template_response(self, request, response)
+
+    def log_record(self, request, response, timing, phases):
+        match = request.resolver_match
+        view = action = None
+        if match is not None:
+            # The class of class-based views, the method of viewsets mapped to the action
+            view_class = getattr(match.func, "cls", None) or getattr(match.func, "view_class", None)
+            view = f"{view_class.__module__}.{view_class.__name__}" if view_class else match._func_path
+            action = (getattr(match.func, "actions", None) or {}).get(request.method.lower())
+        return {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "view": view,
+            "action": action,
+            "queries": timing.queries,
+            "slow_queries": timing.slow_queries,
+            **{f"{name}_ms": round(duration, 2) for name, duration in phases.items()},
+        }
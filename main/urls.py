@@ -31,7 +31,12 @@ from bus.views import (
     BookingViewSet,
     BusRouteViewSet,
     BusViewSet,
+    DailyRouteOccupancyViewSet,
+    JourneyPlanView,
+    LocationAutocompleteView,
     RouteViewSet,
+    SeatHoldViewSet,
+    TripSearchView,
 )
 from user.views import (
     LoginView,
@@ -43,6 +48,10 @@ from user.views import (
 from review.views import FeedbackReviewViewSet, FAQViewSet
 from rental.views import ReservationCreateView
 
+from .graphql import GraphQLView
+from .metrics import metrics_view
+from .schema import schema
+
 router = routers.DefaultRouter()
 
 router.register(r"users", UserViewSet, basename="users")
@@ -51,17 +60,24 @@ router.register(r"routes", RouteViewSet, basename="routes")
 router.register(r"bus-routes", BusRouteViewSet, basename="bus-routes")
 router.register(r"bookings", BookingViewSet, basename="bookings")
 router.register(r"booking-details", BookingDetailViewSet, basename="booking-details")
+router.register(r"seat-holds", SeatHoldViewSet, basename="seat-holds")
+router.register(r"occupancy", DailyRouteOccupancyViewSet, basename="occupancy")
 router.register(r'feedback-reviews', FeedbackReviewViewSet, basename='feedback-review')
 router.register(r'faqs', FAQViewSet, basename='faq')
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("dev/sign_in/", dev_sign_in, name="dev-sign-in"),
+    path("api/v1/search/", TripSearchView.as_view(), name="trip-search"),
+    path("api/v1/journeys/", JourneyPlanView.as_view(), name="journey-plan"),
+    path("api/v1/locations/autocomplete/", LocationAutocompleteView.as_view(), name="location-autocomplete"),
     path("api/v1/", include(router.urls)),
     path("o/google", google_oauth, name="google_oauth"),
     path("register", RegistrationView.as_view()),
     path("login", LoginView.as_view()),
     path('api/v1/reservations/', ReservationCreateView.as_view(), name='reservation-create'),
+    path("metrics", metrics_view, name="metrics"),
+    path("graphql/", GraphQLView.as_view(schema=schema, graphql_ide="graphiql" if settings.DEBUG else None), name="graphql"),
     # Docs
     path("docs/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"),
     path("api-docs/", SpectacularAPIView.as_view(), name="schema"),
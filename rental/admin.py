@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Reservation
+from .models import City, CityDistance, Reservation
 
 
 class ReservationAdmin(admin.ModelAdmin):
@@ -9,7 +9,7 @@ class ReservationAdmin(admin.ModelAdmin):
     """
     list_display = ('name', 'mobile_no', 'date_of_travel', 'duration_type', 'journey_from', 'journey_to', 'vehicle_type')
     list_filter = ('duration_type', 'vehicle_type', 'journey_from', 'journey_to', 'date_of_travel')
-    search_fields = ('name', 'mobile_no', 'journey_from', 'journey_to')
+    search_fields = ('name', 'mobile_no', 'journey_from__name', 'journey_to__name')
     date_hierarchy = 'date_of_travel'
     ordering = ('-date_of_travel',)
 
@@ -23,4 +23,24 @@ class ReservationAdmin(admin.ModelAdmin):
     )
 
 
+class CityAdmin(admin.ModelAdmin):
+    """
+    Admin interface options for the City model.
+    """
+    list_display = ('name', 'key', 'latitude', 'longitude')
+    search_fields = ('name', 'key')
+
+
+class CityDistanceAdmin(admin.ModelAdmin):
+    """
+    Admin interface options for the CityDistance model.
+    """
+    list_display = ('origin', 'destination', 'distance_km', 'duration_minutes', 'estimated')
+    list_filter = ('estimated',)
+    search_fields = ('origin__name', 'destination__name')
+    raw_id_fields = ('origin', 'destination')
+
+
 admin.site.register(Reservation, ReservationAdmin)
+admin.site.register(City, CityAdmin)
+admin.site.register(CityDistance, CityDistanceAdmin)
@@ -0,0 +1,150 @@
+import math
+import threading
+from array import array
+
+from django.core.cache import cache
+from django.db.models import Q
+
+from .models import City, CityDistance
+
+CITIES_VERSION_CACHE_KEY = "rental:cities:version"
+EARTH_RADIUS_KM = 6371.0
+# Roads in the hills are much longer than the straight line, e.g. 200 km for the 143 km from Kathmandu to Pokhara
+ROAD_DETOUR_FACTOR = 1.4
+AVERAGE_SPEED_KMH = 35
+
+
+def haversine_km(latitude, longitude, other_latitude, other_longitude):
+    """
+    Return the great-circle distance between two points, in kilometers.
+    """
+    phi, other_phi = math.radians(latitude), math.radians(other_latitude)
+    a = (
+        math.sin((other_phi - phi) / 2) ** 2
+        + math.cos(phi) * math.cos(other_phi) * math.sin(math.radians(other_longitude - longitude) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def estimate_trip(origin, destination):
+    """
+    Return the estimated (road distance in km, travel time in minutes) from a city to another, from their coordinates.
+    """
+    distance_km = round(
+        haversine_km(origin.latitude, origin.longitude, destination.latitude, destination.longitude) * ROAD_DETOUR_FACTOR,
+        1,
+    )
+    return distance_km, round(distance_km / AVERAGE_SPEED_KMH * 60)
+
+
+def estimate_city_distances(city):
+    """
+    (Re)compute the estimated distances from and to `city`, keeping the measured ones.
+    """
+    pairs = CityDistance.objects.filter(Q(origin=city) | Q(destination=city))
+    # Without the signals of `delete()`, the saved city already invalidates the matrix once
+    estimated = pairs.filter(estimated=True)
+    estimated._raw_delete(estimated.db)
+    measured = set(pairs.values_list("origin_id", "destination_id"))
+    distances = []
+    for other in City.objects.exclude(pk=city.pk):
+        for origin, destination in ((city, other), (other, city)):
+            if (origin.pk, destination.pk) not in measured:
+                distance_km, duration_minutes = estimate_trip(origin, destination)
+                distances.append(
+                    CityDistance(
+                        origin=origin, destination=destination, distance_km=distance_km, duration_minutes=duration_minutes
+                    )
+                )
+    CityDistance.objects.bulk_create(distances)
+
+
+class CityMatrix:
+    """
+    The cities, and the distance and travel time matrices between them.
+
+    Every city has an index, and the values from the city `i` to the city `j` are at `i * n + j` of flat arrays of
+    floats, NaN when unknown: a lookup is two dict gets and an array index, and 1,000 cities take 8 MB.
+    """
+
+    def __init__(self, cities, distances):
+        self.cities = {city.pk: city for city in cities}
+        self.index = {key: index for index, key in enumerate(self.cities)}
+        size = len(self.cities)
+        self.distances = array("f", [math.nan]) * (size * size)
+        self.durations = array("f", [math.nan]) * (size * size)
+        for origin, destination, distance_km, duration_minutes in distances:
+            cell = self.index[origin] * size + self.index[destination]
+            self.distances[cell] = distance_km
+            self.durations[cell] = duration_minutes
+
+    @classmethod
+    def build(cls):
+        return cls(
+            City.objects.all(),
+            CityDistance.objects.values_list("origin_id", "destination_id", "distance_km", "duration_minutes"),
+        )
+
+    def city(self, key):
+        return self.cities.get(key)
+
+    def _get(self, values, origin, destination):
+        origin_index, destination_index = self.index.get(origin), self.index.get(destination)
+        if origin_index is None or destination_index is None:
+            return None
+        value = values[origin_index * len(self.index) + destination_index]
+        return None if math.isnan(value) else value
+
+    def distance(self, origin, destination):
+        """
+        Return the road distance in km from the city keyed `origin` to the city keyed `destination`, None if unknown.
+        """
+        distance = self._get(self.distances, origin, destination)
+        # Single precision floats are only exact to about 7 digits
+        return None if distance is None else round(distance, 1)
+
+    def duration(self, origin, destination):
+        """
+        Return the travel time in minutes from the city keyed `origin` to the city keyed `destination`, None if
+        unknown.
+        """
+        duration = self._get(self.durations, origin, destination)
+        return None if duration is None else int(duration)
+
+
+class CityMatrixCache:
+    """
+    Per-process cache of the city matrix.
+
+    Signals bump a version number in the shared Django cache whenever cities or their distances change, so every
+    process reloads the matrix lazily after the next change.
+    """
+
+    def __init__(self):
+        self.cached = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        version = cache.get(CITIES_VERSION_CACHE_KEY, 0)
+        cached = self.cached
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        matrix = CityMatrix.build()
+        with self.lock:
+            self.cached = (version, matrix)
+        return matrix
+
+    def clear(self):
+        with self.lock:
+            self.cached = None
+
+
+city_matrix = CityMatrixCache()
+
+
+def invalidate_cities():
+    try:
+        cache.incr(CITIES_VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(CITIES_VERSION_CACHE_KEY, 1, timeout=None)
+    city_matrix.clear()
@@ -1,5 +1,5 @@
 import factory
-from .models import Reservation
+from .models import City, Reservation
 
 
 class ReservationFactory(factory.django.DjangoModelFactory):
@@ -11,8 +11,9 @@ class ReservationFactory(factory.django.DjangoModelFactory):
     date_of_travel = factory.Faker("future_date")
     duration_type = factory.Iterator([Reservation.DurationType.DAY_BASED, Reservation.DurationType.HOURLY_BASED])
     passenger_numbers = factory.Faker("random_int", min=1, max=50)
-    journey_from = factory.Iterator([choice[0] for choice in Reservation.CityChoices.choices])
-    journey_to = factory.Iterator([choice[0] for choice in Reservation.CityChoices.choices])
+    # The cities are created by the migrations
+    journey_from = factory.Iterator(City.objects.all())
+    journey_to = factory.Iterator(City.objects.order_by("-name"))
     vehicle_type = factory.Iterator(
         [Reservation.VehicleType.BUS, Reservation.VehicleType.MINIVAN, Reservation.VehicleType.CAR]
     )
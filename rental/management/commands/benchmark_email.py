@@ -0,0 +1,106 @@
+import socketserver
+import threading
+import time
+
+from django.core.mail import send_mail
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from rental.outbox import MemoryOutbox, queue_email, send_outbox
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """
+    Local SMTP server accepting every message, which waits `connect_seconds` before greeting a new connection like
+    the TLS and authentication handshake of a real server.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, connect_seconds):
+        super().__init__(("127.0.0.1", 0), SMTPHandler)
+        self.connect_seconds = connect_seconds
+        self.messages = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, *lines):
+        # Multiline replies in one write, which delayed acknowledgements would slow down otherwise
+        self.wfile.write("".join(f"{line}\r\n" for line in lines).encode())
+
+    def handle(self):
+        with self.server.lock:
+            self.server.connections += 1
+        time.sleep(self.server.connect_seconds)
+        self.reply("220 localhost ESMTP")
+        while line := self.rfile.readline():
+            command = line[:4].upper()
+            if command == b"EHLO":
+                self.reply("250-localhost", "250 8BITMIME")
+            elif command == b"DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with self.server.lock:
+                    self.server.messages += 1
+                self.reply("250 OK")
+            elif command == b"QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+class Command(BaseCommand):
+    help = "Compare the emails sent per second with one connection per email and through the batching email outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=500, help="Emails sent by each path.")
+        parser.add_argument("--batch-size", type=int, help="Emails per batch of the outbox, EMAIL_BATCH_SIZE by default.")
+        parser.add_argument(
+            "--connect-ms", type=float, default=20.0, help="Milliseconds the stand-in server takes to accept a connection."
+        )
+        parser.add_argument("--min-speedup", type=float, default=2.0, help="Fail if the outbox is not this much faster.")
+
+    def handle(self, *args, **options):
+        server = SMTPStandIn(options["connect_ms"] / 1000)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        messages = options["messages"]
+        email_settings = {
+            "EMAIL_BACKEND": "django.core.mail.backends.smtp.EmailBackend",
+            "EMAIL_HOST": "127.0.0.1",
+            "EMAIL_PORT": server.server_address[1],
+            "EMAIL_HOST_USER": "",
+            "EMAIL_HOST_PASSWORD": "",
+            "EMAIL_USE_TLS": False,
+            "EMAIL_USE_SSL": False,
+        }
+        try:
+            with override_settings(**email_settings):
+                # What every confirmation email did before the outbox
+                started = time.perf_counter()
+                for index in range(messages):
+                    send_mail("Benchmark", "Body", "benchmark@example.com", [f"user{index}@example.com"])
+                direct = messages / (time.perf_counter() - started)
+
+                # A store of its own, so that no real email is sent to the stand-in
+                store = MemoryOutbox()
+                started = time.perf_counter()
+                for index in range(messages):
+                    queue_email("Benchmark", "Body", "benchmark@example.com", [f"user{index}@example.com"], store=store)
+                outcomes = send_outbox(batch_size=options["batch_size"], store=store)
+                batched = messages / (time.perf_counter() - started)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        if outcomes["sent"] != messages or server.messages != 2 * messages:
+            raise CommandError(f"Expected {2 * messages} emails, the server received {server.messages}: {outcomes}.")
+        self.stdout.write(f"One connection per email: {direct:,.0f} emails/s")
+        self.stdout.write(f"Email outbox:             {batched:,.0f} emails/s ({batched / direct:.1f}x)")
+        self.stdout.write(f"Connections: {server.connections}")
+        if batched < direct * options["min_speedup"]:
+            raise CommandError(f"The email outbox is less than {options['min_speedup']}x faster.")
+        self.stdout.write(self.style.SUCCESS("Speedup target met."))
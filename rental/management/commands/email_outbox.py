@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from rental.outbox import outbox, send_outbox
+
+
+class Command(BaseCommand):
+    help = "Show the emails of the outbox by state, and send them or requeue the dead-lettered ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requeue-dead", action="store_true", help="Queue the dead-lettered emails again.")
+        parser.add_argument("--send", action="store_true", help="Send the pending emails now.")
+
+    def handle(self, *args, **options):
+        store = outbox.store
+        if options["requeue_dead"]:
+            self.stdout.write(f"Requeued {store.requeue_dead()} dead-lettered emails.")
+        if options["send"]:
+            outcomes = send_outbox()
+            self.stdout.write(", ".join(f"{outcome}: {count}" for outcome, count in outcomes.items()))
+        for state, count in store.counts().items():
+            self.stdout.write(f"{state}: {count}")
@@ -0,0 +1,106 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:33
+
+import math
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+# The cities of the former `Reservation.CityChoices`, with their coordinates
+CITIES = [
+    ('kathmandu', 'Kathmandu', 27.7172, 85.3240),
+    ('pokhara', 'Pokhara', 28.2096, 83.9856),
+    ('lalitpur', 'Lalitpur', 27.6644, 85.3188),
+    ('bhaktapur', 'Bhaktapur', 27.6710, 85.4298),
+    ('biratnagar', 'Biratnagar', 26.4525, 87.2718),
+    ('birgunj', 'Birgunj', 27.0104, 84.8770),
+    ('dharan', 'Dharan', 26.8065, 87.2846),
+    ('bharatpur', 'Bharatpur', 27.6768, 84.4359),
+    ('butwal', 'Butwal', 27.7006, 83.4484),
+    ('hetauda', 'Hetauda', 27.4287, 85.0322),
+    ('janakpur', 'Janakpur', 26.7288, 85.9263),
+    ('dhangadhi', 'Dhangadhi', 28.6852, 80.6216),
+    ('nepalgunj', 'Nepalgunj', 28.0500, 81.6167),
+    ('itahari', 'Itahari', 26.6646, 87.2798),
+    ('tulsipur', 'Tulsipur', 28.1310, 82.2973),
+    ('siddharthanagar', 'Siddharthanagar (Bhairahawa)', 27.5046, 83.4503),
+    ('ghorahi', 'Ghorahi', 28.0387, 82.4864),
+    ('damak', 'Damak', 26.6586, 87.7024),
+    ('rajbiraj', 'Rajbiraj', 26.5393, 86.7458),
+    ('lahan', 'Lahan', 26.7206, 86.4827),
+    ('inaruwa', 'Inaruwa', 26.6069, 87.1480),
+    ('tikapur', 'Tikapur', 28.5000, 81.1333),
+    ('kirtipur', 'Kirtipur', 27.6786, 85.2775),
+    ('bhadrapur', 'Bhadrapur', 26.5440, 88.0943),
+    ('mechinagar', 'Mechinagar (Kakarbhitta)', 26.6550, 88.0840),
+]
+
+
+def estimate_trip(origin, destination):
+    # Same estimate as `rental.cities.estimate_trip` when the migration was written
+    phi, other_phi = math.radians(origin.latitude), math.radians(destination.latitude)
+    a = (
+        math.sin((other_phi - phi) / 2) ** 2
+        + math.cos(phi) * math.cos(other_phi) * math.sin(math.radians(destination.longitude - origin.longitude) / 2) ** 2
+    )
+    distance_km = round(2 * 6371.0 * math.asin(math.sqrt(a)) * 1.4, 1)
+    return distance_km, round(distance_km / 35 * 60)
+
+
+def populate_cities(apps, schema_editor):
+    City = apps.get_model('rental', 'City')
+    CityDistance = apps.get_model('rental', 'CityDistance')
+
+    cities = City.objects.bulk_create(
+        City(key=key, name=name, latitude=latitude, longitude=longitude) for key, name, latitude, longitude in CITIES
+    )
+    distances = []
+    for origin in cities:
+        for destination in cities:
+            if origin.key != destination.key:
+                distance_km, duration_minutes = estimate_trip(origin, destination)
+                distances.append(
+                    CityDistance(
+                        origin=origin, destination=destination, distance_km=distance_km, duration_minutes=duration_minutes
+                    )
+                )
+    CityDistance.objects.bulk_create(distances)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0002_reservation_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='City',
+            fields=[
+                ('key', models.SlugField(help_text="Identifier of the city, e.g. 'kathmandu'. It cannot be changed later.", max_length=100, primary_key=True, serialize=False, verbose_name='Key')),
+                ('name', models.CharField(help_text='Enter the name of the city.', max_length=100, verbose_name='Name')),
+                ('latitude', models.FloatField(help_text='Latitude of the city, in degrees.', validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)], verbose_name='Latitude')),
+                ('longitude', models.FloatField(help_text='Longitude of the city, in degrees.', validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)], verbose_name='Longitude')),
+            ],
+            options={
+                'verbose_name_plural': 'cities',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CityDistance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('distance_km', models.FloatField(help_text='Road distance, in kilometers.', validators=[django.core.validators.MinValueValidator(0)], verbose_name='Distance (km)')),
+                ('duration_minutes', models.PositiveIntegerField(help_text='Travel time, in minutes.', verbose_name='Duration (minutes)')),
+                ('estimated', models.BooleanField(default=True, help_text='Estimated from the coordinates of the cities. Uncheck when entering measured values.', verbose_name='Estimated')),
+                ('destination', models.ForeignKey(help_text='The city the trip ends at.', on_delete=django.db.models.deletion.CASCADE, related_name='distances_to', to='rental.city', verbose_name='Destination')),
+                ('origin', models.ForeignKey(help_text='The city the trip starts from.', on_delete=django.db.models.deletion.CASCADE, related_name='distances_from', to='rental.city', verbose_name='Origin')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='citydistance',
+            constraint=models.UniqueConstraint(fields=('origin', 'destination'), name='city_distance_origin_destination_unique'),
+        ),
+        migrations.RunPython(populate_cities, migrations.RunPython.noop),
+    ]
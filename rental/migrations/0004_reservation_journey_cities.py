@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0003_city_citydistance'),
+    ]
+
+    operations = [
+        # The columns keep the city keys, which are now foreign keys to the cities
+        migrations.AlterField(
+            model_name='reservation',
+            name='journey_from',
+            field=models.ForeignKey(db_column='journey_from', help_text='Select the starting location of your journey.', on_delete=django.db.models.deletion.PROTECT, related_name='reservations_from', to='rental.city', verbose_name='Journey From'),
+        ),
+        migrations.AlterField(
+            model_name='reservation',
+            name='journey_to',
+            field=models.ForeignKey(db_column='journey_to', help_text='Select the destination of your journey.', on_delete=django.db.models.deletion.PROTECT, related_name='reservations_to', to='rental.city', verbose_name='Journey To'),
+        ),
+    ]
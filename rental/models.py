@@ -1,10 +1,114 @@
 from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.utils import timezone
 from django.db import models
 
 from phonenumber_field.modelfields import PhoneNumberField
 
 
+class City(models.Model):
+    """
+    A model representing a city that vehicles can be reserved from or to.
+
+    Attributes
+    ----------
+    key : str
+        Identifier of the city, e.g. 'kathmandu', stored in the reservations.
+    name : str
+        The name of the city.
+    latitude : float
+        Latitude of the city, in degrees.
+    longitude : float
+        Longitude of the city, in degrees.
+    """
+
+    key = models.SlugField(
+        max_length=100,
+        primary_key=True,
+        verbose_name="Key",
+        help_text="Identifier of the city, e.g. 'kathmandu'. It cannot be changed later."
+    )
+    name = models.CharField(
+        max_length=100,
+        verbose_name="Name",
+        help_text="Enter the name of the city."
+    )
+    latitude = models.FloatField(
+        validators=[MinValueValidator(-90), MaxValueValidator(90)],
+        verbose_name="Latitude",
+        help_text="Latitude of the city, in degrees."
+    )
+    longitude = models.FloatField(
+        validators=[MinValueValidator(-180), MaxValueValidator(180)],
+        verbose_name="Longitude",
+        help_text="Longitude of the city, in degrees."
+    )
+
+    class Meta:
+        ordering = ['name']
+        verbose_name_plural = 'cities'
+
+    def __str__(self):
+        return self.name
+
+
+class CityDistance(models.Model):
+    """
+    A model representing the road distance and travel time from a city to another.
+
+    Attributes
+    ----------
+    origin : City
+        The city the trip starts from.
+    destination : City
+        The city the trip ends at.
+    distance_km : float
+        The road distance, in kilometers.
+    duration_minutes : int
+        The travel time, in minutes.
+    estimated : bool
+        Whether the distance and travel time are estimated from the coordinates of the cities, and recomputed when
+        they change, rather than measured.
+    """
+
+    origin = models.ForeignKey(
+        City,
+        on_delete=models.CASCADE,
+        related_name='distances_from',
+        verbose_name="Origin",
+        help_text="The city the trip starts from."
+    )
+    destination = models.ForeignKey(
+        City,
+        on_delete=models.CASCADE,
+        related_name='distances_to',
+        verbose_name="Destination",
+        help_text="The city the trip ends at."
+    )
+    distance_km = models.FloatField(
+        validators=[MinValueValidator(0)],
+        verbose_name="Distance (km)",
+        help_text="Road distance, in kilometers."
+    )
+    duration_minutes = models.PositiveIntegerField(
+        verbose_name="Duration (minutes)",
+        help_text="Travel time, in minutes."
+    )
+    estimated = models.BooleanField(
+        default=True,
+        verbose_name="Estimated",
+        help_text="Estimated from the coordinates of the cities. Uncheck when entering measured values."
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['origin', 'destination'], name='city_distance_origin_destination_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.origin_id} - {self.destination_id}"
+
+
 class Reservation(models.Model):
     """
     A model representing a reservation for a vehicle journey.
@@ -21,10 +125,10 @@ class Reservation(models.Model):
         The type of duration for the journey. Choices are 'Day Based' or 'Hourly Based'.
     passenger_numbers : int
         The number of passengers included in the reservation.
-    journey_from : str
-        The starting location of the journey. Must be a different city than `journey_to`.
-    journey_to : str
-        The destination of the journey. Must be a different city than `journey_from`.
+    journey_from : City
+        The starting city of the journey. Must be a different city than `journey_to`.
+    journey_to : City
+        The destination city of the journey. Must be a different city than `journey_from`.
     vehicle_type : str
         The type of vehicle requested for the journey. Choices include 'Bus', 'Minivan', or 'Car'.
     comment : str, optional
@@ -45,34 +149,6 @@ class Reservation(models.Model):
         MINIVAN = 'minivan', 'Minivan'
         CAR = 'car', 'Car'
 
-    # TODO: Add seperate way to load city
-    class CityChoices(models.TextChoices):
-        KATHMANDU = 'kathmandu', 'Kathmandu'
-        POKHARA = 'pokhara', 'Pokhara'
-        LALITPUR = 'lalitpur', 'Lalitpur'
-        BHAKTAPUR = 'bhaktapur', 'Bhaktapur'
-        BIRATNAGAR = 'biratnagar', 'Biratnagar'
-        BIRGUNJ = 'birgunj', 'Birgunj'
-        DHARAN = 'dharan', 'Dharan'
-        BHARATPUR = 'bharatpur', 'Bharatpur'
-        BUTWAL = 'butwal', 'Butwal'
-        HETAUDA = 'hetauda', 'Hetauda'
-        JANAKPUR = 'janakpur', 'Janakpur'
-        DHANGADHI = 'dhangadhi', 'Dhangadhi'
-        NEPALGUNJ = 'nepalgunj', 'Nepalgunj'
-        ITAHARI = 'itahari', 'Itahari'
-        TULSIPUR = 'tulsipur', 'Tulsipur'
-        SIDDHARTHANAGAR = 'siddharthanagar', 'Siddharthanagar (Bhairahawa)'
-        GHORAHI = 'ghorahi', 'Ghorahi'
-        DAMAK = 'damak', 'Damak'
-        RAJBIRAJ = 'rajbiraj', 'Rajbiraj'
-        LAHAN = 'lahan', 'Lahan'
-        INARUWA = 'inaruwa', 'Inaruwa'
-        TIKAPUR = 'tikapur', 'Tikapur'
-        KIRTIPUR = 'kirtipur', 'Kirtipur'
-        BHADRAPUR = 'bhadrapur', 'Bhadrapur'
-        MECHINAGAR = 'mechinagar', 'Mechinagar (Kakarbhitta)'
-
     name = models.CharField(
         max_length=100,
         verbose_name="Full Name",
@@ -97,15 +173,19 @@ class Reservation(models.Model):
         verbose_name="Number of Passengers",
         help_text="Enter the number of passengers."
     )
-    journey_from = models.CharField(
-        max_length=100,
-        choices=CityChoices.choices,
+    journey_from = models.ForeignKey(
+        City,
+        on_delete=models.PROTECT,
+        related_name='reservations_from',
+        db_column='journey_from',
         verbose_name="Journey From",
         help_text="Select the starting location of your journey."
     )
-    journey_to = models.CharField(
-        max_length=100,
-        choices=CityChoices.choices,
+    journey_to = models.ForeignKey(
+        City,
+        on_delete=models.PROTECT,
+        related_name='reservations_to',
+        db_column='journey_to',
         verbose_name="Journey To",
         help_text="Select the destination of your journey."
     )
@@ -137,7 +217,7 @@ class Reservation(models.Model):
             If `journey_from` and `journey_to` are the same.
             If `date_of_travel` is in the past.
         """
-        if self.journey_from == self.journey_to:
+        if self.journey_from_id == self.journey_to_id:
             raise ValidationError('Journey From and Journey To cannot be the same.')
 
         if self.date_of_travel < timezone.now().date():
@@ -0,0 +1,272 @@
+import contextlib
+import json
+import logging
+import smtplib
+import threading
+import time
+import uuid
+from collections import deque
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+from main.metrics import EMAILS
+
+logger = logging.getLogger(__name__)
+
+# Seconds a claimed message may take to be sent before it is claimed again, e.g. after a worker crashed
+CLAIM_TIMEOUT = 5 * 60
+MAX_RETRY_DELAY = 60 * 60
+
+# KEYS: pending list, retry schedule, in-flight messages
+# ARGV: now (ms), batch size, claim deadline (ms)
+# Moves the due retries and the timed out claims back to the pending list, then claims a batch from its head.
+REDIS_CLAIM_SCRIPT = """
+for _, key in ipairs({KEYS[2], KEYS[3]}) do
+    local due = redis.call('ZRANGEBYSCORE', key, '-inf', ARGV[1])
+    for _, message in ipairs(due) do
+        redis.call('RPUSH', KEYS[1], message)
+    end
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', ARGV[1])
+end
+local batch = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[2]) - 1)
+if #batch > 0 then
+    redis.call('LTRIM', KEYS[1], #batch, -1)
+    for _, message in ipairs(batch) do
+        redis.call('ZADD', KEYS[3], ARGV[3], message)
+    end
+end
+return batch
+"""
+
+
+def _ms(timestamp):
+    return int(timestamp * 1000)
+
+
+class RedisOutbox:
+    """
+    Emails queued in Redis, as JSON strings, under keys starting with `prefix`:
+
+    - `<prefix>:pending`: list of the messages to send, in order.
+    - `<prefix>:retry`: the messages to send again, sorted by the time of their next attempt.
+    - `<prefix>:in-flight`: the messages being sent, sorted by the time they may be claimed again.
+    - `<prefix>:dead`: list of the messages that could not be sent, to inspect and requeue.
+
+    Claiming moves a batch from the pending list to the in-flight messages in a script, so concurrent senders never
+    claim the same message; a message is sent at least once, twice if its sender crashed before acknowledging it.
+    """
+
+    def __init__(self, client, prefix="email-outbox"):
+        self.client = client
+        self.claim_script = client.register_script(REDIS_CLAIM_SCRIPT)
+        self.pending_key = f"{prefix}:pending"
+        self.retry_key = f"{prefix}:retry"
+        self.in_flight_key = f"{prefix}:in-flight"
+        self.dead_key = f"{prefix}:dead"
+
+    def append(self, message):
+        return self.client.rpush(self.pending_key, json.dumps(message))
+
+    def claim(self, now, batch_size):
+        batch = self.claim_script(
+            keys=[self.pending_key, self.retry_key, self.in_flight_key],
+            args=[_ms(now), batch_size, _ms(now + CLAIM_TIMEOUT)],
+        )
+        return [(raw, json.loads(raw)) for raw in batch]
+
+    def ack(self, raw):
+        self.client.zrem(self.in_flight_key, raw)
+
+    def retry(self, raw, message, at):
+        pipeline = self.client.pipeline()
+        pipeline.zrem(self.in_flight_key, raw)
+        pipeline.zadd(self.retry_key, {json.dumps(message): _ms(at)})
+        pipeline.execute()
+
+    def dead(self, raw, message):
+        pipeline = self.client.pipeline()
+        pipeline.zrem(self.in_flight_key, raw)
+        pipeline.rpush(self.dead_key, json.dumps(message))
+        pipeline.execute()
+
+    def requeue_dead(self):
+        requeued = 0
+        while (raw := self.client.lpop(self.dead_key)) is not None:
+            self.append({**json.loads(raw), "attempts": 0})
+            requeued += 1
+        return requeued
+
+    def clear(self):
+        self.client.delete(self.pending_key, self.retry_key, self.in_flight_key, self.dead_key)
+
+    def counts(self):
+        pipeline = self.client.pipeline(transaction=False)
+        pipeline.llen(self.pending_key)
+        pipeline.zcard(self.retry_key)
+        pipeline.zcard(self.in_flight_key)
+        pipeline.llen(self.dead_key)
+        return dict(zip(("pending", "retry", "in_flight", "dead"), pipeline.execute()))
+
+
+class MemoryOutbox:
+    """
+    Emails queued in the memory of the process, when the cache is not Redis (development and tests).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.pending = deque()
+        self.retries = {}
+        self.in_flight = {}
+        self.dead_letters = []
+
+    def append(self, message):
+        with self.lock:
+            self.pending.append(json.dumps(message))
+            return len(self.pending)
+
+    def claim(self, now, batch_size):
+        with self.lock:
+            for messages in (self.retries, self.in_flight):
+                for raw, at in list(messages.items()):
+                    if at <= now:
+                        del messages[raw]
+                        self.pending.append(raw)
+            batch = [self.pending.popleft() for _ in range(min(batch_size, len(self.pending)))]
+            self.in_flight.update(dict.fromkeys(batch, now + CLAIM_TIMEOUT))
+        return [(raw, json.loads(raw)) for raw in batch]
+
+    def ack(self, raw):
+        with self.lock:
+            self.in_flight.pop(raw, None)
+
+    def retry(self, raw, message, at):
+        with self.lock:
+            self.in_flight.pop(raw, None)
+            self.retries[json.dumps(message)] = at
+
+    def dead(self, raw, message):
+        with self.lock:
+            self.in_flight.pop(raw, None)
+            self.dead_letters.append(json.dumps(message))
+
+    def requeue_dead(self):
+        with self.lock:
+            dead_letters, self.dead_letters = self.dead_letters, []
+        for raw in dead_letters:
+            self.append({**json.loads(raw), "attempts": 0})
+        return len(dead_letters)
+
+    def counts(self):
+        with self.lock:
+            return {
+                "pending": len(self.pending),
+                "retry": len(self.retries),
+                "in_flight": len(self.in_flight),
+                "dead": len(self.dead_letters),
+            }
+
+
+class Outbox:
+    """
+    The email outbox, in Redis when the cache is django-redis, in memory otherwise.
+    """
+
+    def __init__(self):
+        self.memory = MemoryOutbox()
+        self._redis = None
+
+    @property
+    def store(self):
+        if self._redis is None and settings.CACHES["default"]["BACKEND"].startswith("django_redis."):
+            from django_redis import get_redis_connection
+
+            self._redis = RedisOutbox(get_redis_connection("default"))
+        return self._redis or self.memory
+
+    def clear(self):
+        """
+        Delete the emails of both stores, e.g. between tests.
+        """
+        self.memory.clear()
+        if self.store is not self.memory:
+            self.store.clear()
+
+
+outbox = Outbox()
+
+
+def queue_email(subject, body, from_email, to, store=None):
+    """
+    Queue an email in the outbox (or `store`), returning the number of pending emails.
+    """
+    message = {
+        "id": str(uuid.uuid4()),
+        "subject": subject,
+        "body": body,
+        "from_email": from_email,
+        "to": list(to),
+        "attempts": 0,
+    }
+    return (store or outbox.store).append(message)
+
+
+def retry_delay(attempts):
+    """
+    Return the seconds before the next attempt to send a message that failed `attempts` times.
+    """
+    return min(settings.EMAIL_RETRY_BACKOFF * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+
+
+def send_outbox(batch_size=None, now=None, store=None):
+    """
+    Send the pending emails of the outbox (or `store`), `batch_size` (`EMAIL_BATCH_SIZE` by default) at a time,
+    over one SMTP connection, and return the number of emails by outcome.
+
+    A failed email is retried with an exponential backoff, until `EMAIL_MAX_ATTEMPTS` attempts; then, or right away
+    when the server refuses its recipients, it is dead-lettered.
+    """
+    store = store or outbox.store
+    batch_size = batch_size or settings.EMAIL_BATCH_SIZE
+    outcomes = {"sent": 0, "retried": 0, "dead": 0}
+    connection = get_connection(fail_silently=False)
+    try:
+        while batch := store.claim(now or time.time(), batch_size):
+            for raw, message in batch:
+                outcome = _send(store, connection, raw, message, now or time.time())
+                outcomes[outcome] += 1
+                EMAILS.inc(outcome=outcome)
+    finally:
+        with contextlib.suppress(smtplib.SMTPException, OSError):
+            connection.close()
+    return outcomes
+
+
+def _send(store, connection, raw, message, now):
+    email = EmailMessage(message["subject"], message["body"], message["from_email"], message["to"], connection=connection)
+    try:
+        # Opened by the first message and kept open for the next ones, which `send_messages` would close otherwise
+        connection.open()
+        connection.send_messages([email])
+    except smtplib.SMTPRecipientsRefused as error:
+        logger.error("Dead-lettering email %s, its recipients were refused: %s", message["id"], error)
+        store.dead(raw, {**message, "error": str(error)})
+        return "dead"
+    except (smtplib.SMTPException, OSError) as error:
+        # The next message reconnects, in case the connection is broken
+        with contextlib.suppress(smtplib.SMTPException, OSError):
+            connection.close()
+        attempts = message["attempts"] + 1
+        if attempts >= settings.EMAIL_MAX_ATTEMPTS:
+            logger.error("Dead-lettering email %s after %s attempts: %s", message["id"], attempts, error)
+            store.dead(raw, {**message, "attempts": attempts, "error": str(error)})
+            return "dead"
+        logger.warning("Failed to send email %s, retrying: %s", message["id"], error)
+        store.retry(raw, {**message, "attempts": attempts, "error": str(error)}, now + retry_delay(attempts))
+        return "retried"
+    store.ack(raw)
+    return "sent"
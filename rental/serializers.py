@@ -1,12 +1,38 @@
 from django.utils import timezone
 from django.db import transaction
 
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
+from .cities import city_matrix
 from .models import Reservation
 from .tasks import send_booking_confirmation_email
 
 
+@extend_schema_field(OpenApiTypes.STR)
+class CityField(serializers.Field):
+    """
+    A city given by its key, looked up in the per-process city matrix rather than in the database.
+    """
+
+    default_error_messages = {
+        'does_not_exist': 'Unknown city "{city}".',
+    }
+
+    def to_internal_value(self, data):
+        city = city_matrix.get().city(str(data))
+        if city is None:
+            self.fail('does_not_exist', city=data)
+        return city
+
+    def to_representation(self, value):
+        return value.pk
+
+
 class ReservationSerializer(serializers.ModelSerializer):
+    journey_from = CityField(help_text="Key of the starting city of the journey.")
+    journey_to = CityField(help_text="Key of the destination city of the journey.")
+
     class Meta:
         model = Reservation
         fields = '__all__'
@@ -18,6 +44,11 @@ class ReservationSerializer(serializers.ModelSerializer):
         if data['date_of_travel'] < timezone.now().date():
             raise serializers.ValidationError("Date of Travel cannot be in the past.")
 
+        if city_matrix.get().distance(data['journey_from'].pk, data['journey_to'].pk) is None:
+            raise serializers.ValidationError(
+                f"There is no known road from {data['journey_from']} to {data['journey_to']}."
+            )
+
         return data
 
     def create(self, validated_data):
@@ -0,0 +1,20 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cities import estimate_city_distances, invalidate_cities
+from .models import City, CityDistance
+
+
+@receiver(post_save, sender=City)
+def estimate_distances(sender, instance, raw, **kwargs):
+    # The coordinates may have changed
+    if not raw:
+        estimate_city_distances(instance)
+
+
+@receiver([post_save, post_delete], sender=City)
+@receiver([post_save, post_delete], sender=CityDistance)
+def invalidate_city_matrix(sender, **kwargs):
+    # Once committed, or another process could cache a matrix of the old rows under the new version
+    transaction.on_commit(invalidate_cities)
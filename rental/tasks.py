@@ -1,11 +1,21 @@
+import logging
+
 from celery import shared_task
 
 from django.core.mail import send_mail
 from django.conf import settings
+from redis.exceptions import RedisError
+
+from .outbox import queue_email, send_outbox
+
+logger = logging.getLogger(__name__)
 
 
 @shared_task
 def send_booking_confirmation_email(user_email, user_first_name):
+    """
+    Queue the confirmation email of a reservation in the outbox, sent in batches by `send_email_outbox`.
+    """
     subject = 'Booking Confirmation'
     message = (
         f"Hello {user_first_name},\n\n"
@@ -15,10 +25,22 @@ def send_booking_confirmation_email(user_email, user_first_name):
     from_email = settings.DEFAULT_FROM_EMAIL
     recipient_list = [user_email]
 
-    send_mail(
-        subject,
-        message,
-        from_email,
-        recipient_list,
-        fail_silently=False,
-    )
+    try:
+        pending = queue_email(subject, message, from_email, recipient_list)
+    except RedisError:
+        logger.warning("Redis is unavailable for the email outbox, sending directly", exc_info=True)
+        send_mail(subject, message, from_email, recipient_list, fail_silently=False)
+        return
+
+    # A full batch is sent right away rather than at the next periodic send
+    if pending % settings.EMAIL_BATCH_SIZE == 0:
+        send_email_outbox.delay()
+
+
+@shared_task
+def send_email_outbox():
+    """
+    Send the emails of the outbox over one SMTP connection, run periodically by celery beat (see
+    `CELERY_BEAT_SCHEDULE`) and whenever a batch is full.
+    """
+    return send_outbox()
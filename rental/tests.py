@@ -1,11 +1,33 @@
+import smtplib
+from unittest import mock
+
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail import get_connection
+from django.core.mail.backends import locmem
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework.test import APITestCase
 from rest_framework import status
 import factory
 
-from .models import Reservation
+from .cities import city_matrix, invalidate_cities
+from .models import City, CityDistance, Reservation
 from .factories import ReservationFactory
+from .outbox import CLAIM_TIMEOUT, outbox, send_outbox
+from .serializers import ReservationSerializer
+from .tasks import send_booking_confirmation_email
+
+
+def build_reservation_data():
+    """
+    Build the data of a reservation request, with the keys of the cities.
+    """
+    reservation_data = factory.build(dict, FACTORY_CLASS=ReservationFactory)
+    return {key: value.pk if isinstance(value, City) else value for key, value in reservation_data.items()}
 
 
 class ReservationAPITestCase(APITestCase):
@@ -23,16 +45,12 @@ class ReservationAPITestCase(APITestCase):
         """
         Test creating a reservation with valid data.
         """
-        reservation_data = factory.build(dict, FACTORY_CLASS=ReservationFactory)
+        reservation_data = build_reservation_data()
         reservation_data["mobile_no"] = "+9779853503420"
 
         # Ensure journey_from and journey_to are different
         if reservation_data["journey_from"] == reservation_data["journey_to"]:
-            reservation_data["journey_to"] = (
-                Reservation.CityChoices.POKHARA
-                if reservation_data["journey_from"] != Reservation.CityChoices.POKHARA
-                else Reservation.CityChoices.KATHMANDU
-            )
+            reservation_data["journey_to"] = "pokhara" if reservation_data["journey_from"] != "pokhara" else "kathmandu"
 
         response = self.client.post(self.url, reservation_data, format="json")
         print(response.content)
@@ -43,10 +61,10 @@ class ReservationAPITestCase(APITestCase):
         """
         Test creating a reservation with an invalid (past) date.
         """
-        reservation_data = factory.build(dict, FACTORY_CLASS=ReservationFactory)
+        reservation_data = build_reservation_data()
         reservation_data["mobile_no"] = "+9779853503420"
-        reservation_data["journey_to"] = Reservation.CityChoices.KATHMANDU
-        reservation_data["journey_from"] = Reservation.CityChoices.BHAKTAPUR
+        reservation_data["journey_to"] = "kathmandu"
+        reservation_data["journey_from"] = "bhaktapur"
         reservation_data["date_of_travel"] = "2020-10-20"
 
         response = self.client.post(self.url, reservation_data, format="json")
@@ -57,7 +75,7 @@ class ReservationAPITestCase(APITestCase):
         """
         Test creating a reservation where the journey_from and journey_to are the same.
         """
-        reservation_data = factory.build(dict, FACTORY_CLASS=ReservationFactory)
+        reservation_data = build_reservation_data()
         reservation_data["mobile_no"] = "+9779853503420"
 
         reservation_data["journey_to"] = reservation_data["journey_from"]
@@ -71,7 +89,7 @@ class ReservationAPITestCase(APITestCase):
         """
         Test creating a reservation with an invalid mobile number.
         """
-        reservation_data = factory.build(dict, FACTORY_CLASS=ReservationFactory)
+        reservation_data = build_reservation_data()
         reservation_data["mobile_no"] = "+9779853503420"
 
         reservation_data["mobile_no"] = "abcd1234"
@@ -80,3 +98,154 @@ class ReservationAPITestCase(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn("mobile_no", response.data)
+
+    def test_create_reservation_with_idempotency_key(self):
+        """
+        Test that retrying a reservation with the same Idempotency-Key neither creates it nor emails twice.
+        """
+        reservation_data = build_reservation_data()
+        reservation_data.update(
+            mobile_no="+9779853503420",
+            email="traveller@example.com",
+            journey_from="kathmandu",
+            journey_to="pokhara",
+        )
+
+        with mock.patch("rental.serializers.send_booking_confirmation_email") as send_email:
+            responses = []
+            for _ in range(2):
+                with self.captureOnCommitCallbacks(execute=True):
+                    responses.append(
+                        self.client.post(self.url, reservation_data, format="json", HTTP_IDEMPOTENCY_KEY="retry-1")
+                    )
+
+        self.assertEqual([response.status_code for response in responses], [201, 201])
+        self.assertEqual(responses[0].data, responses[1].data)
+        self.assertEqual(responses[1]["Idempotent-Replayed"], "true")
+        self.assertEqual(Reservation.objects.count(), 1)
+        send_email.delay.assert_called_once()
+
+
+class CityMatrixTestCase(APITestCase):
+    """
+    Test case for the cities and their distance matrix.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("reservation-create")
+        self.reservation_data = build_reservation_data()
+        self.reservation_data.update(
+            mobile_no="+9779853503420", email="traveller@example.com", journey_from="kathmandu", journey_to="pokhara"
+        )
+
+    def test_matrix_lookups(self):
+        matrix = city_matrix.get()
+        self.assertEqual(matrix.city("kathmandu").name, "Kathmandu")
+        self.assertEqual(matrix.distance("kathmandu", "pokhara"), 199.4)
+        self.assertEqual(matrix.duration("kathmandu", "pokhara"), 342)
+        self.assertIsNone(matrix.distance("kathmandu", "kathmandu"))
+        self.assertIsNone(matrix.distance("kathmandu", "atlantis"))
+
+    def test_cities_are_validated_without_queries(self):
+        city_matrix.get()
+        serializer = ReservationSerializer(data=self.reservation_data)
+        with CaptureQueriesContext(connection) as context:
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(len(context), 0)
+        self.assertEqual(serializer.validated_data["journey_to"].name, "Pokhara")
+
+        response = self.client.post(self.url, {**self.reservation_data, "journey_to": "atlantis"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("journey_to", response.data)
+
+    def test_unknown_road_is_rejected(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            CityDistance.objects.filter(origin="kathmandu", destination="pokhara").delete()
+        response = self.client.post(self.url, self.reservation_data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("no known road", response.data["non_field_errors"][0])
+
+    def test_city_changes_update_matrix(self):
+        city_matrix.get()
+        with self.captureOnCommitCallbacks() as callbacks:
+            city = City.objects.create(key="tansen", name="Tansen", latitude=27.8676, longitude=83.5467)
+        self.assertEqual(CityDistance.objects.filter(origin=city).count(), City.objects.count() - 1)
+        # The matrix is invalidated once, and only when the city is committed
+        self.assertIsNone(city_matrix.get().city("tansen"))
+        self.assertEqual(callbacks.count(invalidate_cities), 1)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(city_matrix.get().city("tansen").name, "Tansen")
+        self.assertIsNotNone(city_matrix.get().distance("pokhara", "tansen"))
+
+        # Measured distances are kept when the coordinates change
+        CityDistance.objects.filter(origin="tansen", destination="pokhara").update(distance_km=110, estimated=False)
+        city.latitude = 27.87
+        with self.captureOnCommitCallbacks(execute=True):
+            city.save()
+        self.assertEqual(city_matrix.get().distance("tansen", "pokhara"), 110)
+        self.assertNotEqual(city_matrix.get().distance("pokhara", "tansen"), 110)
+
+        response = self.client.post(self.url, {**self.reservation_data, "journey_to": "tansen"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+
+
+class EmailOutboxTestCase(APITestCase):
+    """
+    Test case for the batched sending of the emails.
+    """
+
+    def setUp(self):
+        # The Redis outbox, when the tests run against Redis, outlives the test cases
+        outbox.clear()
+
+    def queue(self, count):
+        for index in range(count):
+            send_booking_confirmation_email(f"traveller{index}@example.com", "Traveller")
+
+    def test_emails_are_sent_in_batches_over_one_connection(self):
+        self.queue(3)
+        self.assertEqual(len(mail.outbox), 0)
+        with mock.patch("rental.outbox.get_connection", wraps=get_connection) as connect:
+            self.assertEqual(send_outbox(batch_size=2), {"sent": 3, "retried": 0, "dead": 0})
+        connect.assert_called_once()
+        self.assertEqual([email.to for email in mail.outbox], [[f"traveller{i}@example.com"] for i in range(3)])
+        self.assertEqual(outbox.store.counts(), {"pending": 0, "retry": 0, "in_flight": 0, "dead": 0})
+
+    @override_settings(EMAIL_BATCH_SIZE=2)
+    def test_full_batch_is_sent_right_away(self):
+        with mock.patch("rental.tasks.send_email_outbox") as send_email_outbox:
+            self.queue(3)
+        send_email_outbox.delay.assert_called_once()
+
+    @override_settings(EMAIL_MAX_ATTEMPTS=3, EMAIL_RETRY_BACKOFF=10)
+    def test_failed_emails_are_retried_then_dead_lettered(self):
+        self.queue(2)
+        failure = smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        with mock.patch.object(locmem.EmailBackend, "send_messages", side_effect=[failure, 1]):
+            self.assertEqual(send_outbox(now=1000), {"sent": 1, "retried": 1, "dead": 0})
+        # Not retried before its backoff
+        self.assertEqual(send_outbox(now=1009), {"sent": 0, "retried": 0, "dead": 0})
+
+        with mock.patch.object(locmem.EmailBackend, "send_messages", side_effect=failure):
+            self.assertEqual(send_outbox(now=1010), {"sent": 0, "retried": 1, "dead": 0})
+            self.assertEqual(send_outbox(now=1029), {"sent": 0, "retried": 0, "dead": 0})
+            self.assertEqual(send_outbox(now=1030), {"sent": 0, "retried": 0, "dead": 1})
+        self.assertEqual(outbox.store.counts(), {"pending": 0, "retry": 0, "in_flight": 0, "dead": 1})
+
+        self.assertEqual(outbox.store.requeue_dead(), 1)
+        self.assertEqual(send_outbox(now=1031), {"sent": 1, "retried": 0, "dead": 0})
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_refused_recipients_are_dead_lettered(self):
+        self.queue(1)
+        refused = smtplib.SMTPRecipientsRefused({"traveller0@example.com": (550, b"No such user")})
+        with mock.patch.object(locmem.EmailBackend, "send_messages", side_effect=refused):
+            self.assertEqual(send_outbox(), {"sent": 0, "retried": 0, "dead": 1})
+
+    def test_claimed_emails_are_sent_again_after_a_crash(self):
+        self.queue(1)
+        outbox.store.claim(1000, 10)
+        self.assertEqual(send_outbox(now=1000 + CLAIM_TIMEOUT - 1), {"sent": 0, "retried": 0, "dead": 0})
+        self.assertEqual(send_outbox(now=1000 + CLAIM_TIMEOUT), {"sent": 1, "retried": 0, "dead": 0})
@@ -1,10 +1,18 @@
+from drf_spectacular.utils import extend_schema, extend_schema_view
 from rest_framework import generics
 
+from main.idempotency import IDEMPOTENCY_KEY_PARAMETER, IdempotencyMixin
+
 from .models import Reservation
 from .serializers import ReservationSerializer
 
 
-class ReservationCreateView(generics.CreateAPIView):
+@extend_schema_view(post=extend_schema(parameters=[IDEMPOTENCY_KEY_PARAMETER]))
+class ReservationCreateView(IdempotencyMixin, generics.CreateAPIView):
+    """
+    Request a vehicle reservation, the confirmation email is sent once per Idempotency-Key.
+    """
+
     queryset = Reservation.objects.all()
     serializer_class = ReservationSerializer
 
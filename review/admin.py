@@ -5,6 +5,7 @@ from .models import FeedbackReview, FAQ
 
 class FeedbackReviewAdmin(admin.ModelAdmin):
     list_display = ("user", "title", "rating", "created_at", "updated_at")
+    list_select_related = ("user",)
     search_fields = ("title", "content", "user__username")
     list_filter = ("rating", "created_at", "user")
     readonly_fields = ("created_at", "updated_at")
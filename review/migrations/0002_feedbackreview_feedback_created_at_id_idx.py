@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("review", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="feedbackreview",
+            index=models.Index(fields=["created_at", "id"], name="feedback_created_at_id_idx"),
+        ),
+    ]
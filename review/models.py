@@ -30,6 +30,12 @@ class FeedbackReview(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination, see `FeedbackReviewViewSet`
+            models.Index(fields=["created_at", "id"], name="feedback_created_at_id_idx"),
+        ]
+
     def __str__(self):
         return self.title
 
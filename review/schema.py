@@ -0,0 +1,37 @@
+from typing import List
+
+import strawberry
+import strawberry_django
+from strawberry import auto
+
+from main.graphql import PageField
+
+from . import models
+
+
+@strawberry_django.type(models.FeedbackReview)
+class FeedbackReview:
+    id: auto
+    title: auto
+    content: auto
+    rating: auto
+    created_at: auto
+
+    @strawberry_django.field(only=["user_id"])
+    def user_id(self) -> strawberry.ID:
+        return self.user_id
+
+
+@strawberry_django.type(models.FAQ)
+class FAQ:
+    id: auto
+    question: auto
+    answer: auto
+
+
+@strawberry.type
+class Query:
+    feedback_reviews: List[FeedbackReview] = strawberry_django.field(field_cls=PageField)
+    feedback_review: FeedbackReview = strawberry_django.field()
+    faqs: List[FAQ] = strawberry_django.field(field_cls=PageField)
+    faq: FAQ = strawberry_django.field()
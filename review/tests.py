@@ -1,8 +1,12 @@
-from rest_framework.test import APITestCase
+from asgiref.sync import sync_to_async
+from django.test import override_settings
 from rest_framework import status
+from rest_framework.test import APITestCase
 
-from review.models import FeedbackReview
-from review.factories import FeedbackReviewFactory, FAQFactory, UserFactory
+from main.tests import QueryBudgetMixin
+from review.factories import FAQFactory, FeedbackReviewFactory, UserFactory
+from review.models import FAQ, FeedbackReview
+from review.serializers import FAQSerializer
 
 
 class FeedbackReviewAPITestCase(APITestCase):
@@ -33,6 +37,18 @@ class FeedbackReviewAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 5)
 
+    def test_list_feedback_reviews_with_cursor(self):
+        """Test the cursor pagination of the feedback reviews."""
+        FeedbackReviewFactory.create_batch(3, user=self.user)
+        response = self.client.get(self.feedback_review_list_url, {'cursor': '', 'limit': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        ids = [review['id'] for review in response.data['results']]
+        response = self.client.get(response.data['next'])
+        ids += [review['id'] for review in response.data['results']]
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(ids, list(FeedbackReview.objects.order_by('created_at', 'id').values_list('id', flat=True)))
+
     def test_feedback_review_permissions(self):
         """Test that only authenticated users can post feedback reviews."""
         self.client.logout()  # Log out the authenticated user
@@ -60,6 +76,12 @@ class FAQAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 3)
 
+    def test_list_faqs_matches_serializer(self):
+        """Test that the values based list renders FAQs like the serializer."""
+        FAQFactory.create_batch(2)
+        response = self.client.get(self.faq_list_url)
+        self.assertEqual(response.json()['results'], FAQSerializer(FAQ.objects.all(), many=True).data)
+
     def test_retrieve_faq(self):
         """Test the API to retrieve a specific FAQ."""
         faq = FAQFactory()
@@ -76,3 +98,57 @@ class FAQAPITestCase(APITestCase):
         }
         response = self.client.put(self.faq_detail_url(faq.pk), data)
         self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_faq_conditional_get(self):
+        """Test that unchanged FAQs are answered with 304 Not Modified."""
+        faq = FAQFactory()
+        response = self.client.get(self.faq_detail_url(faq.pk))
+        response = self.client.get(self.faq_detail_url(faq.pk), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+        response = self.client.get(self.faq_list_url)
+        last_modified, etag = response['Last-Modified'], response['ETag']
+        response = self.client.get(self.faq_list_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        FAQFactory()
+        response = self.client.get(self.faq_list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 2)
+
+    @override_settings(ROOT_URLCONF='main.asgi_urls')
+    async def test_async_faq_views(self):
+        """Test that the async FAQ views of the ASGI deployment answer like the sync ones."""
+        faq = await sync_to_async(FAQFactory)()
+        for url in (self.faq_list_url, self.faq_detail_url(faq.pk)):
+            response = await self.async_client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.content, (await sync_to_async(self.client.get)(url)).content)
+            response = await self.async_client.get(url, headers={'If-None-Match': response['ETag']})
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class ReviewQueryBudgetAPITestCase(QueryBudgetMixin, APITestCase):
+
+    def test_list_query_budgets(self):
+        self.assertQueryBudget('/api/v1/feedback-reviews/', 2, FeedbackReviewFactory.create_batch)
+        # conditional GET validators, count and page
+        self.assertQueryBudget('/api/v1/faqs/', 3, FAQFactory.create_batch)
+
+
+class ReviewGraphQLTestCase(APITestCase):
+
+    def test_query_reviews_and_faqs(self):
+        """Test that the feedback reviews and FAQs are served by the GraphQL endpoint."""
+        review = FeedbackReviewFactory()
+        faq = FAQFactory()
+        query = '{ feedbackReviews { title userId } faqs(pagination: {limit: 1}) { question } }'
+        response = self.client.post('/graphql/', {'query': query}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json()['data'],
+            {
+                'feedbackReviews': [{'title': review.title, 'userId': str(review.user_id)}],
+                'faqs': [{'question': faq.question}],
+            },
+        )
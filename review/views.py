@@ -3,6 +3,11 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 
+from main.async_views import AsyncValuesView
+from main.caching import ConditionalGetMixin
+from main.fast_serializers import ValuesListMixin
+from main.pagination import CursorLimitOffsetPagination
+
 from .models import FeedbackReview, FAQ
 from .serializers import FeedbackReviewSerializer, FAQSerializer
 
@@ -10,6 +15,8 @@ from .serializers import FeedbackReviewSerializer, FAQSerializer
 class FeedbackReviewViewSet(viewsets.ModelViewSet):
     queryset = FeedbackReview.objects.all()
     serializer_class = FeedbackReviewSerializer
+    pagination_class = CursorLimitOffsetPagination
+    cursor_ordering = ("created_at", "id")
 
     def get_permissions(self):
         if self.action == "create":
@@ -28,6 +35,16 @@ class FeedbackReviewViewSet(viewsets.ModelViewSet):
         return Response({"detail": "Method 'DELETE' not allowed."}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
 
-class FAQViewSet(viewsets.ReadOnlyModelViewSet):
+class FAQViewSet(ConditionalGetMixin, ValuesListMixin, viewsets.ReadOnlyModelViewSet):
     queryset = FAQ.objects.all()
     serializer_class = FAQSerializer
+
+
+class AsyncFAQView(AsyncValuesView):
+    """
+    Async `list` and `retrieve` of `FAQViewSet` for the ASGI deployment.
+    """
+
+    queryset = FAQViewSet.queryset
+    serializer_class = FAQSerializer
+    last_modified_field = FAQViewSet.last_modified_field
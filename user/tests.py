@@ -3,8 +3,9 @@ from unittest.mock import patch
 from django.contrib.sessions.middleware import SessionMiddleware
 from django.test import RequestFactory
 from django.urls import reverse
+from rest_framework.test import APITestCase
 
-from main.tests import TestCase
+from main.tests import QueryBudgetMixin, TestCase
 from user.factories import UserFactory
 from user.models import User
 from user.views import google_oauth
@@ -104,3 +105,9 @@ class TestGoogleOAuth(TestCase):
         assert len(list(request.session.items())) == 3
         assert list(request.session.items())[0] == ("_auth_user_id", str(user.pk))
         assert response.status_code == 302
+
+
+class UserQueryBudgetAPITestCase(QueryBudgetMixin, APITestCase):
+    def test_list_query_budgets(self):
+        self.client.force_authenticate(user=UserFactory.create())
+        self.assertQueryBudget("/api/v1/users/", 2, UserFactory.create_batch)